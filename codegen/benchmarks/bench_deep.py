@@ -0,0 +1,64 @@
+"""Per-node cost of the walkers on a synthetic deeply nested schema.
+
+    python codegen/benchmarks/bench_deep.py [--depth 200] [--width 3]
+
+Every level is an object schema with `width` properties, the first one
+nesting the next level. The document holds `--schemas` such chains.
+"""
+
+from __future__ import annotations
+
+import argparse
+from typing import TYPE_CHECKING, Any
+
+from bench_suite import best
+from jsmn_forge.profile import nodes
+from jsmn_forge.spec.diff import diff
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk.merge import merge
+from jsmn_forge.walk.normalize import normalize
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def chain(depth: int, width: int) -> dict[str, Any]:
+    node: dict[str, Any] = {"type": "string"}
+    for _ in range(depth):
+        props = {f"p{j}": {"type": "integer"} for j in range(1, width)}
+        node = {"type": "object", "properties": {"p0": node, **props}}
+    return node
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--depth", type=int, default=200)
+    parser.add_argument("--width", type=int, default=3)
+    parser.add_argument("--schemas", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    schemas = {
+        f"s{i}": chain(args.depth, args.width) for i in range(args.schemas)
+    }
+    doc = {"components": {"schemas": schemas}}
+    size = nodes(doc)
+    a = normalize(doc, ROOT)
+    b = normalize(doc, ROOT)
+    cases: dict[str, Callable[[], Any]] = {
+        "normalize": lambda: normalize(doc, ROOT),
+        "merge": lambda: merge(a, b, ROOT, share=True),
+        "diff": lambda: diff(a, b),
+    }
+    print(f"depth={args.depth} width={args.width} nodes={size}")
+    for name, fn in cases.items():
+        seconds = best(fn, args.repeat)
+        per_node = seconds / size * 1e9
+        print(f"{name:10} {seconds * 1e3:9.1f} ms {per_node:7.0f} ns/node")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Workspace discovery time, without and with a manifest.
+
+    python codegen/benchmarks/bench_discover.py [--modules 300]
+
+Generates `--modules` modules of one small resource each (see
+`workload.py`), then times `discover` from scratch, through a manifest
+loaded from a `Cache`, and through a manifest kept in memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from bench_suite import best
+from jsmn_forge.bundle import Manifest, discover
+from jsmn_forge.cache import Cache
+from workload import Workload, generate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--modules", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workload = Workload(modules=args.modules, resources=1, schemas=1, paths=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        modules = generate(Path(tmp, "ws"), workload).modules
+        cache = Cache(Path(tmp, "cache"))
+        manifest = Manifest()
+        discover(modules, manifest)
+        manifest.save(cache)
+
+        def cached() -> None:
+            discover(modules, Manifest.load(cache))
+
+        cases: dict[str, Callable[[], Any]] = {
+            "scratch": lambda: discover(modules),
+            "cache": cached,
+            "memory": lambda: discover(modules, manifest),
+        }
+        print(f"modules={args.modules}")
+        for name, fn in cases.items():
+            seconds = best(fn, args.repeat)
+            print(f"{name:8} {seconds * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Flatten pass over schemas repeating the same inline subschemas.
+
+    python codegen/benchmarks/bench_flatten.py [--distinct 500] [--copies 1 4]
+
+Generates `--distinct` component schemas, each an object with a few
+scalars, a nested array and an inline object, then repeats every
+component's inline parts under `copies` more components. Times `flatten`
+with the schemas digested beforehand (as after a merge), and digests
+included, for each number of copies. Copies add one descriptor each, the
+component they hold is equal to one already lowered and is not lowered
+again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import functools
+import random
+from typing import Any
+
+from bench_suite import best
+from jsmn_forge.flatten import flatten
+from jsmn_forge.walk.digest import Digests, digest
+
+_FORMATS = ["int32", "int64", "uint8", "uint16", "uint32", "double"]
+
+
+def _object(rnd: random.Random, i: int) -> dict[str, Any]:
+    properties: dict[str, Any] = {
+        f"n{j}": {"type": "number", "format": rnd.choice(_FORMATS)}
+        for j in range(rnd.randint(1, 5))
+    }
+    properties["s"] = {"type": "string", "maxLength": 8 + i}
+    properties["grid"] = {
+        "type": "array",
+        "maxItems": 4,
+        "items": {
+            "type": "array",
+            "minItems": 3,
+            "maxItems": 3,
+            "items": {"type": "number", "format": "uint32"},
+        },
+    }
+    properties["inner"] = {
+        "type": "object",
+        "required": ["id"],
+        "properties": {
+            "id": {"type": "number", "format": "uint32", "maximum": i},
+            "name": {"type": "string", "maxLength": 16},
+        },
+    }
+    return {
+        "type": "object",
+        "required": sorted(properties)[:2],
+        "properties": properties,
+    }
+
+
+def schemas(distinct: int, copies: int, seed: int) -> dict[str, Any]:
+    rnd = random.Random(seed)
+    out: dict[str, Any] = {}
+    for i in range(distinct):
+        schema = _object(rnd, i)
+        out[f"s{i}"] = schema
+        # Same content, other components
+        for c in range(copies):
+            out[f"s{i}_{c}"] = {
+                "type": "object",
+                "properties": {"copy": copy.deepcopy(schema)},
+            }
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'copies':>6} {'schemas':>8} {'descriptors':>11} ", end="")
+    print(f"{'lower ms':>9} {'+digest ms':>10}")
+    for copies in args.copies:
+        data = schemas(args.distinct, copies, args.seed)
+        digests = Digests()
+        digest(data, digests)
+        count = len(flatten(data, digests=digests))
+        lower = functools.partial(flatten, data, digests=digests)
+        lower_s = best(lower, args.repeat)
+        total_s = best(functools.partial(flatten, data), args.repeat)
+        print(f"{copies:>6} {len(data):>8} {count:>11} ", end="")
+        print(f"{lower_s * 1e3:>9.1f} {total_s * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Memory and comparisons of IR descriptors sharing their field shapes.
+
+    python codegen/benchmarks/bench_ir.py [--descriptors 20000]
+
+Builds `--descriptors` object descriptors twice, independently, with
+fields drawn from a small set of names and types (as generated code
+repeats `u8`, `optional__u8`, ... for every owner). Reports:
+
+- memory: bytes the first build allocates and keeps alive (tracemalloc)
+- rebuild: time of the second build
+- equal: comparing every descriptor of one build with the other's
+- hash: a set of every descriptor of both builds
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from jsmn_forge.codegen import (
+    Descriptor,
+    Dim,
+    Field,
+    FieldType,
+    NumberFormat,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringType,
+)
+
+_FORMATS: list[NumberFormat] = [
+    "int8",
+    "uint8",
+    "int32",
+    "uint32",
+    "int64",
+    "double",
+]
+
+
+def _type(rnd: random.Random, i: int) -> FieldType:
+    pick = rnd.random()
+    if pick < 0.1 and i:
+        return RefType(f"s{rnd.randrange(i)}")
+    dims = (Dim(0, rnd.choice([2, 4])),) if rnd.random() < 0.2 else None
+    if pick < 0.3:
+        return StringType(rnd.choice([8, 16, 32]), dims=dims)
+    return NumberType(rnd.choice(_FORMATS), dims=dims)
+
+
+def descriptors(n: int, seed: int) -> list[Descriptor]:
+    rnd = random.Random(seed)
+    return [
+        ObjectDescriptor(
+            f"s{i}",
+            tuple(
+                Field(f"f{j}", _type(rnd, i), required=rnd.random() < 0.7)
+                for j in range(rnd.randint(2, 12))
+            ),
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--descriptors", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    first = descriptors(args.descriptors, args.seed)
+    (memory, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    second = descriptors(args.descriptors, args.seed)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert all(a == b for (a, b) in zip(first, second, strict=True))
+    equal_s = time.perf_counter() - start
+    start = time.perf_counter()
+    try:
+        unique = len({*first, *second})
+    except TypeError:
+        unique = -1
+    hash_s = time.perf_counter() - start
+
+    print(f"descriptors={args.descriptors} unique={unique}")
+    print(f"memory  {memory / 2**20:9.1f} MiB")
+    print(f"rebuild {build_s * 1e3:9.1f} ms")
+    print(f"equal   {equal_s * 1e3:9.1f} ms")
+    print(f"hash    {hash_s * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
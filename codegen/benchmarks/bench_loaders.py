@@ -0,0 +1,71 @@
+"""Parse time of the registered loaders on the test fixtures, scaled up.
+
+    python codegen/benchmarks/bench_loaders.py [--scale 1000]
+
+Every fixture document is repeated `--scale` times under numbered keys,
+then written as JSON and as YAML. Each loader parses the format it
+handles. `normalize_yaml` parses and normalizes the YAML in one pass.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from bench_suite import best
+from jsmn_forge.loader import LOADERS, accelerated, load, yaml
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk.stream import normalize_yaml
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+FIXTURES = Path(__file__).parent.parent / "tests" / "fixtures"
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    fixtures = [yaml.load(f) for f in sorted(FIXTURES.rglob("*.yaml"))]
+    doc = {
+        f"d{i}_{j}": fixture
+        for i, fixture in enumerate(fixtures)
+        for j in range(args.scale)
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        json_file = Path(tmp, "doc.json")
+        yaml_file = Path(tmp, "doc.yaml")
+        json_file.write_text(json.dumps(doc, default=str))
+        # Distinct objects, or the YAML is mostly aliases
+        yaml.dump(json.loads(json_file.read_bytes()), yaml_file)
+        (json_data, yaml_data) = (
+            json_file.read_bytes(),
+            yaml_file.read_bytes(),
+        )
+        cases: dict[str, Callable[[], Any]] = {
+            "json": lambda: LOADERS["json"](json_data),
+            "yaml": lambda: LOADERS["yaml"](yaml_data),
+            "yaml-pure": lambda: LOADERS["yaml-pure"](yaml_data),
+            "normalize_yaml": lambda: normalize_yaml(yaml_data, ROOT),
+            "load(.json)": lambda: load(json_file),
+        }
+        print(
+            f"scale={args.scale} json={len(json_data)} bytes "
+            f"yaml={len(yaml_data)} bytes libyaml={accelerated}"
+        )
+        for name, fn in cases.items():
+            seconds = best(fn, args.repeat)
+            print(f"{name:15} {seconds * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
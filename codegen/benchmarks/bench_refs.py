@@ -0,0 +1,94 @@
+"""Reference lookups through a `RefIndex`, against walking the documents.
+
+    python codegen/benchmarks/bench_refs.py [--lookups 10000] [workload...]
+
+On a generated workspace (see `workload.py`), the best of `--repeat`:
+
+- index: `ref_sites` and `RefIndex.add` of every loaded document
+- resolve_walk: `--lookups` targets resolved from the document root
+- resolve_index: the same through `RefIndex.resolve`
+- users_scan: the users of `--lookups` targets, by scanning every site
+- users_index: the same through `RefIndex.users`
+- ref_regex: `Ref.normalize` of every site's reference, uncached
+- ref_cached: the same through `normalize_ref`
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from bench_suite import best
+from jsmn_forge.spec.location import Location
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import Specification, load, obj_root
+from jsmn_forge.spec.ref import Ref, RefIndex, normalize_ref
+from jsmn_forge.walk import ref_sites
+from workload import SCHEME, Workload, arguments, generate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments(parser)
+    args = vars(parser.parse_args())
+    (lookups, repeat) = (args.pop("lookups"), args.pop("repeat"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate(Path(tmp), Workload(**args)).documents
+        specs = [load(path, SCHEME) for path in paths]
+    docs = {
+        f"./{s.file.parent.parent.name}-{s.file.name}": s.data
+        for s in specs
+        if isinstance(s, Specification)
+    }
+    sites = {name: ref_sites(doc, ROOT) for (name, doc) in docs.items()}
+
+    def build() -> RefIndex:
+        index = RefIndex()
+        for name, doc in docs.items():
+            index.add(name, doc, ref_sites(doc, ROOT))
+        return index
+
+    index = build()
+    rnd = random.Random(0)
+    targets = [
+        (name, f"/components/schemas/{schema}")
+        for (name, doc) in docs.items()
+        for schema in doc["components"]["schemas"]
+    ]
+    targets = [rnd.choice(targets) for _ in range(lookups)]
+    raw = [ref for found in sites.values() for (_, ref) in found]
+
+    def users_scan() -> None:
+        for document, pointer in targets:
+            ref = f"#{pointer}"
+            _ = [loc for (loc, r) in sites[document] if r == ref]
+
+    cases: dict[str, Callable[[], Any]] = {
+        "index": build,
+        "resolve_walk": lambda: [
+            Location.from_pointer(p).resolve(docs[d]) for (d, p) in targets
+        ],
+        "resolve_index": lambda: [index.resolve(t) for t in targets],
+        "users_scan": users_scan,
+        "users_index": lambda: [index.users(t) for t in targets],
+        "ref_regex": lambda: [Ref(r).normalize(SCHEME) for r in raw],
+        "ref_cached": lambda: [normalize_ref(r, SCHEME) for r in raw],
+    }
+    print(f"documents={len(docs)} refs={len(index)} lookups={lookups}")
+    for name, fn in cases.items():
+        print(f"{name:14} {best(fn, repeat) * 1e3:9.2f} ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
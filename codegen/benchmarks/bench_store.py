@@ -0,0 +1,144 @@
+"""Memory of the dataclass IR against the columnar `IRStore`.
+
+    python codegen/benchmarks/bench_store.py [--fields 200000]
+
+Generates object descriptors totalling `--fields` fields, in two shapes:
+
+- shared: field types drawn from a small vocabulary, as most schema sets
+  repeat `uint8`, `string[32]`, ... (the dataclass IR interns them)
+- distinct: every field type has its own bounds
+
+and reports, per shape, the memory kept alive (tracemalloc) by a list of
+the dataclass descriptors, and by an `IRStore` filled from a generator of
+them, with the peak while filling. Then the time to read the kind and
+format of every field through each.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import gc
+import random
+import time
+import tracemalloc
+from typing import TYPE_CHECKING, Any
+
+from jsmn_forge.codegen import (
+    Bound,
+    Descriptor,
+    Dim,
+    Field,
+    FieldType,
+    NumberFormat,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringType,
+)
+from jsmn_forge.store import IRStore
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+_FORMATS: list[NumberFormat] = ["int8", "uint8", "int32", "uint32", "double"]
+
+
+def _type(rnd: random.Random, i: int, distinct: bool) -> FieldType:
+    pick = rnd.random()
+    dims = (Dim(0, rnd.choice([2, 4])),) if rnd.random() < 0.2 else None
+    if pick < 0.1 and i:
+        return RefType(f"s{rnd.randrange(i)}", dims=dims)
+    if pick < 0.3:
+        return StringType(rnd.choice([8, 16, 32]), dims=dims)
+    maximum = Bound(rnd.randrange(1 << 30)) if distinct else None
+    return NumberType(rnd.choice(_FORMATS), maximum=maximum, dims=dims)
+
+
+def descriptors(fields: int, distinct: bool, seed: int) -> Iterator[Descriptor]:
+    rnd = random.Random(seed)
+    (i, total) = (0, 0)
+    while total < fields:
+        count = rnd.randint(2, 12)
+        yield ObjectDescriptor(
+            f"s{i}",
+            tuple(
+                Field(f"f{j}", _type(rnd, i, distinct), rnd.random() < 0.7)
+                for j in range(count)
+            ),
+        )
+        (i, total) = (i + 1, total + count)
+
+
+def _list(fields: int, distinct: bool, seed: int) -> list[Descriptor]:
+    return list(descriptors(fields, distinct, seed))
+
+
+def _store(fields: int, distinct: bool, seed: int) -> IRStore:
+    return IRStore(descriptors(fields, distinct, seed))
+
+
+def measure(build: Callable[[], Any]) -> tuple[Any, int, int]:
+    """Value of `build`, memory it keeps alive and peak, in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    gc.collect()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (value, current, peak)
+
+
+def _read_dataclasses(ir: list[Descriptor]) -> int:
+    n = 0
+    for descriptor in ir:
+        assert isinstance(descriptor, ObjectDescriptor)
+        for field in descriptor.fields:
+            t = field.type
+            if t.kind == "number":
+                n += len(t.format)
+    return n
+
+
+def _read_store(store: IRStore) -> int:
+    n = 0
+    for descriptor in store:
+        for field in descriptor.fields or ():
+            t = field.type
+            if t.kind == "number":
+                n += len(t.format or "")
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--fields", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mib = 2**20
+    print(f"fields={args.fields}")
+    print(f"{'':8} {'dataclass MiB':>13} {'store MiB':>9} {'peak MiB':>8}")
+    for distinct in (False, True):
+        generate = (args.fields, distinct, args.seed)
+        (ir, dataclass_b, _) = measure(functools.partial(_list, *generate))
+        del ir
+        (store, store_b, peak_b) = measure(functools.partial(_store, *generate))
+        name = "distinct" if distinct else "shared"
+        print(f"{name:8} {dataclass_b / mib:>13.1f} ", end="")
+        print(f"{store_b / mib:>9.1f} {peak_b / mib:>8.1f}")
+
+    ir = list(descriptors(args.fields, False, args.seed))
+    store = IRStore(ir)
+    start = time.perf_counter()
+    _read_dataclasses(ir)
+    dataclass_s = time.perf_counter() - start
+    start = time.perf_counter()
+    _read_store(store)
+    store_s = time.perf_counter() - start
+    print(f"read dataclasses {dataclass_s * 1e3:9.1f} ms")
+    print(f"read store       {store_s * 1e3:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
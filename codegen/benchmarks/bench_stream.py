@@ -0,0 +1,88 @@
+"""Time and peak memory of loading then normalizing a YAML document,
+against normalizing it from the parser events.
+
+    python codegen/benchmarks/bench_stream.py [--schemas 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from jsmn_forge.loader import yaml
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk.normalize import normalize
+from jsmn_forge.walk.stream import normalize_yaml
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def schema(i: int) -> dict[str, Any]:
+    return {
+        "type": "object",
+        "description": f"schema number {i}",
+        "required": [f"p{j}" for j in range(0, 8, 2)],
+        "properties": {
+            f"p{j}": {
+                "type": "string",
+                "maxLength": 8 * j,
+                "enum": [f"v{k}" for k in range(j % 4)],
+            }
+            for j in range(8)
+        },
+        "allOf": [{"$ref": f"#/components/schemas/s{i // 2}"}],
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (min(times), peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--schemas", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    doc = {
+        "openapi": "3.1.0",
+        "components": {
+            "schemas": {f"s{i}": schema(i) for i in range(args.schemas)}
+        },
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        file = Path(tmp, "spec.yaml")
+        yaml.dump(doc, file)
+        size = file.stat().st_size
+        cases: dict[str, Callable[[], Any]] = {
+            "load+normalize": lambda: normalize(yaml.load(file), ROOT),
+            "normalize_yaml": lambda: normalize_yaml(file, ROOT),
+        }
+        print(f"schemas={args.schemas} bytes={size}")
+        for name, fn in cases.items():
+            (seconds, peak) = measure(fn, args.repeat)
+            print(
+                f"{name:15} {seconds * 1e3:9.1f} ms "
+                f"{peak / 2**20:7.1f} MiB peak"
+            )
+
+
+if __name__ == "__main__":
+    main()
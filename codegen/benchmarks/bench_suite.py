@@ -0,0 +1,163 @@
+"""Time bundle, normalize, merge and diff on generated workspaces.
+
+    python codegen/benchmarks/bench_suite.py [--sizes small,medium,large]
+        [--repeat 3] [--out results.json] [--budget 5] [--check]
+
+Every size is a `workload.Workload`, written to a temporary directory
+twice: at revision 0, and at revision 1 with the `churn` fraction of
+schemas edited. Phases, each the best of `--repeat` runs:
+
+- bundle: `bundle` of the revision 0 modules
+- bundle_lazy: lazy `bundle` of the same modules, then a lookup of three
+  resources, a build that only touches a few of them
+- normalize: `openapi_3_1.load` of every revision 0 document
+- merge: `spec.merge` of the revision 0 documents (parses again)
+- diff: `spec.diff` of the merged revisions 0 and 1, with the OpenAPI
+  context
+
+`codegen` is bundle plus merge, the work of a codegen run, and is checked
+against `--budget` seconds. Results are written as JSON to `--out`, and
+with `--check` the exit status is 1 when a size is over budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, replace
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from jsmn_forge.bundle import bundle
+from jsmn_forge.spec import diff, merge
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import load, obj_root
+from workload import SCHEME, Workload, generate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+SIZES = {
+    "small": Workload(modules=4, resources=3, schemas=20, paths=4),
+    "medium": Workload(modules=8, resources=4, schemas=40, paths=8),
+    "large": Workload(modules=16, resources=6, schemas=60, paths=12),
+}
+
+# Format of the results file, bump when its layout changes
+RESULTS_VERSION = 1
+
+
+def runs(fn: Callable[[], Any], repeat: int) -> list[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def best(fn: Callable[[], Any], repeat: int) -> float:
+    return min(runs(fn, repeat))
+
+
+def commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def measure(size: str, workload: Workload, repeat: int) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        base = generate(Path(tmp, "r0"), workload)
+        edited = generate(Path(tmp, "r1"), replace(workload, revision=1))
+        docs = base.documents
+        a = merge(*docs, scheme=SCHEME).value
+        b = merge(*edited.documents, scheme=SCHEME).value
+        context = (obj_root, _NO_BHV)
+        uris = [
+            f"{SCHEME}://{module.name}/res0/v0" for module in base.modules[:3]
+        ]
+
+        def bundle_lazy() -> None:
+            resolver = bundle(SCHEME, base.modules, lazy=True).resolver()
+            for uri in uris:
+                resolver.lookup(uri)
+
+        phases: dict[str, Callable[[], Any]] = {
+            "bundle": lambda: bundle(SCHEME, base.modules),
+            "bundle_lazy": bundle_lazy,
+            "normalize": lambda: [load(f, SCHEME) for f in docs],
+            "merge": lambda: merge(*docs, scheme=SCHEME),
+            "diff": lambda: diff(a, b, context=context),
+        }
+        times = {name: runs(fn, repeat) for name, fn in phases.items()}
+        return {
+            "size": size,
+            "workload": asdict(workload),
+            "documents": len(docs),
+            "bytes": sum(f.stat().st_size for f in docs),
+            "differences": len(diff(a, b, context=context)),
+            "seconds": {name: min(t) for name, t in times.items()},
+            "runs": times,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default=",".join(SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--budget", type=float, default=5.0)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    over = []
+    for size in args.sizes.split(","):
+        workload = replace(SIZES[size], seed=args.seed)
+        result = measure(size, workload, args.repeat)
+        seconds = result["seconds"]
+        seconds["codegen"] = seconds["bundle"] + seconds["merge"]
+        results.append(result)
+        if seconds["codegen"] > args.budget:
+            over.append(size)
+        print(
+            f"{size:8} docs={result['documents']:<4} "
+            + " ".join(f"{k}={v * 1e3:.1f}ms" for k, v in seconds.items()),
+            flush=True,
+        )
+    report = {
+        "version": RESULTS_VERSION,
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "commit": commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "budget": args.budget,
+        "over_budget": over,
+        "results": results,
+    }
+    if args.out is not None:
+        args.out.write_text(json.dumps(report, indent=2) + "\n")
+    if over:
+        print(f"over the {args.budget} s budget: {', '.join(over)}")
+        if args.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Cost of validating workspace documents, against loading them.
+
+    python codegen/benchmarks/bench_validate.py [--workers 4] [workload...]
+
+On a generated workspace (see `workload.py`), the best of `--repeat`:
+
+- load: loading every document
+- validate: `check_openapi` of every loaded document, on cached validators
+- uncached: the same through `jsonschema.validate`, which checks the schema
+  and builds a validator on every call, as configs used to be validated
+- files: `validate.files`, loading and validating serially
+- files_parallel: the same on `--workers`
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import jsonschema  # type: ignore[import-untyped]
+from bench_suite import best
+from jsmn_forge.loader import load
+from jsmn_forge.validate import OPENAPI, check_openapi, files
+from workload import Workload, arguments, generate
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+def uncached(docs: list[Any]) -> None:
+    for doc in docs:
+        jsonschema.validate(instance=doc, schema=OPENAPI)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments(parser)
+    args = vars(parser.parse_args())
+    (workers, repeat) = (args.pop("workers"), args.pop("repeat"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate(Path(tmp), Workload(**args)).documents
+        docs = [load(path) for path in paths]
+        cases: dict[str, Callable[[], Any]] = {
+            "load": lambda: [load(path) for path in paths],
+            "validate": lambda: [check_openapi(doc) for doc in docs],
+            "uncached": lambda: uncached(docs),
+            "files": lambda: files(paths),
+            "files_parallel": lambda: files(paths, workers=workers),
+        }
+        print(f"documents={len(paths)}")
+        for name, fn in cases.items():
+            print(f"{name:15} {best(fn, repeat) * 1e3:9.1f} ms", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Latency of one watch cycle after a single file edit.
+
+    python codegen/benchmarks/bench_watch.py [--files 300] [--paths 5]
+
+Every file declares `--paths` paths and `--schemas` schemas of its own
+plus a few shared with its neighbours. The benchmark edits one schema in
+one file and times `IncrementalMerge.update` against a full merge.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from jsmn_forge.spec import merge
+from jsmn_forge.watch import IncrementalMerge
+from ruamel.yaml import YAML
+
+TARGET_MS = 100
+
+
+def spec(i: int, paths: int, schemas: int, *, rev: int = 0) -> dict[str, Any]:
+    props = {
+        f"p{j}": {"type": "string", "maxLength": 8 + rev} for j in range(8)
+    }
+    own = {
+        f"S{i}_{j}": {"type": "object", "properties": props}
+        for j in range(schemas)
+    }
+    shared = {f"Shared{i % 10}": {"type": "object", "required": [f"r{i}"]}}
+    ref = {"$ref": f"#/components/schemas/S{i}_0"}
+    ok = {"200": {"content": {"application/json": {"schema": ref}}}}
+    return {
+        "openapi": "3.1.0",
+        "info": {"title": f"api {i}", "version": "1.0.0"},
+        "paths": {
+            f"/r{i}/p{j}": {"get": {"responses": ok}} for j in range(paths)
+        },
+        "components": {"schemas": {**own, **shared}},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--paths", type=int, default=5)
+    parser.add_argument("--schemas", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    yaml = YAML(typ="safe")
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [Path(tmp, f"spec{i}.yaml") for i in range(args.files)]
+        for i, file in enumerate(files):
+            yaml.dump(spec(i, args.paths, args.schemas), file)
+
+        start = time.perf_counter()
+        state = IncrementalMerge(files)
+        initial = time.perf_counter() - start
+        start = time.perf_counter()
+        merge(*files)
+        full = time.perf_counter() - start
+
+        edited = files[len(files) // 2]
+        times = []
+        for rev in range(1, args.repeat + 1):
+            doc = spec(len(files) // 2, args.paths, args.schemas, rev=rev)
+            yaml.dump(doc, edited)
+            start = time.perf_counter()
+            state.update([edited])
+            times.append(time.perf_counter() - start)
+
+    ms = min(times) * 1e3
+    print(f"files={args.files} conflicts={len(state.result.conflicts)}")
+    print(f"initial    {initial * 1e3:9.1f} ms")
+    print(f"full merge {full * 1e3:9.1f} ms")
+    print(f"update     {ms:9.1f} ms (target {TARGET_MS} ms)")
+
+
+if __name__ == "__main__":
+    main()
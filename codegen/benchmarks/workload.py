@@ -0,0 +1,218 @@
+"""Seeded generator of synthetic OpenAPI 3.1 workspaces.
+
+    python codegen/benchmarks/workload.py OUT [--seed 0] [--modules 8] ...
+
+Writes one directory per module, laid out like tests/fixtures/workspace:
+a `.jsmn-forge.yaml` config and `schemas/<resource>.openapi.yaml` per
+resource. Schemas nest objects, arrays and `allOf`/`oneOf` compositions
+up to `depth`, and reference earlier schemas of the same document or,
+with probability `cross_refs`, of earlier resources through `forge://`
+URIs. The same seed and parameters always write the same bytes.
+
+`revision` edits the `churn` fraction of schemas (always the same ones
+for a seed), for diffing two revisions of one workspace.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from jsmn_forge.loader import yaml
+
+SCHEME = "forge"
+
+_FORMATS = {
+    "integer": ["int32", "int64", "uint8", "uint16", "uint32"],
+    "number": ["float", "double"],
+    "string": ["uuid", "date-time", "hostname", "email"],
+}
+
+
+@dataclass(frozen=True)
+class Workload:
+    seed: int = 0
+    modules: int = 8
+    resources: int = 4
+    schemas: int = 30
+    paths: int = 8
+    depth: int = 3
+    fanout: int = 3
+    cross_refs: float = 0.1
+    churn: float = 0.05
+    revision: int = 0
+
+
+# (module, resource, schema names) of a document written so far
+type _Target = tuple[str, str, list[str]]
+
+
+class _Generator:
+    def __init__(self, workload: Workload) -> None:
+        self.w = workload
+        self.rnd = random.Random(workload.seed)
+        self.targets: list[_Target] = []
+
+    def ref(self, local: list[str]) -> dict[str, Any] | None:
+        """A reference to an earlier schema, None when there is none."""
+        rnd = self.rnd
+        if self.targets and rnd.random() < self.w.cross_refs:
+            (module, resource, names) = rnd.choice(self.targets)
+            uri = f"{SCHEME}://{module}/{resource}/v0"
+            pointer = f"#/components/schemas/{rnd.choice(names)}"
+            return {"$ref": uri + pointer}
+        if local:
+            return {"$ref": f"#/components/schemas/{rnd.choice(local)}"}
+        return None
+
+    def scalar(self, edit: bool) -> dict[str, Any]:
+        rnd = self.rnd
+        kind = rnd.choice(["string", "string", "integer", "number", "bool"])
+        if kind == "bool":
+            return {"type": "boolean"}
+        out: dict[str, Any] = {"type": kind}
+        if rnd.random() < 0.5:
+            out["format"] = rnd.choice(_FORMATS[kind])
+        if kind == "string":
+            out["maxLength"] = rnd.choice([16, 32, 64, 128])
+            if edit:
+                out["maxLength"] += self.w.revision
+            if rnd.random() < 0.2:
+                out["enum"] = [f"v{i}" for i in range(rnd.randint(2, 6))]
+        elif rnd.random() < 0.5:
+            out["minimum"] = 0
+            out["maximum"] = rnd.choice([100, 1000, 65535])
+        return out
+
+    def schema(self, depth: int, local: list[str], edit: bool) -> Any:
+        rnd = self.rnd
+        roll = rnd.random()
+        if depth == 0 or roll < 0.25:
+            if roll < 0.1 and (ref := self.ref(local)) is not None:
+                return ref
+            return self.scalar(edit)
+        if roll < 0.35:
+            return {
+                "type": "array",
+                "maxItems": rnd.choice([4, 8, 16]),
+                "items": self.schema(depth - 1, local, edit),
+            }
+        if roll < 0.5:
+            keyword = "allOf" if rnd.random() < 0.6 else "oneOf"
+            return {
+                keyword: [
+                    self.schema(depth - 1, local, edit)
+                    for _ in range(rnd.randint(2, max(2, self.w.fanout)))
+                ]
+            }
+        names = rnd.sample(range(12), rnd.randint(2, 6))
+        props = {
+            f"field_{n}": self.schema(depth - 1, local, edit) for n in names
+        }
+        required = [p for p in props if rnd.random() < 0.5]
+        out: dict[str, Any] = {"type": "object"}
+        if required:
+            out["required"] = required
+        out["properties"] = props
+        return out
+
+    def document(self, module: str, resource: str) -> dict[str, Any]:
+        rnd = self.rnd
+        names: list[str] = []
+        schemas: dict[str, Any] = {}
+        for i in range(self.w.schemas):
+            name = f"{resource}_s{i}"
+            edit = rnd.random() < self.w.churn
+            schema = self.schema(self.w.depth, names, edit)
+            if "type" in schema and rnd.random() < 0.3:
+                schema["x-jsmn-forge-as"] = "${id}"
+            schemas[name] = schema
+            names.append(name)
+        paths: dict[str, Any] = {}
+        for i in range(self.w.paths):
+            target = {"$ref": f"#/components/schemas/{rnd.choice(names)}"}
+            params = [
+                {
+                    "in": "query",
+                    "name": f"q{j}",
+                    "required": rnd.random() < 0.3,
+                    "schema": self.scalar(edit=False),
+                }
+                for j in rnd.sample(range(6), rnd.randint(0, 3))
+            ]
+            ok = {
+                "description": "ok",
+                "content": {"application/json": {"schema": target}},
+            }
+            operation: dict[str, Any] = {
+                "operationId": f"{module}_{resource}_get{i}",
+                "responses": {"200": ok},
+            }
+            if params:
+                operation["parameters"] = params
+            paths[f"/api/v1/{module}/{resource}/{i}"] = {"get": operation}
+        self.targets.append((module, resource, names))
+        return {
+            "openapi": "3.1.0",
+            "$id": f"{SCHEME}://{module}/{resource}/v0",
+            "info": {"title": f"{module} {resource}", "version": "0.1.0"},
+            "paths": paths,
+            "components": {"schemas": schemas},
+        }
+
+
+class Workspace(NamedTuple):
+    # Module directories, for `bundle`
+    modules: list[Path]
+    # OpenAPI documents, in write order
+    documents: list[Path]
+
+
+def generate(root: Path, workload: Workload) -> Workspace:
+    """Write the workspace of `workload` under `root`."""
+    gen = _Generator(workload)
+    out = Workspace([], [])
+    for m in range(workload.modules):
+        module = f"mod{m}"
+        directory = root / module
+        (directory / "schemas").mkdir(parents=True, exist_ok=True)
+        resources = []
+        for r in range(workload.resources):
+            resource = f"res{r}"
+            spec = Path("schemas") / f"{resource}.openapi.yaml"
+            yaml.dump(gen.document(module, resource), directory / spec)
+            out.documents.append(directory / spec)
+            resources.append(
+                {"name": resource, "version": 0, "openapi": [str(spec)]}
+            )
+        config = {"name": module, "resources": resources}
+        yaml.dump(config, directory / ".jsmn-forge.yaml")
+        out.modules.append(directory)
+    return out
+
+
+def arguments(parser: argparse.ArgumentParser) -> None:
+    """Add an option per `Workload` field to `parser`."""
+    for field, default in asdict(Workload()).items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}",
+            type=type(default),
+            default=default,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("out", type=Path)
+    arguments(parser)
+    args = vars(parser.parse_args())
+    out = args.pop("out")
+    workspace = generate(out, Workload(**args))
+    print(f"{len(workspace.documents)} documents in {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,128 +1,361 @@
-"""Workspace parsing utilities"""
-
-import re
-from pathlib import Path
-from typing import NamedTuple, TypedDict, cast
-
-from jsonschema import validate  # type: ignore[import-untyped]
-from referencing import Registry, Resource
-from referencing.jsonschema import DRAFT202012
-from ruamel.yaml import YAML
-
-# safe yaml loader for schemas
-yaml = YAML(typ="safe")
-
-# regex for finding schema-tools file
-RE_CONFIG = re.compile(r"^\.?(jsmnForge|JsmnForge|jsmn-forge).ya?ml$")
-
-# regex for validating $id URIs: scheme://module/resource/vN
-RE_URI = re.compile(
-    r"^[a-zA-Z][a-zA-Z0-9-]*://[a-zA-Z0-9_-]+/[a-zA-Z0-9_-]+/v\d+$"
-)
-
-
-# validator support
-SCHEMA = yaml.load("""
-    type: object
-    required: [resources]
-    properties:
-        resources:
-            type: array
-            items:
-                type: object
-                required: [name, version]
-                properties:
-                    name:
-                        type: string
-                    version:
-                        type: number
-                    openapi:
-                        type: array
-                        items:
-                            type: string
-                    asyncapi:
-                        type: array
-                        items:
-                            type: string
-                    if:
-                        type: array
-                        items:
-                            type: string
-""")
-
-
-class ResourceConfig(TypedDict):
-    name: str
-    version: int
-    openapi: list[Path]
-    asyncapi: list[Path]
-
-
-class Config(TypedDict):
-    name: str
-    resources: list[ResourceConfig]
-
-
-class Uri(NamedTuple):
-    module: str
-    resource: str
-    version: int
-
-
-def _parse_workspace(path: Path | str, config: Path) -> Config:
-    root = Path(path).absolute()
-    name = root.name.split(".")[0]
-    doc = yaml.load(root / config)
-    validate(instance=doc, schema=SCHEMA)
-    doc["name"] = name
-    for res in doc["resources"]:
-        if "openapi" in res:
-            res["openapi"] = [root / path for path in res["openapi"]]
-        else:
-            res["openapi"] = []
-        if "asyncapi" in res:
-            res["asyncapi"] = [root / path for path in res["asyncapi"]]
-        else:
-            res["asyncapi"] = []
-    return cast("Config", doc)
-
-
-class InvalidUriError(Exception):
-    """Raised when a schema $id does not match the expected URI format."""
-
-
-def _read_resource(
-    loc: str | Path,
-    scheme: str,
-    module: str,
-    res: str,
-    version: int,
-) -> Resource:
-    content = yaml.load(loc)
-    if "$id" not in content:
-        content["$id"] = f"{scheme}://{module}/{res}/v{version}"
-    elif not RE_URI.match(content["$id"]):
-        # TODO need to collect errors instead of failing fast
-        raise InvalidUriError("Invalid $id: \"content['$id']\"")
-    return Resource.from_contents(content, default_specification=DRAFT202012)
-
-
-def bundle(scheme: str, workspace: list[Path] | list[str]) -> Registry:
-    """ """
-
-    # iterate over workspace directories, parsing specifications
-    configs = [
-        _parse_workspace(module, path)
-        for module in workspace
-        for path in Path(module).iterdir()
-        if RE_CONFIG.match(path.name)
-    ]
-
-    # flatten resources into a keyable registry
-    content = [
-        _read_resource(spec, scheme, cfg["name"], res["name"], res["version"])
-        for cfg in configs
-        for res in cfg["resources"]
-        for spec in res["openapi"]
-    ]
-    return content @ Registry()
+"""Workspace parsing utilities"""
+
+import functools
+import os
+import re
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, NamedTuple, Self, TypedDict, cast
+
+from referencing import Registry, Resource
+from referencing.exceptions import NoSuchResource
+from referencing.jsonschema import DRAFT202012
+
+from jsmn_forge.cache import Cache
+from jsmn_forge.loader import load, yaml
+from jsmn_forge.profile import phase
+from jsmn_forge.validate import (
+    READ_ERRORS,
+    InvalidDocumentError,
+    Problem,
+    check,
+    check_id,
+    check_openapi,
+    unreadable,
+)
+
+# regex for finding schema-tools file
+RE_CONFIG = re.compile(r"^\.?(jsmnForge|JsmnForge|jsmn-forge).ya?ml$")
+
+# validator support
+SCHEMA = yaml.load("""
+    $id: "urn:jsmn-forge:config"
+    type: object
+    required: [resources]
+    properties:
+        resources:
+            type: array
+            items:
+                type: object
+                required: [name, version]
+                properties:
+                    name:
+                        type: string
+                    version:
+                        type: number
+                    openapi:
+                        type: array
+                        items:
+                            type: string
+                    asyncapi:
+                        type: array
+                        items:
+                            type: string
+                    if:
+                        type: array
+                        items:
+                            type: string
+""")
+
+
+class ResourceConfig(TypedDict):
+    name: str
+    version: int
+    openapi: list[Path]
+    asyncapi: list[Path]
+
+
+class Config(TypedDict):
+    name: str
+    resources: list[ResourceConfig]
+
+
+class InvalidConfigError(InvalidDocumentError):
+    """Raised by `discover` with the problems of the invalid configs, and
+    the `configs` of the valid ones."""
+
+    def __init__(self, problems: list[Problem], configs: list[Config]) -> None:
+        super().__init__(problems)
+        self.configs = configs
+
+
+class Uri(NamedTuple):
+    module: str
+    resource: str
+    version: int
+
+
+def _parse_workspace(path: Path | str, config: Path) -> Config:
+    root = Path(path).absolute()
+    name = root.name.split(".")[0]
+    doc = load(root / config)
+    if problems := check(doc, SCHEMA, root / config):
+        raise InvalidDocumentError(problems)
+    doc["name"] = name
+    for res in doc["resources"]:
+        if "openapi" in res:
+            res["openapi"] = [root / path for path in res["openapi"]]
+        else:
+            res["openapi"] = []
+        if "asyncapi" in res:
+            res["asyncapi"] = [root / path for path in res["asyncapi"]]
+        else:
+            res["asyncapi"] = []
+    return cast("Config", doc)
+
+
+# (file name, st_mtime_ns, st_size) of a config file
+type _Stamp = tuple[str, int, int]
+
+# Cache namespace of the discovery manifest, bump when _Entry changes
+MANIFEST_NAMESPACE = "bundle-manifest:1"
+
+
+class _Entry(NamedTuple):
+    # st_mtime_ns of the module directory, changes when a file is added,
+    # removed or renamed in it
+    mtime: int
+    configs: list[tuple[_Stamp, Config]]
+
+
+class Manifest:
+    """Configs found in workspace module directories, with the stamps of
+    the directory and the config files they were read at.
+
+    Discovery only lists a directory whose mtime changed, and only reads
+    and validates a config whose stamp changed. Configs are shared with
+    every discovery that reuses them, and must not be mutated.
+    """
+
+    def __init__(self) -> None:
+        # absolute module directory -> entry
+        self.entries: dict[str, _Entry] = {}
+        self.dirty = False
+
+    @staticmethod
+    def _key(cache: Cache) -> str:
+        return cache.key(b"", MANIFEST_NAMESPACE)
+
+    @classmethod
+    def load(cls, cache: Cache) -> Self:
+        """The manifest saved in `cache`, empty when there is none."""
+        manifest = cls()
+        (hit, entries) = cache.get(cls._key(cache))
+        if hit and isinstance(entries, dict):
+            manifest.entries = entries
+        return manifest
+
+    def save(self, cache: Cache) -> None:
+        """Save to `cache`, when anything changed since loaded."""
+        if self.dirty:
+            cache.put(self._key(cache), self.entries)
+            self.dirty = False
+
+
+def _stamp(directory: str, name: str) -> _Stamp:
+    st = os.stat(os.path.join(directory, name))  # noqa: PTH116, PTH118
+    return (name, st.st_mtime_ns, st.st_size)
+
+
+def _discover_module(directory: str, entry: _Entry | None) -> _Entry:
+    mtime = os.stat(directory).st_mtime_ns  # noqa: PTH116
+    if entry is not None and entry.mtime == mtime:
+        names = [name for ((name, _, _), _) in entry.configs]
+    else:
+        with os.scandir(directory) as it:
+            names = sorted(e.name for e in it if RE_CONFIG.match(e.name))
+    known = dict(entry.configs) if entry is not None else {}
+    configs: list[tuple[_Stamp, Config]] = []
+    for name in names:
+        stamp = _stamp(directory, name)
+        config = known.get(stamp)
+        if config is None:
+            config = _parse_workspace(directory, Path(name))
+        configs.append((stamp, config))
+    if entry is not None and entry == (mtime, configs):
+        return entry
+    return _Entry(mtime, configs)
+
+
+def discover(
+    workspace: Iterable[Path | str],
+    manifest: Manifest | None = None,
+) -> list[Config]:
+    """Parse the config of every workspace module directory.
+
+    With `manifest`, unchanged directories and configs are reused from it,
+    and it is updated. Raises InvalidConfigError with the problems of
+    every invalid config, and the valid configs.
+    """
+    if manifest is None:
+        manifest = Manifest()
+    configs: list[Config] = []
+    problems: list[Problem] = []
+    for module in workspace:
+        directory = str(Path(module).absolute())
+        old = manifest.entries.get(directory)
+        try:
+            new = _discover_module(directory, old)
+        except InvalidDocumentError as e:
+            problems += e.problems
+            continue
+        if new is not old:
+            manifest.entries[directory] = new
+            manifest.dirty = True
+        configs += [config for (_, config) in new.configs]
+    if problems:
+        raise InvalidConfigError(problems, configs)
+    return configs
+
+
+# Cache namespace of a loaded resource and its problems, bump when the
+# OpenAPI validation changes
+RESOURCE_NAMESPACE = "bundle-resource:1"
+
+
+def _load_resource(
+    data: bytes, file: Path, *, validate: bool
+) -> tuple[Any, list[Problem]]:
+    content = load(data, suffix=file.suffix)
+    return (content, check_openapi(content, file) if validate else [])
+
+
+def _read_resource(
+    loc: str | Path,
+    scheme: str,
+    module: str,
+    res: str,
+    version: int,
+    *,
+    cache: Cache | None = None,
+    validate: bool = True,
+) -> Resource:
+    """Resource of a specification file, raises InvalidDocumentError with
+    every problem found in it."""
+    file = Path(loc)
+    with phase("load", file) as span:
+        build = functools.partial(_load_resource, file=file, validate=validate)
+        try:
+            if cache is None:
+                (content, problems) = build(file.read_bytes())
+            else:
+                namespace = f"{RESOURCE_NAMESPACE}:{validate}"
+                (content, problems) = cache.load(file, namespace, build)
+        except READ_ERRORS as e:
+            raise InvalidDocumentError([unreadable(file, e)]) from e
+    span.count(content)
+    # Cached by content, identical files share the problems of the first
+    problems = [p._replace(file=file) for p in problems]
+    # Lazy registries look resources up by this URI, eager ones by $id
+    uri = f"{scheme}://{module}/{res}/v{version}"
+    content.setdefault("$id", uri)
+    invalid = check_id(content, file)
+    if not invalid and content["$id"] != uri:
+        message = f"{content['$id']!r} is not the resource URI {uri!r}"
+        invalid.append(Problem(file, "/$id", message))
+    problems += invalid
+    if problems:
+        raise InvalidDocumentError(problems)
+    return Resource.from_contents(content, default_specification=DRAFT202012)
+
+
+def _index(scheme: str, configs: list[Config]) -> dict[str, tuple[Path, Uri]]:
+    """Specification file of every resource URI. Like the registry, a
+    later file of a resource replaces an earlier one."""
+    index: dict[str, tuple[Path, Uri]] = {}
+    for cfg in configs:
+        for res in cfg["resources"]:
+            uri = Uri(cfg["name"], res["name"], res["version"])
+            for spec in res["openapi"]:
+                key = f"{scheme}://{uri.module}/{uri.resource}/v{uri.version}"
+                index[key] = (spec, uri)
+    return index
+
+
+def _retriever(
+    scheme: str,
+    configs: list[Config],
+    *,
+    cache: Cache | None = None,
+    validate: bool = True,
+) -> Callable[[str], Resource]:
+    index = _index(scheme, configs)
+
+    # NOTE: registries are immutable, a retrieved resource is only kept by
+    # the registry returned from the lookup. Caching here keeps it for
+    # every lookup through the original registry too
+    @functools.cache
+    def retrieve(uri: str) -> Resource:
+        try:
+            (spec, (module, res, version)) = index[uri]
+        except KeyError:
+            raise NoSuchResource(uri) from None
+        return _read_resource(
+            spec, scheme, module, res, version, cache=cache, validate=validate
+        )
+
+    return retrieve
+
+
+def bundle(
+    scheme: str,
+    workspace: list[Path] | list[str],
+    *,
+    cache: Cache | None = None,
+    lazy: bool = False,
+    manifest: Manifest | None = None,
+    validate: bool = True,
+) -> Registry:
+    """Registry of the OpenAPI resources of the workspace modules.
+
+    With `lazy`, only the module configs are read up front. A resource is
+    loaded the first time its `scheme://module/resource/vN` URI is looked
+    up, and kept for later lookups.
+
+    Configs are discovered through `manifest` (see `Manifest`), by default
+    the one saved in `cache`.
+
+    Configs, and with `validate` specifications, are validated as they are
+    read (see `jsmn_forge.validate`). InvalidDocumentError is raised with
+    the problems of every invalid document, once all were read. The
+    lookup of an invalid resource in a lazy registry raises referencing's
+    Unretrievable (Unresolvable, through a resolver) instead, caused by
+    the InvalidDocumentError.
+    """
+
+    # iterate over workspace directories, parsing specifications
+    with phase("discover"):
+        if manifest is None and cache is not None:
+            manifest = Manifest.load(cache)
+        configs = discover(workspace, manifest)
+        if manifest is not None and cache is not None:
+            manifest.save(cache)
+
+    if lazy:
+        retrieve = _retriever(scheme, configs, cache=cache, validate=validate)
+        return Registry(retrieve=retrieve)  # type: ignore[call-arg]
+
+    # flatten resources into a keyable registry
+    content: list[Resource] = []
+    problems: list[Problem] = []
+    for cfg in configs:
+        for res in cfg["resources"]:
+            for spec in res["openapi"]:
+                try:
+                    resource = _read_resource(
+                        spec,
+                        scheme,
+                        cfg["name"],
+                        res["name"],
+                        res["version"],
+                        cache=cache,
+                        validate=validate,
+                    )
+                except InvalidDocumentError as e:
+                    problems += e.problems
+                    continue
+                content.append(resource)
+    if problems:
+        raise InvalidDocumentError(problems)
+    with phase("registry"):
+        return content @ Registry()
@@ -0,0 +1,153 @@
+"""Content-addressed on-disk cache of parsed specifications"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Bump when the on-disk entry format changes
+FORMAT_VERSION = 1
+
+# Default upper bound on the total size of all cache entries
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_root() -> Path:
+    """Cache directory from $JSMN_FORGE_CACHE_DIR, else the XDG cache home."""
+    if env := os.environ.get("JSMN_FORGE_CACHE_DIR"):
+        return Path(env)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = Path(xdg) if xdg else Path.home() / ".cache"
+    return base / "jsmn-forge"
+
+
+class Cache:
+    """Persistent cache of values derived from file contents.
+
+    Entries are keyed by a hash of the file bytes plus a namespace naming
+    the transform (and everything it depends on, ie: the scheme and the
+    node table version). Values are stored pickled. When the total size of
+    the entries exceeds `max_bytes` the least recently used are evicted.
+    """
+
+    def __init__(
+        self,
+        root: Path | str | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.root = Path(root) if root is not None else default_root()
+        self.max_bytes = max_bytes
+        self._size: int | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The running size estimate is per process
+        return {**self.__dict__, "_size": None}
+
+    def key(self, data: bytes, namespace: str) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        h.update(f"{FORMAT_VERSION}:{namespace}\x00".encode())
+        h.update(data)
+        return h.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Return (hit, value). Unreadable entries count as a miss."""
+        entry = self._entry(key)
+        try:
+            with entry.open("rb") as f:
+                value = pickle.load(f)
+        except Exception:
+            # Truncated, corrupt or stale (ie: a class since renamed)
+            # pickles raise about anything
+            return (False, None)
+        # Refresh mtime so eviction sees the entry as recently used
+        with contextlib.suppress(OSError):
+            os.utime(entry)
+        return (True, value)
+
+    def put(self, key: str, value: Any) -> None:
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        # Write to a sibling temp file and rename so readers never see a
+        # partial entry
+        # An overwritten entry no longer counts towards the size
+        try:
+            replaced = entry.stat().st_size
+        except OSError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=entry.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            Path(tmp).replace(entry)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                Path(tmp).unlink()
+            raise
+        if self._size is None:
+            self._size = sum(size for (_, _, size) in self._scan())
+        else:
+            self._size += len(blob) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def load(
+        self,
+        path: Path | str,
+        namespace: str,
+        build: Callable[[bytes], Any],
+    ) -> Any:
+        """Read `path` and return `build(contents)`, cached by content."""
+        data = Path(path).read_bytes()
+        key = self.key(data, namespace)
+        (hit, value) = self.get(key)
+        if not hit:
+            value = build(data)
+            self.put(key, value)
+        return value
+
+    def _scan(self) -> list[tuple[float, Path, int]]:
+        entries: list[tuple[float, Path, int]] = []
+        if not self.root.is_dir():
+            return entries
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for file in files:
+                        if file.name.endswith(".tmp"):
+                            continue
+                        with contextlib.suppress(OSError):
+                            st = file.stat()
+                            entries.append(
+                                (st.st_mtime, Path(file.path), st.st_size)
+                            )
+        return entries
+
+    def evict(self, max_bytes: int | None = None) -> None:
+        """Remove least recently used entries until under `max_bytes`."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._scan(), key=lambda e: e[0])
+        total = sum(size for (_, _, size) in entries)
+        for _, path, size in entries:
+            if total <= limit:
+                break
+            with contextlib.suppress(OSError):
+                path.unlink()
+                total -= size
+        self._size = total
+
+    def clear(self) -> None:
+        self.evict(0)
@@ -1,8 +1,157 @@
 """CLI entry point for jsmn-forge-codegen."""
 
+from __future__ import annotations
 
-def main() -> None:
-    print("jsmn-forge-codegen")
+import argparse
+import contextlib
+import json
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from jsmn_forge import validate
+from jsmn_forge.bundle import InvalidConfigError, discover
+from jsmn_forge.loader import yaml
+from jsmn_forge.profile import profile
+from jsmn_forge.spec.openapi_3_1 import MergeStrategy, merge
+from jsmn_forge.watch import watch
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from jsmn_forge.profile import Profile
+    from jsmn_forge.spec.openapi_3_1 import MergeResult
+    from jsmn_forge.watch import Cycle
+
+
+def _report(cycle: Cycle, result: MergeResult) -> None:
+    merged = "all" if cycle.buckets is None else str(cycle.buckets)
+    print(
+        f"{len(cycle.changed)} changed, {merged} buckets merged, "
+        f"{cycle.conflicts} conflicts, {len(result.errors)} errors "
+        f"in {cycle.seconds * 1000:.1f} ms",
+        flush=True,
+    )
+
+
+def _watch(args: argparse.Namespace) -> None:
+    with contextlib.suppress(KeyboardInterrupt):
+        watch(
+            args.files,
+            scheme=args.scheme,
+            interval=args.interval,
+            report=_report,
+        )
+
+
+def _merge(args: argparse.Namespace) -> None:
+    result = merge(
+        *args.files,
+        scheme=args.scheme,
+        workers=args.workers,
+        strategy=args.strategy,
+    )
+    for error in result.errors:
+        print(f"{error.path}: not found", file=sys.stderr)
+    for conflict in result.conflicts:
+        print(
+            f"{conflict.file}: conflict at {conflict.location.to_pointer()}",
+            file=sys.stderr,
+        )
+    if args.out is None:
+        yaml.dump(result.value, sys.stdout)
+    else:
+        yaml.dump(result.value, args.out)
+
+
+def _validate(args: argparse.Namespace) -> None:
+    problems: list[validate.Problem] = []
+    try:
+        configs = discover(args.modules)
+    except InvalidConfigError as e:
+        (problems, configs) = (e.problems, e.configs)
+    files = [
+        spec
+        for cfg in configs
+        for res in cfg["resources"]
+        for spec in res["openapi"]
+    ]
+    problems += validate.files(files, workers=args.workers)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    print(f"{len(files)} documents, {len(problems)} problems", flush=True)
+    if problems:
+        sys.exit(1)
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="jsmn-forge-codegen")
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="write the time spent in each phase to FILE, as JSON",
+    )
+    commands = parser.add_subparsers(dest="command")
+    cmd = commands.add_parser("merge", help="merge specification files")
+    cmd.add_argument("files", nargs="+", type=Path)
+    cmd.add_argument("--scheme", default=None)
+    cmd.add_argument("--workers", type=int, default=None)
+    cmd.add_argument(
+        "--strategy",
+        type=MergeStrategy,
+        choices=list(MergeStrategy),
+        default=MergeStrategy.FOLD,
+    )
+    cmd.add_argument(
+        "-o",
+        "--out",
+        type=Path,
+        default=None,
+        help="write the merged document to OUT instead of stdout",
+    )
+    cmd.set_defaults(run=_merge)
+    cmd = commands.add_parser(
+        "watch",
+        help="merge specification files, again whenever one changes",
+    )
+    cmd.add_argument("files", nargs="+", type=Path)
+    cmd.add_argument("--scheme", default=None)
+    cmd.add_argument(
+        "--interval",
+        type=float,
+        default=0.25,
+        help="seconds between polls (default: %(default)s)",
+    )
+    cmd.set_defaults(run=_watch)
+    cmd = commands.add_parser(
+        "validate",
+        help="validate the configs and specifications of workspace modules",
+    )
+    cmd.add_argument("modules", nargs="+", type=Path)
+    cmd.add_argument("--workers", type=int, default=None)
+    cmd.set_defaults(run=_validate)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    args = parser().parse_args(argv)
+    if args.command is None:
+        parser().print_help()
+        return
+    if args.profile is None:
+        args.run(args)
+        return
+    # Reported when the command fails too, with the phases run until then
+    prof: Profile | None = None
+    try:
+        with profile() as prof:
+            args.run(args)
+    finally:
+        if prof is not None:
+            report = json.dumps(prof.report(), indent=2)
+            args.profile.write_text(report + "\n")
 
 
 if __name__ == "__main__":
@@ -1,173 +1,315 @@
-"""IR Descriptors — output of the flatten pass, input to codegen."""
-
-from dataclasses import dataclass
-from typing import Literal, NamedTuple
-
-# Number formats (integer + number types)
-NumberFormat = Literal[
-    "int8",
-    "int16",
-    "int32",
-    "int64",
-    "int128",
-    "uint8",
-    "uint16",
-    "uint32",
-    "uint64",
-    "uint128",
-    "float",
-    "double",
-]
-
-# String formats
-StringFormat = Literal[
-    "date",
-    "date-time",
-    "password",
-    "uuid",
-    "uri",
-    "email",
-    "hostname",
-    "ipv4",
-    "ipv6",
-]
-
-# Binary formats
-BinaryFormat = Literal["byte", "binary"]
-
-
-class Dim(NamedTuple):
-    """Array dimension — one level in a (possibly multi-dimensional) array.
-
-    Outer-to-inner order: dims[0] is the outermost array.
-    """
-
-    min: int
-    max: int
-
-
-class Bound(NamedTuple):
-    """Inclusive or exclusive bound for numeric range validation."""
-
-    value: float
-    exclusive: bool = False
-
-
-# ---------------------------------------------------------------------------
-# Field types — discriminated by `kind`. When `dims` is present, the field
-# is an array (possibly multi-dimensional) of the base type.
-# ---------------------------------------------------------------------------
-
-
-@dataclass
-class BoolType:
-    kind: Literal["bool"] = "bool"
-    dims: list[Dim] | None = None
-
-
-@dataclass
-class NullType:
-    kind: Literal["null"] = "null"
-    dims: list[Dim] | None = None
-
-
-@dataclass
-class NumberType:
-    format: NumberFormat
-    kind: Literal["number"] = "number"
-    minimum: Bound | None = None
-    maximum: Bound | None = None
-    dims: list[Dim] | None = None
-
-
-@dataclass
-class StringType:
-    max_length: int
-    kind: Literal["string"] = "string"
-    min_length: int | None = None
-    pattern: str | None = None
-    dims: list[Dim] | None = None
-
-
-@dataclass
-class RefType:
-    """Reference to another named descriptor."""
-
-    to: str
-    kind: Literal["ref"] = "ref"
-    dims: list[Dim] | None = None
-
-
-FieldType = BoolType | NullType | NumberType | StringType | RefType
-
-
-# ---------------------------------------------------------------------------
-# Field — a single field within an ObjectDescriptor
-# ---------------------------------------------------------------------------
-
-
-@dataclass
-class Field:
-    name: str
-    type: FieldType
-    required: bool
-
-
-# ---------------------------------------------------------------------------
-# Top-level descriptors — discriminated union, switch on `kind` to narrow
-# ---------------------------------------------------------------------------
-
-
-@dataclass
-class NullDescriptor:
-    name: str
-    kind: Literal["null"] = "null"
-
-
-@dataclass
-class BoolDescriptor:
-    name: str
-    kind: Literal["bool"] = "bool"
-
-
-@dataclass
-class NumberDescriptor:
-    name: str
-    format: NumberFormat
-    kind: Literal["number"] = "number"
-    minimum: Bound | None = None
-    maximum: Bound | None = None
-
-
-@dataclass
-class StringDescriptor:
-    name: str
-    max_length: int
-    kind: Literal["string"] = "string"
-    min_length: int | None = None
-    pattern: str | None = None
-
-
-@dataclass
-class ArrayDescriptor:
-    name: str
-    items: FieldType
-    dims: list[Dim]
-    kind: Literal["array"] = "array"
-
-
-@dataclass
-class ObjectDescriptor:
-    name: str
-    fields: list[Field]
-    kind: Literal["object"] = "object"
-
-
-Descriptor = (
-    NullDescriptor
-    | BoolDescriptor
-    | NumberDescriptor
-    | StringDescriptor
-    | ArrayDescriptor
-    | ObjectDescriptor
-)
+"""IR Descriptors — output of the flatten pass, input to codegen.
+
+IR values are immutable and hash-consed: constructing a value equal to a
+live one returns the live one, so equal values are the same object, and
+equality and hashing are by identity. Sequences are tuples, lists passed
+to a constructor are converted.
+"""
+
+import threading
+import weakref
+from collections.abc import Iterable
+from dataclasses import MISSING, dataclass
+from hashlib import blake2b
+from typing import Any, Literal, NamedTuple, Self
+
+# Number formats (integer + number types)
+NumberFormat = Literal[
+    "int8",
+    "int16",
+    "int32",
+    "int64",
+    "int128",
+    "uint8",
+    "uint16",
+    "uint32",
+    "uint64",
+    "uint128",
+    "float",
+    "double",
+]
+
+# String formats
+StringFormat = Literal[
+    "date",
+    "date-time",
+    "password",
+    "uuid",
+    "uri",
+    "email",
+    "hostname",
+    "ipv4",
+    "ipv6",
+]
+
+# Binary formats
+BinaryFormat = Literal["byte", "binary"]
+
+
+class Dim(NamedTuple):
+    """Array dimension — one level in a (possibly multi-dimensional) array.
+
+    Outer-to-inner order: dims[0] is the outermost array.
+    """
+
+    min: int
+    max: int
+
+
+class Bound(NamedTuple):
+    """Inclusive or exclusive bound for numeric range validation."""
+
+    value: float
+    exclusive: bool = False
+
+
+# ---------------------------------------------------------------------------
+# Hash-consing
+# ---------------------------------------------------------------------------
+
+# (class, *field values) -> the live value. Field values are IR values,
+# hashed by identity, or plain data, so a key hashes in time linear in the
+# number of fields. Plain data is keyed with its type (see `_typed`)
+_INTERNED: weakref.WeakValueDictionary[tuple[Any, ...], Any] = (
+    weakref.WeakValueDictionary()
+)
+# class -> (name, default) of its fields, in order
+_FIELDS: dict[type, tuple[tuple[str, Any], ...]] = {}
+# Free-threaded builds run codegen on threads (see `parallel.executor`)
+_LOCK = threading.Lock()
+
+
+# Types of field values keyed as they are, no value of another type is
+# equal to them: IR classes (see `_Interned`), str and None
+_PLAIN: set[type] = {str, type(None)}
+
+
+def _typed(values: Iterable[Any]) -> list[Any]:
+    """Keys of the field values `values`. 1, 1.0 and True are equal and
+    hash alike, but are different field values: plain data is keyed with
+    its type, tuples (ie: `Bound`, `Dim`) item by item."""
+    keys = []
+    for v in values:
+        t = type(v)
+        if t in _PLAIN:
+            keys.append(v)
+        elif not issubclass(t, tuple):
+            keys.append((t, v))
+        elif all(type(x) in _PLAIN for x in v):
+            # Already its own key (ie: the fields of an object)
+            keys.append((t, v))
+        else:
+            keys.append((t, tuple(_typed(v))))
+    return keys
+
+
+def _key(cls: type, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+    """Key of the value `cls(*args, **kwargs)`, None when it depends on
+    more than the arguments (or the call is invalid)."""
+    fields = _FIELDS.get(cls)
+    if fields is None:
+        found = vars(cls)["__dataclass_fields__"].values()
+        fields = _FIELDS[cls] = tuple((f.name, f.default) for f in found)
+    if not kwargs and len(args) == len(fields):
+        return (cls, *_typed(args))
+    rest = []
+    for name, default in fields[len(args) :]:
+        value = kwargs.pop(name, default)
+        if value is MISSING:
+            return None
+        rest.append(value)
+    return None if kwargs else (cls, *_typed((*args, *rest)))
+
+
+class _Interned(type):
+    def __init__(cls, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        _PLAIN.add(cls)
+
+    def __call__[T](cls: type[T], *args: Any, **kwargs: Any) -> T:
+        if list in map(type, (*args, *kwargs.values())):
+            # Sequences are tuples, a list (ie: `fields`, `dims`) is taken
+            # as one
+            args = tuple(tuple(v) if type(v) is list else v for v in args)
+            kwargs = {
+                k: tuple(v) if type(v) is list else v
+                for (k, v) in kwargs.items()
+            }
+        key = _key(cls, args, dict(kwargs))
+        interned: T | None = _INTERNED.get(key)
+        if interned is not None:
+            return interned
+        value = type.__call__(cls, *args, **kwargs)
+        if key is None:
+            fields = _FIELDS[cls]
+            key = (cls, *_typed(getattr(value, f) for (f, _) in fields))
+        with _LOCK:
+            interned = _INTERNED.setdefault(key, value)
+        return value if interned is None else interned
+
+
+class _Node(metaclass=_Interned):
+    """Base of IR values, see the module docstring."""
+
+    # _digest: see `digest`, set on first use
+    __slots__ = ("__weakref__", "_digest")
+    __dataclass_fields__: dict[str, Any]
+    _digest: bytes
+
+    def __reduce__(self) -> tuple[type[Self], tuple[Any, ...]]:
+        # Unpickle through the constructor, interning in the new process
+        fields = self.__dataclass_fields__
+        return (type(self), tuple(getattr(self, f) for f in fields))
+
+    def __copy__(self) -> Self:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Self:
+        return self
+
+
+def _part(value: Any) -> Any:
+    if isinstance(value, _Node):
+        return digest(value)
+    if isinstance(value, tuple):
+        # The type tells a `Bound` from a `Dim`
+        return (type(value).__name__, tuple(map(_part, value)))
+    return value
+
+
+def digest(value: _Node) -> bytes:
+    """Digest of the content of an IR value, the same in every process.
+
+    Built from the digests of the IR values in it, and kept by the value:
+    a value shared by many others, or by successive runs, is digested
+    once while it lives.
+    """
+    try:
+        return value._digest
+    except AttributeError:
+        pass
+    parts = [type(value).__name__]
+    parts += [_part(getattr(value, f)) for f in value.__dataclass_fields__]
+    found = blake2b(repr(parts).encode(), digest_size=16).digest()
+    object.__setattr__(value, "_digest", found)
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Field types — discriminated by `kind`. When `dims` is present, the field
+# is an array (possibly multi-dimensional) of the base type.
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BoolType(_Node):
+    kind: Literal["bool"] = "bool"
+    dims: tuple[Dim, ...] | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class NullType(_Node):
+    kind: Literal["null"] = "null"
+    dims: tuple[Dim, ...] | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class NumberType(_Node):
+    format: NumberFormat
+    kind: Literal["number"] = "number"
+    minimum: Bound | None = None
+    maximum: Bound | None = None
+    dims: tuple[Dim, ...] | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class StringType(_Node):
+    max_length: int
+    kind: Literal["string"] = "string"
+    min_length: int | None = None
+    pattern: str | None = None
+    dims: tuple[Dim, ...] | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class RefType(_Node):
+    """Reference to another named descriptor."""
+
+    to: str
+    kind: Literal["ref"] = "ref"
+    dims: tuple[Dim, ...] | None = None
+
+
+FieldType = BoolType | NullType | NumberType | StringType | RefType
+
+
+# ---------------------------------------------------------------------------
+# Field — a single field within an ObjectDescriptor
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Field(_Node):
+    name: str
+    type: FieldType
+    required: bool
+
+
+# ---------------------------------------------------------------------------
+# Top-level descriptors — discriminated union, switch on `kind` to narrow
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class NullDescriptor(_Node):
+    name: str
+    kind: Literal["null"] = "null"
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class BoolDescriptor(_Node):
+    name: str
+    kind: Literal["bool"] = "bool"
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class NumberDescriptor(_Node):
+    name: str
+    format: NumberFormat
+    kind: Literal["number"] = "number"
+    minimum: Bound | None = None
+    maximum: Bound | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class StringDescriptor(_Node):
+    name: str
+    max_length: int
+    kind: Literal["string"] = "string"
+    min_length: int | None = None
+    pattern: str | None = None
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ArrayDescriptor(_Node):
+    name: str
+    items: FieldType
+    dims: tuple[Dim, ...]
+    kind: Literal["array"] = "array"
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class ObjectDescriptor(_Node):
+    name: str
+    fields: tuple[Field, ...]
+    kind: Literal["object"] = "object"
+
+
+Descriptor = (
+    NullDescriptor
+    | BoolDescriptor
+    | NumberDescriptor
+    | StringDescriptor
+    | ArrayDescriptor
+    | ObjectDescriptor
+)
@@ -0,0 +1,224 @@
+"""Flatten pass, lowers component schemas to codegen descriptors"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any
+from urllib.parse import unquote
+
+from jsmn_forge.codegen import (
+    ArrayDescriptor,
+    BoolDescriptor,
+    BoolType,
+    Bound,
+    Dim,
+    Field,
+    NullDescriptor,
+    NullType,
+    NumberDescriptor,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringDescriptor,
+    StringType,
+)
+from jsmn_forge.spec.location import ROOT, Location
+from jsmn_forge.walk.digest import Digests, digest
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from jsmn_forge.codegen import Descriptor, FieldType
+
+# Format of a number schema without one
+_DEFAULT_FORMAT = {"integer": "int64", "number": "double"}
+
+
+class FlattenError(Exception):
+    """Raised for a schema with no descriptor, at `location` in the
+    schemas."""
+
+    def __init__(self, location: Location, message: str) -> None:
+        super().__init__(f"{location.to_pointer()}: {message}")
+        self.location = location
+
+
+def ref_name(ref: str) -> str:
+    """Descriptor name of the schema `ref` points to: the last segment of
+    its fragment, or the whole of a bare name (`$ref: thing`)."""
+    (_, sep, fragment) = ref.partition("#")
+    if not sep:
+        return ref
+    last = fragment.rsplit("/", 1)[-1]
+    return unquote(last).replace("~1", "/").replace("~0", "~")
+
+
+def _bound(schema: Mapping[str, Any], key: str) -> Bound | None:
+    exclusive = "exclusiveM" + key[1:]
+    if exclusive in schema:
+        return Bound(schema[exclusive], exclusive=True)
+    return Bound(schema[key]) if key in schema else None
+
+
+def _kind(schema: Any, loc: Location) -> str:
+    if not isinstance(schema, dict):
+        raise FlattenError(loc, "schema must be an object")
+    if "$ref" in schema:
+        return "$ref"
+    kind = schema.get("type", "object" if "properties" in schema else None)
+    if not isinstance(kind, str):
+        raise FlattenError(loc, f"unsupported type {kind!r}")
+    return kind
+
+
+def _number(schema: Mapping[str, Any], kind: str) -> dict[str, Any]:
+    return {
+        "format": schema.get("format", _DEFAULT_FORMAT[kind]),
+        "minimum": _bound(schema, "minimum"),
+        "maximum": _bound(schema, "maximum"),
+    }
+
+
+def _string(schema: Mapping[str, Any], loc: Location) -> dict[str, Any]:
+    if "maxLength" not in schema:
+        raise FlattenError(loc, "string without maxLength")
+    return {
+        "max_length": schema["maxLength"],
+        "min_length": schema.get("minLength"),
+        "pattern": schema.get("pattern"),
+    }
+
+
+class _Flattener:
+    def __init__(self, schemas: Mapping[str, Any], digests: Digests) -> None:
+        self.digests = digests
+        self.descriptors: list[Descriptor] = []
+        # Digest of a subschema -> its field type. Inline objects lower to
+        # a reference to their descriptor, so an inline object equal to a
+        # component, or to one lowered before, is not lowered again
+        self.types: dict[bytes, FieldType] = {}
+        # Fields of an object -> its descriptor name. IR values are
+        # interned, so objects lowering to the same fields, from schemas
+        # that differ (ie: in key order or descriptions), share a struct
+        self.structs: dict[tuple[Field, ...], str] = {}
+        digest(schemas, digests)
+        for name, schema in schemas.items():
+            key = digests.get(schema)
+            if key is not None and _kind(schema, ROOT.push(name)) == "object":
+                self.types.setdefault(key, RefType(name))
+
+    def field_type(self, schema: Any, name: str, loc: Location) -> FieldType:
+        """Field type of the subschema `schema`, lowered once per content.
+
+        `name` is what an inline object gets as a descriptor name.
+        """
+        key = self.digests.get(schema)
+        known = self.types.get(key) if key is not None else None
+        if known is None:
+            known = self._lower(schema, name, loc)
+            if key is not None:
+                self.types[key] = known
+        return known
+
+    def _lower(self, schema: Any, name: str, loc: Location) -> FieldType:
+        dims: list[Dim] = []
+        kind = _kind(schema, loc)
+        # Nested arrays are dimensions of their innermost items, outermost
+        # first
+        while kind == "array":
+            if "maxItems" not in schema or "items" not in schema:
+                raise FlattenError(loc, "array without maxItems or items")
+            dims.append(Dim(schema.get("minItems", 0), schema["maxItems"]))
+            (schema, loc) = (schema["items"], loc.push("items"))
+            kind = _kind(schema, loc)
+        if not dims:
+            return self._base(schema, kind, name, loc)
+        # Items are shared with every equal subschema, copy to set dims
+        return replace(self.field_type(schema, name, loc), dims=tuple(dims))
+
+    def _base(
+        self, schema: Any, kind: str, name: str, loc: Location
+    ) -> FieldType:
+        if kind == "$ref":
+            return RefType(ref_name(schema["$ref"]))
+        if kind == "object":
+            fields = self.fields(schema, name, loc)
+            known = self.structs.get(fields)
+            if known is None:
+                known = self.object(name, fields)
+            return RefType(known)
+        if kind in ("number", "integer"):
+            return NumberType(**_number(schema, kind))
+        if kind == "string":
+            return StringType(**_string(schema, loc))
+        if kind in ("bool", "boolean"):
+            return BoolType()
+        if kind == "null":
+            return NullType()
+        raise FlattenError(loc, f"unsupported type {kind!r}")
+
+    def fields(
+        self, schema: Mapping[str, Any], name: str, loc: Location
+    ) -> tuple[Field, ...]:
+        required = set(schema.get("required", ()))
+        loc = loc.push("properties")
+        return tuple(
+            Field(
+                key,
+                self.field_type(sub, f"{name}_{key}", loc.push(key)),
+                required=key in required,
+            )
+            for (key, sub) in schema.get("properties", {}).items()
+        )
+
+    def object(self, name: str, fields: tuple[Field, ...]) -> str:
+        self.structs.setdefault(fields, name)
+        # After its inline objects, which it depends on
+        self.descriptors.append(ObjectDescriptor(name, fields))
+        return name
+
+    def component(self, name: str, schema: Any) -> None:
+        loc = ROOT.push(name)
+        kind = _kind(schema, loc)
+        if kind == "object":
+            self.object(name, self.fields(schema, name, loc))
+        elif kind == "array":
+            items = self._lower(schema, f"{name}_items", loc)
+            dims = items.dims or ()
+            items = replace(items, dims=None)
+            self.descriptors.append(ArrayDescriptor(name, items, dims))
+        elif kind in ("number", "integer"):
+            self.descriptors.append(
+                NumberDescriptor(name, **_number(schema, kind))
+            )
+        elif kind == "string":
+            self.descriptors.append(
+                StringDescriptor(name, **_string(schema, loc))
+            )
+        elif kind in ("bool", "boolean"):
+            self.descriptors.append(BoolDescriptor(name))
+        elif kind == "null":
+            self.descriptors.append(NullDescriptor(name))
+        else:
+            raise FlattenError(loc, f"unsupported component {kind!r}")
+
+
+def flatten(
+    schemas: Mapping[str, Any], *, digests: Digests | None = None
+) -> list[Descriptor]:
+    """Descriptors of the component schemas `schemas` (the
+    `components.schemas` of a specification), by name.
+
+    Inline objects get a descriptor of their own, named after the object
+    and property holding them, and placed before it. Subschemas are
+    lowered once per distinct content: equal inline objects share one
+    descriptor, and an inline object equal to a component refers to it.
+    Inline objects lowering to the same fields as an object before them
+    share its descriptor too.
+    `digests` may hold the digests of a merge (see `walk.merge`), the
+    schemas are digested otherwise. Schemas must not be mutated meanwhile.
+    """
+    flattener = _Flattener(schemas, Digests() if digests is None else digests)
+    for name, schema in schemas.items():
+        flattener.component(name, schema)
+    return flattener.descriptors
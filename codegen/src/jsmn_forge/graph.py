@@ -0,0 +1,170 @@
+"""Dependency graph of IR descriptors, for incremental codegen"""
+
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import TYPE_CHECKING, NamedTuple
+
+from jsmn_forge.codegen import (
+    ArrayDescriptor,
+    ObjectDescriptor,
+    RefType,
+    digest,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from jsmn_forge.cache import Cache
+    from jsmn_forge.codegen import Descriptor, FieldType
+
+
+class DependencyError(Exception):
+    """Raised for a reference to an unknown descriptor, a name used twice,
+    or descriptors containing each other."""
+
+
+def dependencies(descriptor: Descriptor) -> list[str]:
+    """Names of the descriptors `descriptor` refers to, once each, in
+    field order."""
+    types: list[FieldType]
+    if isinstance(descriptor, ObjectDescriptor):
+        types = [field.type for field in descriptor.fields]
+    elif isinstance(descriptor, ArrayDescriptor):
+        types = [descriptor.items]
+    else:
+        return []
+    return list(dict.fromkeys(t.to for t in types if isinstance(t, RefType)))
+
+
+def _order(edges: dict[str, list[str]]) -> list[str]:
+    """Names in dependency order, else in `edges` order."""
+    order: list[str] = []
+    # name -> True once ordered, False while its dependencies are
+    done: dict[str, bool] = {}
+    for start, first in edges.items():
+        if start in done:
+            continue
+        done[start] = False
+        stack = [(start, iter(first))]
+        while stack:
+            (name, deps) = stack[-1]
+            dep = next(deps, None)
+            if dep is None:
+                stack.pop()
+                done[name] = True
+                order.append(name)
+            elif dep not in edges:
+                msg = f"{name} refers to unknown descriptor {dep}"
+                raise DependencyError(msg)
+            elif dep not in done:
+                done[dep] = False
+                stack.append((dep, iter(edges[dep])))
+            elif not done[dep]:
+                cycle = [n for (n, _) in stack]
+                cycle = [*cycle[cycle.index(dep) :], dep]
+                raise DependencyError(f"cycle: {' -> '.join(cycle)}")
+    return order
+
+
+class Graph:
+    """Descriptors in dependency order, with a fingerprint each.
+
+    The fingerprint of a descriptor digests the descriptor and the
+    fingerprints of its dependencies, so it changes whenever anything the
+    descriptor transitively depends on does.
+    """
+
+    def __init__(self, descriptors: Iterable[Descriptor]) -> None:
+        self.descriptors: dict[str, Descriptor] = {}
+        for descriptor in descriptors:
+            if descriptor.name in self.descriptors:
+                msg = f"duplicate descriptor {descriptor.name}"
+                raise DependencyError(msg)
+            self.descriptors[descriptor.name] = descriptor
+        self.edges = {
+            name: dependencies(d) for (name, d) in self.descriptors.items()
+        }
+        # Dependencies before their dependents, else in input order
+        self.order = _order(self.edges)
+        self.fingerprints: dict[str, bytes] = {}
+        for name in self.order:
+            h = blake2b(digest(self.descriptors[name]), digest_size=16)
+            for dep in self.edges[name]:
+                h.update(self.fingerprints[dep])
+            self.fingerprints[name] = h.digest()
+        # name -> descriptors depending on it directly
+        self.users: dict[str, list[str]] = {}
+        for user, deps in self.edges.items():
+            for dep in deps:
+                self.users.setdefault(dep, []).append(user)
+
+    def dependents(self, name: str) -> set[str]:
+        """Descriptors depending on `name`, transitively."""
+        out: set[str] = set()
+        stack = [name]
+        while stack:
+            for user in self.users.get(stack.pop(), ()):
+                if user not in out:
+                    out.add(user)
+                    stack.append(user)
+        return out
+
+
+class Run(NamedTuple):
+    # Output of every descriptor, in dependency order
+    outputs: list[str]
+    # Descriptors `emit` was called for, the others were reused from the
+    # previous run or the cache
+    emitted: list[str]
+
+
+class IncrementalEmitter:
+    """Per descriptor output of `emit`, kept by fingerprint.
+
+    A run only calls `emit` for descriptors whose fingerprint changed
+    since the previous run (see `Graph`), or that are not in `cache`.
+    `namespace` names the emitter and its version in the cache, bump it
+    whenever `emit` changes its output.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[Descriptor], str],
+        *,
+        namespace: str,
+        cache: Cache | None = None,
+    ) -> None:
+        self.emit = emit
+        self.namespace = namespace
+        self.cache = cache
+        # name -> (fingerprint, output) of the previous run
+        self.outputs: dict[str, tuple[bytes, str]] = {}
+
+    def _cached(self, fingerprint: bytes) -> str | None:
+        if self.cache is None:
+            return None
+        key = self.cache.key(fingerprint, self.namespace)
+        (hit, output) = self.cache.get(key)
+        return output if hit and isinstance(output, str) else None
+
+    def run(self, graph: Graph) -> Run:
+        """Outputs of the descriptors of `graph`."""
+        outputs: dict[str, tuple[bytes, str]] = {}
+        emitted: list[str] = []
+        for name in graph.order:
+            fingerprint = graph.fingerprints[name]
+            known = self.outputs.get(name)
+            if known is not None and known[0] == fingerprint:
+                outputs[name] = known
+                continue
+            output = self._cached(fingerprint)
+            if output is None:
+                output = self.emit(graph.descriptors[name])
+                emitted.append(name)
+                if self.cache is not None:
+                    key = self.cache.key(fingerprint, self.namespace)
+                    self.cache.put(key, output)
+            outputs[name] = (fingerprint, output)
+        self.outputs = outputs
+        return Run([output for (_, output) in outputs.values()], emitted)
@@ -0,0 +1,100 @@
+"""Document loaders, chosen by file extension and content"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from ruamel.yaml import YAML
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping
+
+# Parse the bytes of a document
+type Load = Callable[[bytes], Any]
+
+# safe yaml loader, on libyaml (ruamel.yaml.clib) when it is installed and
+# pure Python otherwise
+yaml = YAML(typ="safe")
+# Dumps in block style, keys in insertion order, like hand written
+# documents
+yaml.default_flow_style = False
+yaml.sort_base_mapping_type_on_output = False  # type: ignore[assignment]
+
+# safe yaml loader, always pure Python
+yaml_pure = YAML(typ="safe", pure=True)
+
+# True when `yaml` parses in C
+accelerated = yaml.Parser is not yaml_pure.Parser
+
+LOADERS: dict[str, Load] = {
+    "json": json.loads,
+    "yaml": yaml.load,
+    "yaml-pure": yaml_pure.load,
+}
+
+# Format of a file by extension, anything else is sniffed
+SUFFIXES: dict[str, str] = {
+    ".json": "json",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+}
+
+# JSON is (nearly) a subset of YAML 1.2, a JSON document can always fall
+# back to the YAML loader
+_FALLBACK = {"json": "yaml"}
+
+# Whitespace JSON allows before the top level value
+_WHITESPACE = b" \t\r\n"
+
+
+def register(name: str, load: Load, *suffixes: str) -> None:
+    """Add (or replace) the loader `name`, used for files with `suffixes`."""
+    LOADERS[name] = load
+    for suffix in suffixes:
+        SUFFIXES[suffix] = name
+
+
+def formats(data: bytes, suffix: str = "") -> list[str]:
+    """Loaders to try for `data`, in order.
+
+    By `suffix` when it is registered. YAML files whose first character
+    opens a JSON object or array are often machine generated JSON, the
+    much faster JSON loader is tried first.
+    """
+    name = SUFFIXES.get(suffix.lower(), "yaml")
+    if name == "yaml" and data.lstrip(_WHITESPACE)[:1] in (b"{", b"["):
+        name = "json"
+    out = [name]
+    while name in _FALLBACK:
+        name = _FALLBACK[name]
+        out.append(name)
+    return out
+
+
+def load(
+    source: Path | bytes,
+    *,
+    suffix: str = "",
+    loaders: Mapping[str, Load] | None = None,
+) -> Any:
+    """Load a document from a file, or from bytes named like `suffix`.
+
+    `loaders` replaces the registry, ie: with loaders that normalize as
+    they parse. A loader that fails with ValueError (like a JSON decode
+    error) hands over to the next format, the last one raises.
+    """
+    if isinstance(source, Path):
+        (data, suffix) = (source.read_bytes(), suffix or source.suffix)
+    else:
+        data = source
+    if loaders is None:
+        loaders = LOADERS
+    (*first, last) = formats(data, suffix)
+    for name in first:
+        try:
+            return loaders[name](data)
+        except ValueError:
+            continue
+    return loaders[last](data)
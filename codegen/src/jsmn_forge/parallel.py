@@ -0,0 +1,50 @@
+"""Worker pool helpers for the embarrassingly parallel pipeline stages"""
+
+from __future__ import annotations
+
+import multiprocessing
+import sys
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+
+def free_threaded() -> bool:
+    """True when running on a free-threaded (no GIL) interpreter."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def executor(workers: int) -> Executor:
+    """Thread pool on free-threaded builds, process pool otherwise."""
+    if free_threaded():
+        return ThreadPoolExecutor(max_workers=workers)
+    # fork() is unsafe once the parent has threads (ie: a previous pool)
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else None
+    context = multiprocessing.get_context(method)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def map_ordered[T, R](
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    workers: int | None = None,
+) -> list[R]:
+    """Map `fn` over `items`, results in input order.
+
+    Runs serially when `workers` is None or less than two, or when there
+    is not enough work to amortize starting a pool. With a process pool
+    `fn`, the items and the results must be picklable.
+    """
+    if workers is None or workers < 2 or len(items) < 2:
+        return [fn(item) for item in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    with executor(workers) as pool:
+        return list(pool.map(fn, items, chunksize=chunksize))
@@ -0,0 +1,158 @@
+"""Optional timing of the pipeline phases"""
+
+from __future__ import annotations
+
+import contextlib
+import time
+from typing import TYPE_CHECKING, Any, Self
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from types import TracebackType
+
+
+def nodes(obj: Any) -> int:
+    """Number of values in a loaded document, containers included."""
+    n = 0
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        n += 1
+        if isinstance(value, dict):
+            stack += value.values()
+        elif isinstance(value, list):
+            stack += value
+    return n
+
+
+class Span:
+    """Wall time of one run of a phase, optionally for one file."""
+
+    __slots__ = ("_profile", "file", "nodes", "phase", "seconds", "start")
+
+    def __init__(self, profile: Profile, phase: str, file: Path | None) -> None:
+        self._profile = profile
+        self.phase = phase
+        self.file = file
+        self.start = 0.0
+        self.seconds = 0.0
+        self.nodes: int | None = None
+
+    def __enter__(self) -> Self:
+        self.start = time.perf_counter() - self._profile.start
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        end = time.perf_counter() - self._profile.start
+        self.seconds = end - self.start
+        self._profile.spans.append(self)
+
+    def count(self, obj: Any) -> None:
+        """Record the node count of `obj`, the output of the phase. Call
+        it once the phase is over, the count is not part of its time."""
+        self.nodes = nodes(obj)
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "phase": self.phase,
+            "file": None if self.file is None else str(self.file),
+            "start": self.start,
+            "seconds": self.seconds,
+            "nodes": self.nodes,
+        }
+
+
+class _NoSpan:
+    """The span of a phase while nothing is profiled, does nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        return None
+
+    def count(self, obj: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Profile:
+    """Spans recorded while the profile is active (see `profile`)."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.spans: list[Span] = []
+
+    def phases(self) -> dict[str, dict[str, Any]]:
+        """Total seconds, runs and nodes of each phase, in first run order."""
+        out: dict[str, dict[str, Any]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            entry = out.setdefault(
+                span.phase, {"seconds": 0.0, "runs": 0, "nodes": None}
+            )
+            entry["seconds"] += span.seconds
+            entry["runs"] += 1
+            if span.nodes is not None:
+                entry["nodes"] = (entry["nodes"] or 0) + span.nodes
+        return out
+
+    def files(self) -> dict[str, dict[str, float]]:
+        """Seconds of each phase, per file."""
+        out: dict[str, dict[str, float]] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            if span.file is not None:
+                phases = out.setdefault(str(span.file), {})
+                phases[span.phase] = phases.get(span.phase, 0.0) + span.seconds
+        return out
+
+    def report(self) -> dict[str, Any]:
+        """JSON serializable summary and spans."""
+        return {
+            "seconds": self.seconds,
+            "phases": self.phases(),
+            "files": self.files(),
+            "spans": [
+                s.report() for s in sorted(self.spans, key=lambda s: s.start)
+            ],
+        }
+
+
+# Profile spans are recorded to. A plain global rather than a context
+# variable, so that phases run on worker threads are recorded too
+_active: Profile | None = None
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[Profile]:
+    """Record the phases run in the block. Nested profiles each get the
+    phases run while they are the innermost one."""
+    global _active  # noqa: PLW0603
+    (outer, current) = (_active, Profile())
+    _active = current
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - current.start
+        _active = outer
+
+
+def phase(name: str, file: Path | None = None) -> Span | _NoSpan:
+    """Context manager timing a phase, for `file` when it is per file.
+
+    Costs a global lookup while nothing is profiled. Phases run in other
+    processes are not recorded.
+    """
+    if _active is None:
+        return _NO_SPAN
+    return Span(_active, name, file)
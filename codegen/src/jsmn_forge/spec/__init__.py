@@ -1,29 +1,40 @@
-from .behavior import SortKey, canonical, identity_key, sort_set, sort_set_by
-from .diff import (
-    Diff,
-    Extra,
-    Missing,
-    MissMatch,
-    diff,
-    extra,
-    missing,
-    missmatch,
-)
-from .openapi_3_1 import merge
-
-__all__ = [
-    "Diff",
-    "Extra",
-    "MissMatch",
-    "Missing",
-    "SortKey",
-    "canonical",
-    "diff",
-    "extra",
-    "identity_key",
-    "merge",
-    "missing",
-    "missmatch",
-    "sort_set",
-    "sort_set_by",
-]
+from .behavior import (
+    SortKey,
+    canonical,
+    canonical_scope,
+    identity_key,
+    sort_set,
+    sort_set_by,
+)
+from .diff import (
+    Diff,
+    Extra,
+    Missing,
+    MissMatch,
+    diff,
+    extra,
+    iter_diff,
+    missing,
+    missmatch,
+)
+from .openapi_3_1 import MergeStrategy, merge
+
+__all__ = [
+    "Diff",
+    "Extra",
+    "MergeStrategy",
+    "MissMatch",
+    "Missing",
+    "SortKey",
+    "canonical",
+    "canonical_scope",
+    "diff",
+    "extra",
+    "identity_key",
+    "iter_diff",
+    "merge",
+    "missing",
+    "missmatch",
+    "sort_set",
+    "sort_set_by",
+]
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .behavior import SortKey
+    from .node import Behavior, ConflictPolicy, Node
+
+
+class Automaton:
+    """A node graph compiled into flat transition tables.
+
+    Every node reachable from the root is a state, every distinct
+    (state, Behavior) pair a transition can produce is an edge. Walkers
+    carry an edge (the equivalent of a `(Node, Behavior)` context) and
+    step with a dict lookup instead of a `Node.child` call:
+
+        e = table[s].get(key)
+        if e is None:
+            e = extension[s] if extension[s] >= 0 and key.startswith("x-")
+            else default[s]
+
+    Indexed by state: `nodes`, `opaque`, `table`, `default`, `extension`
+    (-1 when the node has no x-* rule). Indexed by edge: `target`,
+    `behavior`, `sort_key`, `policy`.
+    """
+
+    __slots__ = (
+        "behavior",
+        "default",
+        "extension",
+        "nodes",
+        "opaque",
+        "policy",
+        "sort_key",
+        "table",
+        "target",
+    )
+
+    def __init__(self) -> None:
+        self.nodes: list[Node] = []
+        self.opaque: list[bool] = []
+        self.table: list[dict[str, int]] = []
+        self.default: list[int] = []
+        self.extension: list[int] = []
+        self.target: list[int] = []
+        self.behavior: list[Behavior] = []
+        self.sort_key: list[SortKey | None] = []
+        self.policy: list[ConflictPolicy] = []
+
+    def step(self, state: int, prop: str) -> int:
+        """Edge taken from `state` on `prop`, same as `Node.child`."""
+        edge = self.table[state].get(prop)
+        if edge is not None:
+            return edge
+        ext = self.extension[state]
+        if ext >= 0 and prop.startswith("x-"):
+            return ext
+        return self.default[state]
+
+    def context(self, edge: int) -> tuple[Node, Behavior]:
+        return (self.nodes[self.target[edge]], self.behavior[edge])
+
+
+# Roots kept compiled. Walkers share a handful, a long running process
+# (ie: watch mode) must not keep every context it ever compiled
+MAX_GRAPHS = 64
+
+
+@lru_cache(maxsize=MAX_GRAPHS)
+def compile_graph(context: tuple[Node, Behavior]) -> tuple[Automaton, int]:
+    """Compile the graph reachable from `context`. Returns the automaton
+    and the edge for `context` itself.
+
+    Compiled once per root and cached. Nodes must not change once
+    compiled: `configure` clears the cache, but changing a table passed
+    to `configure` in place is not seen.
+    """
+    auto = Automaton()
+    states: dict[Node, int] = {}
+    edges: dict[tuple[int, Behavior], int] = {}
+    pending: list[int] = []
+
+    def state_of(node: Node) -> int:
+        s = states.get(node)
+        if s is None:
+            s = states[node] = len(auto.nodes)
+            auto.nodes.append(node)
+            auto.opaque.append(node.opaque)
+            auto.table.append({})
+            auto.default.append(-1)
+            auto.extension.append(-1)
+            pending.append(s)
+        return s
+
+    def edge_of(ctx: tuple[Node, Behavior]) -> int:
+        (node, behavior) = ctx
+        key = (state_of(node), behavior)
+        e = edges.get(key)
+        if e is None:
+            e = edges[key] = len(auto.target)
+            auto.target.append(key[0])
+            auto.behavior.append(behavior)
+            auto.sort_key.append(behavior.sort_key)
+            auto.policy.append(behavior.conflict_policy)
+        return e
+
+    root = edge_of(context)
+    while pending:
+        s = pending.pop()
+        (keys, default, extensions) = auto.nodes[s].transitions()
+        auto.default[s] = edge_of(default)
+        if extensions is not None:
+            auto.extension[s] = edge_of(extensions)
+        # x-* props never reach the table when an extension rule exists
+        auto.table[s] = {
+            prop: edge_of(ctx)
+            for prop, ctx in keys.items()
+            if extensions is None or not prop.startswith("x-")
+        }
+    return (auto, root)
@@ -1,34 +1,134 @@
-import json
-from collections.abc import Callable
-from typing import Any
-
-SortKey = Callable[[Any], str]
-
-
-def canonical(x: Any) -> str:
-    """Canonical sort key for any JSON value."""
-    return json.dumps(x, sort_keys=True)
-
-
-def identity_key(*fields: str) -> SortKey:
-    """Create a sort key from identity fields of a dict."""
-    def key(x: Any) -> str:
-        if isinstance(x, dict):
-            return "\x00".join(x.get(f, "") for f in fields)
-        return canonical(x)
-    return key
-
-
-def sort_set(arr: list) -> list:
-    """Canonical sort for set-like arrays.
-
-    Handles primitives, objects, mixed types.
-    For: required, enum, type, tags, examples,
-    allOf, oneOf, anyOf, security."""
-    return sorted(arr, key=canonical)
-
-
-def sort_set_by(arr: list[dict], *keys: str) -> list[dict]:
-    """Sort object arrays by identity key fields.
-    For: parameters (name, in)."""
-    return sorted(arr, key=identity_key(*keys))
+import json
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+SortKey = Callable[[Any], str]
+
+# id -> (container, key). The container is held so its id is not reused
+_Memo = dict[int, tuple[Any, str]]
+
+_CONTAINERS = (dict, list)
+
+# json.dumps builds a new encoder per call when given any option
+_encode = json.JSONEncoder(sort_keys=True).encode
+
+_memo: ContextVar[_Memo | None] = ContextVar("canonical_memo", default=None)
+
+
+def _json_key(key: Any) -> str:
+    # json.dumps writes non string keys as their JSON text, quoted
+    return _encode(key if isinstance(key, str) else _encode(key))
+
+
+def _join(
+    x: Any,
+    *,
+    leaf: Callable[[Any], str],
+    key: Callable[[Any], str],
+    sort_keys: bool,
+) -> str:
+    """Text of the container `x` with an explicit stack, as `json.dumps`
+    or `repr` would write it, for values nested deeper than the recursion
+    limit."""
+    out: list[str] = []
+    # (value, None) to write, or (None, text) to write as is
+    stack: list[tuple[Any, str | None]] = [(x, None)]
+    while stack:
+        (value, text) = stack.pop()
+        if text is not None:
+            out.append(text)
+        elif isinstance(value, dict):
+            todo: list[tuple[Any, str | None]] = [(None, "{")]
+            for i, k in enumerate(sorted(value) if sort_keys else value):
+                sep = ", " if i else ""
+                todo += [(None, f"{sep}{key(k)}: "), (value[k], None)]
+            todo.append((None, "}"))
+            stack += reversed(todo)
+        elif isinstance(value, list):
+            todo = [(None, "[")]
+            for i, item in enumerate(value):
+                todo += [(None, ", ")] if i else []
+                todo.append((item, None))
+            todo.append((None, "]"))
+            stack += reversed(todo)
+        else:
+            out.append(leaf(value))
+    return "".join(out)
+
+
+def _dumps(x: Any) -> str:
+    try:
+        return _encode(x)
+    except RecursionError:
+        return _join(x, leaf=_encode, key=_json_key, sort_keys=True)
+
+
+@contextmanager
+def canonical_scope() -> Iterator[None]:
+    """Memoize `canonical` keys of containers for the duration.
+
+    A container's key is computed once, however many times the container
+    is sorted or compared (ie: by every merge of a fold). Containers must
+    not be mutated while the scope is active. Nested scopes share the
+    outermost memo.
+    """
+    if _memo.get() is not None:
+        yield
+        return
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+def canonical(x: Any) -> str:
+    """Canonical sort key for any JSON value.
+
+    Same as `json.dumps(x, sort_keys=True)`. Inside `canonical_scope`,
+    keys of containers are memoized.
+    """
+    memo = _memo.get()
+    if memo is None or not isinstance(x, _CONTAINERS):
+        return _dumps(x)
+    hit = memo.get(id(x))
+    if hit is not None:
+        return hit[1]
+    key = _dumps(x)
+    memo[id(x)] = (x, key)
+    return key
+
+
+def text(x: Any) -> str:
+    """Sort key of a set-like array of strings, same as `str(x)`, also for
+    containers nested deeper than the recursion limit."""
+    try:
+        return str(x)
+    except RecursionError:
+        return _join(x, leaf=repr, key=repr, sort_keys=False)
+
+
+def identity_key(*fields: str) -> SortKey:
+    """Create a sort key from identity fields of a dict."""
+    def key(x: Any) -> str:
+        if isinstance(x, dict):
+            return "\x00".join(x.get(f, "") for f in fields)
+        return canonical(x)
+    return key
+
+
+def sort_set(arr: list) -> list:
+    """Canonical sort for set-like arrays.
+
+    Handles primitives, objects, mixed types.
+    For: required, enum, type, tags, examples,
+    allOf, oneOf, anyOf, security."""
+    return sorted(arr, key=canonical)
+
+
+def sort_set_by(arr: list[dict], *keys: str) -> list[dict]:
+    """Sort object arrays by identity key fields.
+    For: parameters (name, in)."""
+    return sorted(arr, key=identity_key(*keys))
@@ -1,71 +1,176 @@
-from dataclasses import dataclass
-from typing import Any
-
-from .location import ROOT, Location
-
-
-@dataclass
-class Missing:
-    value: Any
-
-
-@dataclass
-class Extra:
-    value: Any
-
-
-@dataclass
-class MissMatch:
-    self: Any
-    other: Any
-
-
-type Diff = Missing | Extra | MissMatch
-
-
-def _filter_diff[D: Diff](
-    diffs: dict[Location, Diff],
-    cls: type[D],
-) -> dict[Location, D]:
-    return {loc: d for loc, d in diffs.items() if isinstance(d, cls)}
-
-
-def missing(diffs: dict[Location, Diff]) -> dict[Location, Missing]:
-    return _filter_diff(diffs, Missing)
-
-
-def extra(diffs: dict[Location, Diff]) -> dict[Location, Extra]:
-    return _filter_diff(diffs, Extra)
-
-
-def missmatch(diffs: dict[Location, Diff]) -> dict[Location, MissMatch]:
-    return _filter_diff(diffs, MissMatch)
-
-
-def diff(a: Any, b: Any, loc: Location = ROOT) -> dict[Location, Diff]:
-    ret: dict[Location, Diff] = {}
-    if isinstance(a, dict) and isinstance(b, dict):
-        for k in (*a, *(k for k in b if k not in a)):
-            key: Location = loc.push(k)
-            if k not in b:
-                ret[key] = Missing(a[k])
-            elif k not in a:
-                ret[key] = Extra(b[k])
-            else:
-                nested = diff(a[k], b[k], key)
-                if nested:
-                    ret |= nested
-        return ret
-    elif isinstance(a, list) and isinstance(b, list):
-        n = min(len(a), len(b))
-        for i in range(n):
-            nested = diff(a[i], b[i], loc.push(str(i)))
-            if nested:
-                ret |= nested
-        ret |= {loc.push(str(i)): Missing(a[i]) for i in range(n, len(a))}
-        ret |= {loc.push(str(i)): Extra(b[i]) for i in range(n, len(b))}
-        return ret
-    elif a != b:
-        return {loc: MissMatch(a, b)}
-    else:
-        return {}
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, cast
+
+from .automaton import Automaton, compile_graph
+from .location import ROOT, Location
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from jsmn_forge.walk.digest import Digests
+
+    from .behavior import SortKey
+    from .node import Behavior, Node
+
+
+@dataclass
+class Missing:
+    value: Any
+
+
+@dataclass
+class Extra:
+    value: Any
+
+
+@dataclass
+class MissMatch:
+    self: Any
+    other: Any
+
+
+type Diff = Missing | Extra | MissMatch
+
+
+# Marks a stack entry holding a finished Diff rather than two values
+_EMIT: Any = object()
+
+# (a, b, location, automaton edge) or (_EMIT, diff, location, -1)
+type _Entry = tuple[Any, Any, Location, int]
+
+type Diffs = Mapping[Location, Diff] | Iterable[tuple[Location, Diff]]
+
+
+def _filter_diff[D: Diff](diffs: Diffs, cls: type[D]) -> dict[Location, D]:
+    # isinstance narrows the Iterable of pairs to a Mapping of them too
+    items = (
+        cast("Mapping[Location, Diff]", diffs).items()
+        if isinstance(diffs, Mapping)
+        else diffs
+    )
+    return {loc: d for loc, d in items if isinstance(d, cls)}
+
+
+def missing(diffs: Diffs) -> dict[Location, Missing]:
+    return _filter_diff(diffs, Missing)
+
+
+def extra(diffs: Diffs) -> dict[Location, Extra]:
+    return _filter_diff(diffs, Extra)
+
+
+def missmatch(diffs: Diffs) -> dict[Location, MissMatch]:
+    return _filter_diff(diffs, MissMatch)
+
+
+def _children(
+    a: Any,
+    b: Any,
+    loc: Location,
+    auto: Automaton | None,
+    edge: int,
+) -> list[_Entry] | None:
+    """Pairs to compare (or finished diffs) below `loc` in document order,
+    None when `a` and `b` are not containers of the same kind."""
+    children: list[_Entry] = []
+    if isinstance(a, dict) and isinstance(b, dict):
+        state = -1 if auto is None else auto.target[edge]
+        for k, v in a.items():
+            if k in b:
+                e = -1 if auto is None else auto.step(state, k)
+                children.append((v, b[k], loc.push(k), e))
+            else:
+                children.append((_EMIT, Missing(v), loc.push(k), -1))
+        for k, v in b.items():
+            if k not in a:
+                children.append((_EMIT, Extra(v), loc.push(k), -1))
+        return children
+    if isinstance(a, list) and isinstance(b, list):
+        sort_key = None if auto is None else auto.sort_key[edge]
+        if sort_key is not None:
+            return _set_children(a, b, loc, sort_key, edge)
+        n = min(len(a), len(b))
+        for i in range(n):
+            children.append((a[i], b[i], loc.push(str(i)), edge))
+        for i in range(n, len(a)):
+            children.append((_EMIT, Missing(a[i]), loc.push(str(i)), -1))
+        for i in range(n, len(b)):
+            children.append((_EMIT, Extra(b[i]), loc.push(str(i)), -1))
+        return children
+    return None
+
+
+def _set_children(
+    a: list[Any],
+    b: list[Any],
+    loc: Location,
+    sort_key: SortKey,
+    edge: int,
+) -> list[_Entry]:
+    """Members of set-like arrays, matched by sort key (the location
+    segment) rather than by position."""
+    # NOTE like merge, the last of several members sharing a key wins
+    theirs = {sort_key(x): x for x in b}
+    ours = {sort_key(x): x for x in a}
+    children: list[_Entry] = []
+    for k, v in ours.items():
+        if k in theirs:
+            children.append((v, theirs[k], loc.push(k), edge))
+        else:
+            children.append((_EMIT, Missing(v), loc.push(k), -1))
+    for k, v in theirs.items():
+        if k not in ours:
+            children.append((_EMIT, Extra(v), loc.push(k), -1))
+    return children
+
+
+def iter_diff(
+    a: Any,
+    b: Any,
+    loc: Location = ROOT,
+    *,
+    context: tuple[Node, Behavior] | None = None,
+    digests: Digests | None = None,
+) -> Iterator[tuple[Location, Diff]]:
+    """Differences from `a` to `b`, lazily, in document order.
+
+    Nothing is kept beyond the pending siblings along the current path,
+    so callers may stop early (ie: `next(iter_diff(a, b), None) is None`
+    for equality). With `digests`, subtrees known identical by digest
+    are skipped.
+
+    With `context` (as for `normalize`), members of set-like arrays are
+    matched by sort key instead of position, so an insertion is one
+    Extra rather than a MissMatch for every later member. Their
+    location segment is the sort key.
+    """
+    (auto, edge) = (None, -1) if context is None else compile_graph(context)
+    stack: list[_Entry] = [(a, b, loc, edge)]
+    while stack:
+        (a, b, loc, edge) = stack.pop()
+        if a is _EMIT:
+            yield (loc, b)
+            continue
+        if a is b or (digests is not None and digests.same(a, b)):
+            continue
+        children = _children(a, b, loc, auto, edge)
+        if children is not None:
+            children.reverse()
+            stack += children
+        elif a != b:
+            yield (loc, MissMatch(a, b))
+
+
+def diff(
+    a: Any,
+    b: Any,
+    loc: Location = ROOT,
+    *,
+    context: tuple[Node, Behavior] | None = None,
+    digests: Digests | None = None,
+) -> dict[Location, Diff]:
+    """Differences from `a` to `b`, keyed by location (see `iter_diff`)."""
+    return dict(iter_diff(a, b, loc, context=context, digests=digests))
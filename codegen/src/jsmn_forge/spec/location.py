@@ -1,19 +1,58 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import TYPE_CHECKING, Any, overload
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
 
-class Location(tuple):
-    """Document location as a tuple of path segments.
+
+class Location:
+    """Document location as a sequence of path segments.
+
+    A persistent parent-pointer list: `push` is O(1) and shares the
+    parent, the segment tuple is only built when the location is
+    inspected (compared, hashed, iterated, ...), then kept. Equal and
+    hash equal to the tuple of its segments, so tuples and Locations
+    are interchangeable as dict keys.
 
     Convertible to/from JSON Pointer (RFC 6901).
     """
 
+    __slots__ = ("_key", "_len", "_parent", "_segments")
+
+    def __init__(self, segments: Iterable[str] = ()) -> None:
+        self._parent: Location | None = None
+        self._key = ""
+        self._segments: tuple[str, ...] | None = tuple(segments)
+        self._len = len(self._segments)
+
+    def push(self, key: str) -> Location:
+        child = Location.__new__(Location)
+        child._parent = self
+        child._key = key
+        child._segments = None
+        child._len = self._len + 1
+        return child
+
+    def segments(self) -> tuple[str, ...]:
+        """The segments as a tuple, built once."""
+        if self._segments is not None:
+            return self._segments
+        keys: list[str] = []
+        node: Location = self
+        while node._segments is None:
+            keys.append(node._key)
+            assert node._parent is not None
+            node = node._parent
+        keys.reverse()
+        self._segments = (*node._segments, *keys)
+        return self._segments
+
     def to_pointer(self) -> str:
-        if not self:
+        if not self._len:
             return ""
         return "/" + "/".join(
-            s.replace("~", "~0").replace("/", "~1") for s in self
+            s.replace("~", "~0").replace("/", "~1") for s in self.segments()
         )
 
     @classmethod
@@ -23,14 +62,76 @@ class Location(tuple):
         segments = pointer.lstrip("/").split("/")
         return cls(s.replace("~1", "/").replace("~0", "~") for s in segments)
 
-    def push(self, key: str) -> Location:
-        return Location((*self, key))
-
     def resolve(self, doc: Any) -> Any:
         node = doc
-        for key in self:
-            node = node[key]
+        for key in self.segments():
+            node = node[int(key)] if isinstance(node, list) else node[key]
         return node
 
+    # Tuple protocol
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.segments())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.segments()
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+    @overload
+    def __getitem__(self, index: slice) -> tuple[str, ...]: ...
+    def __getitem__(self, index: int | slice) -> str | tuple[str, ...]:
+        return self.segments()[index]
+
+    def __hash__(self) -> int:
+        return hash(self.segments())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Location):
+            if self is other:
+                return True
+            if self._len != other._len:
+                return False
+            return self.segments() == other.segments()
+        if isinstance(other, tuple):
+            return self.segments() == other
+        return NotImplemented
+
+    def __lt__(self, other: object) -> bool:
+        o = _segments(other)
+        return NotImplemented if o is None else self.segments() < o
+
+    def __le__(self, other: object) -> bool:
+        o = _segments(other)
+        return NotImplemented if o is None else self.segments() <= o
+
+    def __gt__(self, other: object) -> bool:
+        o = _segments(other)
+        return NotImplemented if o is None else self.segments() > o
+
+    def __ge__(self, other: object) -> bool:
+        o = _segments(other)
+        return NotImplemented if o is None else self.segments() >= o
+
+    def __repr__(self) -> str:
+        return f"Location({self.segments()!r})"
+
+    def __reduce__(self) -> tuple[type[Location], tuple[tuple[str, ...]]]:
+        return (Location, (self.segments(),))
+
+
+def _segments(other: object) -> tuple[str, ...] | None:
+    if isinstance(other, Location):
+        return other.segments()
+    if isinstance(other, tuple):
+        return other
+    return None
+
 
 ROOT = Location()
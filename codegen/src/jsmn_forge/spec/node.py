@@ -2,10 +2,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Any, Protocol
+from typing import TYPE_CHECKING, Any, NamedTuple, Protocol
+
+from .automaton import compile_graph
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Mapping
 
 
 class ConflictPolicy(Enum):
@@ -19,12 +21,25 @@ class Behavior:
     conflict_policy: ConflictPolicy = ConflictPolicy.KEEP
 
 
+class Transitions(NamedTuple):
+    """Everything `Node.child` can return, for compiling the node graph.
+
+    `child(prop)` is `extensions` for x-* props (when set), else the
+    `keys` entry for prop, else `default`.
+    """
+
+    keys: Mapping[str, tuple[Node, Behavior]]
+    default: tuple[Node, Behavior]
+    extensions: tuple[Node, Behavior] | None = None
+
+
 class Node(Protocol):
     @property
     def kind(self) -> str: ...
     @property
     def opaque(self) -> bool: ...
     def child(self, prop: str) -> tuple[Node, Behavior]: ...
+    def transitions(self) -> Transitions: ...
 
 
 _NO_BHV = Behavior(sort_key=None)
@@ -43,6 +58,9 @@ class DataNode:
     def child(self, prop: str) -> tuple[Node, Behavior]:
         return (self, _NO_BHV)
 
+    def transitions(self) -> Transitions:
+        return Transitions(keys={}, default=(self, _NO_BHV))
+
     def __repr__(self) -> str:
         return str(self._kind)
 
@@ -66,11 +84,16 @@ class MapNode[E: str]:
     ) -> None:
         self._child = child
         self._behavior = behavior
+        compile_graph.cache_clear()
 
     def child(self, prop: str) -> tuple[Node, Behavior]:
         assert self._child is not None, f"{self._kind} not configured"
         return (self._child, self._behavior)
 
+    def transitions(self) -> Transitions:
+        assert self._child is not None, f"{self._kind} not configured"
+        return Transitions(keys={}, default=(self._child, self._behavior))
+
     def __repr__(self) -> str:
         return str(self._kind)
 
@@ -91,10 +114,14 @@ class ObjectNode[E: str]:
         table: dict[str, tuple[Node, Behavior]],
     ) -> None:
         self._table = table
+        compile_graph.cache_clear()
 
     def child(self, prop: str) -> tuple[Node, Behavior]:
         return self._table.get(prop, (data, _NO_BHV))
 
+    def transitions(self) -> Transitions:
+        return Transitions(keys=self._table, default=(data, _NO_BHV))
+
     def __repr__(self) -> str:
         return str(self._kind)
 
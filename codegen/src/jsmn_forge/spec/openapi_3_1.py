@@ -1,266 +1,388 @@
-from __future__ import annotations
-
-from dataclasses import dataclass
-from enum import StrEnum
-from functools import reduce
-from typing import TYPE_CHECKING, Any, NamedTuple
-
-from ruamel.yaml import YAML
-
-from jsmn_forge.walk.merge import MergeConflict as _MergeConflict
-from jsmn_forge.walk.merge import merge as _merge
-from jsmn_forge.walk.normalize import normalize
-
-from .behavior import canonical, identity_key
-from .node import _NO_BHV, Behavior, MapNode, ObjectNode, data
-from .schema import map_schema, schema
-
-if TYPE_CHECKING:
-    from collections.abc import Callable
-    from pathlib import Path
-
-    from .location import Location
-
-_param_key = identity_key("in", "name")
-
-
-class OpenAPIKind(StrEnum):
-    # Object nodes
-    ROOT             = "root"
-    INFO             = "info"
-    COMPONENTS       = "components"
-    PATH_ITEM        = "path_item"
-    OPERATION        = "operation"
-    PARAMETER        = "parameter"
-    REQUEST_BODY     = "request_body"
-    RESPONSE         = "response"
-    MEDIA_TYPE       = "media_type"
-    ENCODING         = "encoding"
-    SERVER           = "server"
-    SERVER_VAR       = "server_var"
-    LINK             = "link"
-    # Map nodes
-    MAP_PATH_ITEM    = "map_path_item"
-    MAP_RESPONSE     = "map_response"
-    MAP_CONTENT      = "map_content"
-    MAP_HEADER       = "map_header"
-    MAP_ENCODING     = "map_encoding"
-    MAP_PARAMETER    = "map_parameter"
-    MAP_REQUEST_BODY = "map_request_body"
-    MAP_LINK         = "map_link"
-    MAP_CALLBACK     = "map_callback"
-    MAP_SERVER_VAR   = "map_server_var"
-    MAP_SCOPE        = "map_scope"
-
-
-# ---------------------------------------------------------------------------
-# Phase 1: Create all node instances
-# ---------------------------------------------------------------------------
-
-obj_root         = ObjectNode(OpenAPIKind.ROOT)
-obj_info         = ObjectNode(OpenAPIKind.INFO)
-obj_components   = ObjectNode(OpenAPIKind.COMPONENTS)
-obj_path_item    = ObjectNode(OpenAPIKind.PATH_ITEM)
-obj_operation    = ObjectNode(OpenAPIKind.OPERATION)
-obj_parameter    = ObjectNode(OpenAPIKind.PARAMETER)
-obj_request_body = ObjectNode(OpenAPIKind.REQUEST_BODY)
-obj_response     = ObjectNode(OpenAPIKind.RESPONSE)
-obj_media_type   = ObjectNode(OpenAPIKind.MEDIA_TYPE)
-obj_encoding     = ObjectNode(OpenAPIKind.ENCODING)
-obj_server       = ObjectNode(OpenAPIKind.SERVER)
-obj_server_var   = ObjectNode(OpenAPIKind.SERVER_VAR)
-obj_link         = ObjectNode(OpenAPIKind.LINK)
-
-map_path_item    = MapNode(OpenAPIKind.MAP_PATH_ITEM)
-map_response     = MapNode(OpenAPIKind.MAP_RESPONSE)
-map_content      = MapNode(OpenAPIKind.MAP_CONTENT)
-map_header       = MapNode(OpenAPIKind.MAP_HEADER)
-map_encoding     = MapNode(OpenAPIKind.MAP_ENCODING)
-map_parameter    = MapNode(OpenAPIKind.MAP_PARAMETER)
-map_request_body = MapNode(OpenAPIKind.MAP_REQUEST_BODY)
-map_link         = MapNode(OpenAPIKind.MAP_LINK)
-map_callback     = MapNode(OpenAPIKind.MAP_CALLBACK)
-map_server_var   = MapNode(OpenAPIKind.MAP_SERVER_VAR)
-map_scope        = MapNode(OpenAPIKind.MAP_SCOPE)
-
-
-# ---------------------------------------------------------------------------
-# Phase 2: Configure (all instances exist, mutual refs work)
-# ---------------------------------------------------------------------------
-
-# fmt: off
-obj_root.configure(table={
-    "paths":            (map_path_item, _NO_BHV),
-    "webhooks":         (map_path_item, _NO_BHV),
-    "components":       (obj_components, _NO_BHV),
-    "servers":          (obj_server, _NO_BHV),
-    "security":         (map_scope, Behavior(sort_key=canonical)),
-})
-
-obj_info.configure(table={})
-
-obj_components.configure(table={
-    "schemas":          (map_schema, _NO_BHV),
-    "parameters":       (map_parameter, _NO_BHV),
-    "headers":          (map_header, _NO_BHV),
-    "requestBodies":    (map_request_body, _NO_BHV),
-    "responses":        (map_response, _NO_BHV),
-    "pathItems":        (map_path_item, _NO_BHV),
-    "callbacks":        (map_callback, _NO_BHV),
-    "links":            (map_link, _NO_BHV),
-})
-
-obj_path_item.configure(table={
-    "get":              (obj_operation, _NO_BHV),
-    "put":              (obj_operation, _NO_BHV),
-    "post":             (obj_operation, _NO_BHV),
-    "delete":           (obj_operation, _NO_BHV),
-    "options":          (obj_operation, _NO_BHV),
-    "head":             (obj_operation, _NO_BHV),
-    "patch":            (obj_operation, _NO_BHV),
-    "trace":            (obj_operation, _NO_BHV),
-    "parameters":       (obj_parameter, Behavior(sort_key=_param_key)),
-    "servers":          (obj_server, _NO_BHV),
-})
-
-obj_operation.configure(table={
-    "requestBody":      (obj_request_body, _NO_BHV),
-    "responses":        (map_response, _NO_BHV),
-    "callbacks":        (map_callback, _NO_BHV),
-    "parameters":       (obj_parameter, Behavior(sort_key=_param_key)),
-    "servers":          (obj_server, _NO_BHV),
-    "security":         (map_scope, Behavior(sort_key=canonical)),
-    "tags":             (data, Behavior(sort_key=str)),
-})
-
-obj_parameter.configure(table={
-    "schema":           (schema, _NO_BHV),
-    "content":          (map_content, _NO_BHV),
-})
-
-obj_request_body.configure(table={
-    "content":          (map_content, _NO_BHV),
-})
-
-obj_response.configure(table={
-    "content":          (map_content, _NO_BHV),
-    "headers":          (map_header, _NO_BHV),
-    "links":            (map_link, _NO_BHV),
-})
-
-obj_media_type.configure(table={
-    "schema":           (schema, _NO_BHV),
-    "encoding":         (map_encoding, _NO_BHV),
-})
-
-obj_encoding.configure(table={
-    "headers":          (map_header, _NO_BHV),
-})
-
-obj_server.configure(table={
-    "variables":        (map_server_var, _NO_BHV),
-})
-
-obj_server_var.configure(table={
-    "enum":             (data, Behavior(sort_key=str)),
-})
-
-obj_link.configure(table={
-    "server":           (obj_server, _NO_BHV),
-})
-
-map_path_item.configure(child=obj_path_item)
-map_response.configure(child=obj_response)
-map_content.configure(child=obj_media_type)
-map_header.configure(child=obj_parameter)
-map_encoding.configure(child=obj_encoding)
-map_parameter.configure(child=obj_parameter)
-map_request_body.configure(child=obj_request_body)
-map_link.configure(child=obj_link)
-map_callback.configure(child=map_path_item)
-map_server_var.configure(child=obj_server_var)
-map_scope.configure(child=data, behavior=Behavior(sort_key=str))
-# fmt: on
-
-
-# ---------------------------------------------------------------------------
-# Merge
-# ---------------------------------------------------------------------------
-
-
-@dataclass
-class MergeConflict:
-    file: Path
-    location: Location
-    destination: Any
-    source: Any
-
-
-@dataclass
-class FileNotFound:
-    path: Path
-
-
-class Specification(NamedTuple):
-    file: Path
-    data: Any
-
-
-type MergeError = FileNotFound
-type NormalizeResult = tuple[list[Specification], list[FileNotFound]]
-
-yaml = YAML(typ="safe")
-
-
-@dataclass
-class MergeResult:
-    value: Any
-    conflicts: list[MergeConflict]
-    errors: list[MergeError]
-
-
-def upgrade_conflict(file: Path) -> Callable[[_MergeConflict], MergeConflict]:
-    def upgrader(conflict: _MergeConflict) -> MergeConflict:
-        return MergeConflict(
-            file=file,
-            location=conflict.location,
-            destination=conflict.destination,
-            source=conflict.source,
-        )
-
-    return upgrader
-
-
-def merge(*args: Path, scheme: str | None = None) -> MergeResult:
-    root = (obj_root, _NO_BHV)
-
-    def sort_step(acc: NormalizeResult, next: Path) -> NormalizeResult:
-        try:
-            behavior_sorted = normalize(yaml.load(next), root, scheme=scheme)
-            spec = Specification(next, behavior_sorted)
-            acc[0].append(spec)
-        except FileNotFoundError:
-            acc[1].append(FileNotFound(next))
-        return acc
-
-    def merge_step(acc: MergeResult, spec: Specification) -> MergeResult:
-        (file, src) = spec
-        (r, c) = _merge(acc.value, src, root)
-        conflicts = list(map(upgrade_conflict(file), c))
-        # TODO evaluate conflicts. Upgrade some to errors
-        #      (ie: info.version missmatch)
-        return MergeResult(r, acc.conflicts + conflicts, [])
-
-    # Behavior sort all the input files
-    init: NormalizeResult = ([], [])
-    (behavior_sorted, errors) = reduce(sort_step, args, init)
-
-    rest = iter(behavior_sorted)
-    try:
-        # Pop the first specification off the list for which merge will appy
-        (_, first) = next(rest)
-        # Merge remaining specifications
-        result = reduce(merge_step, rest, MergeResult(first, [], errors))
-        return result
-    except StopIteration as _e:
-        return MergeResult(None, [], errors)
+from __future__ import annotations
+
+import contextlib
+from dataclasses import dataclass
+from enum import StrEnum
+from functools import partial, reduce
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from jsmn_forge.loader import LOADERS
+from jsmn_forge.loader import load as _load
+from jsmn_forge.parallel import free_threaded, map_ordered
+from jsmn_forge.profile import phase
+from jsmn_forge.walk.digest import Digests, digest
+from jsmn_forge.walk.merge import MergeConflict as _MergeConflict
+from jsmn_forge.walk.merge import merge as _merge
+from jsmn_forge.walk.merge import merge_many
+from jsmn_forge.walk.normalize import normalize, ref_sites
+from jsmn_forge.walk.stream import normalize_yaml
+
+from .behavior import canonical, canonical_scope, identity_key, text
+from .node import _NO_BHV, Behavior, MapNode, ObjectNode, data
+from .schema import map_schema, schema
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from jsmn_forge.cache import Cache
+    from jsmn_forge.loader import Load
+
+    from .location import Location
+    from .ref import RefIndex
+
+_param_key = identity_key("in", "name")
+
+# Version of the node tables below. Part of the cache key for normalized
+# documents, bump whenever a table change alters how documents normalize.
+NODE_TABLE_VERSION = 1
+
+
+class OpenAPIKind(StrEnum):
+    # Object nodes
+    ROOT             = "root"
+    INFO             = "info"
+    COMPONENTS       = "components"
+    PATH_ITEM        = "path_item"
+    OPERATION        = "operation"
+    PARAMETER        = "parameter"
+    REQUEST_BODY     = "request_body"
+    RESPONSE         = "response"
+    MEDIA_TYPE       = "media_type"
+    ENCODING         = "encoding"
+    SERVER           = "server"
+    SERVER_VAR       = "server_var"
+    LINK             = "link"
+    # Map nodes
+    MAP_PATH_ITEM    = "map_path_item"
+    MAP_RESPONSE     = "map_response"
+    MAP_CONTENT      = "map_content"
+    MAP_HEADER       = "map_header"
+    MAP_ENCODING     = "map_encoding"
+    MAP_PARAMETER    = "map_parameter"
+    MAP_REQUEST_BODY = "map_request_body"
+    MAP_LINK         = "map_link"
+    MAP_CALLBACK     = "map_callback"
+    MAP_SERVER_VAR   = "map_server_var"
+    MAP_SCOPE        = "map_scope"
+
+
+# ---------------------------------------------------------------------------
+# Phase 1: Create all node instances
+# ---------------------------------------------------------------------------
+
+obj_root         = ObjectNode(OpenAPIKind.ROOT)
+obj_info         = ObjectNode(OpenAPIKind.INFO)
+obj_components   = ObjectNode(OpenAPIKind.COMPONENTS)
+obj_path_item    = ObjectNode(OpenAPIKind.PATH_ITEM)
+obj_operation    = ObjectNode(OpenAPIKind.OPERATION)
+obj_parameter    = ObjectNode(OpenAPIKind.PARAMETER)
+obj_request_body = ObjectNode(OpenAPIKind.REQUEST_BODY)
+obj_response     = ObjectNode(OpenAPIKind.RESPONSE)
+obj_media_type   = ObjectNode(OpenAPIKind.MEDIA_TYPE)
+obj_encoding     = ObjectNode(OpenAPIKind.ENCODING)
+obj_server       = ObjectNode(OpenAPIKind.SERVER)
+obj_server_var   = ObjectNode(OpenAPIKind.SERVER_VAR)
+obj_link         = ObjectNode(OpenAPIKind.LINK)
+
+map_path_item    = MapNode(OpenAPIKind.MAP_PATH_ITEM)
+map_response     = MapNode(OpenAPIKind.MAP_RESPONSE)
+map_content      = MapNode(OpenAPIKind.MAP_CONTENT)
+map_header       = MapNode(OpenAPIKind.MAP_HEADER)
+map_encoding     = MapNode(OpenAPIKind.MAP_ENCODING)
+map_parameter    = MapNode(OpenAPIKind.MAP_PARAMETER)
+map_request_body = MapNode(OpenAPIKind.MAP_REQUEST_BODY)
+map_link         = MapNode(OpenAPIKind.MAP_LINK)
+map_callback     = MapNode(OpenAPIKind.MAP_CALLBACK)
+map_server_var   = MapNode(OpenAPIKind.MAP_SERVER_VAR)
+map_scope        = MapNode(OpenAPIKind.MAP_SCOPE)
+
+
+# ---------------------------------------------------------------------------
+# Phase 2: Configure (all instances exist, mutual refs work)
+# ---------------------------------------------------------------------------
+
+# fmt: off
+obj_root.configure(table={
+    "paths":            (map_path_item, _NO_BHV),
+    "webhooks":         (map_path_item, _NO_BHV),
+    "components":       (obj_components, _NO_BHV),
+    "servers":          (obj_server, _NO_BHV),
+    "security":         (map_scope, Behavior(sort_key=canonical)),
+})
+
+obj_info.configure(table={})
+
+obj_components.configure(table={
+    "schemas":          (map_schema, _NO_BHV),
+    "parameters":       (map_parameter, _NO_BHV),
+    "headers":          (map_header, _NO_BHV),
+    "requestBodies":    (map_request_body, _NO_BHV),
+    "responses":        (map_response, _NO_BHV),
+    "pathItems":        (map_path_item, _NO_BHV),
+    "callbacks":        (map_callback, _NO_BHV),
+    "links":            (map_link, _NO_BHV),
+})
+
+obj_path_item.configure(table={
+    "get":              (obj_operation, _NO_BHV),
+    "put":              (obj_operation, _NO_BHV),
+    "post":             (obj_operation, _NO_BHV),
+    "delete":           (obj_operation, _NO_BHV),
+    "options":          (obj_operation, _NO_BHV),
+    "head":             (obj_operation, _NO_BHV),
+    "patch":            (obj_operation, _NO_BHV),
+    "trace":            (obj_operation, _NO_BHV),
+    "parameters":       (obj_parameter, Behavior(sort_key=_param_key)),
+    "servers":          (obj_server, _NO_BHV),
+})
+
+obj_operation.configure(table={
+    "requestBody":      (obj_request_body, _NO_BHV),
+    "responses":        (map_response, _NO_BHV),
+    "callbacks":        (map_callback, _NO_BHV),
+    "parameters":       (obj_parameter, Behavior(sort_key=_param_key)),
+    "servers":          (obj_server, _NO_BHV),
+    "security":         (map_scope, Behavior(sort_key=canonical)),
+    "tags":             (data, Behavior(sort_key=text)),
+})
+
+obj_parameter.configure(table={
+    "schema":           (schema, _NO_BHV),
+    "content":          (map_content, _NO_BHV),
+})
+
+obj_request_body.configure(table={
+    "content":          (map_content, _NO_BHV),
+})
+
+obj_response.configure(table={
+    "content":          (map_content, _NO_BHV),
+    "headers":          (map_header, _NO_BHV),
+    "links":            (map_link, _NO_BHV),
+})
+
+obj_media_type.configure(table={
+    "schema":           (schema, _NO_BHV),
+    "encoding":         (map_encoding, _NO_BHV),
+})
+
+obj_encoding.configure(table={
+    "headers":          (map_header, _NO_BHV),
+})
+
+obj_server.configure(table={
+    "variables":        (map_server_var, _NO_BHV),
+})
+
+obj_server_var.configure(table={
+    "enum":             (data, Behavior(sort_key=text)),
+})
+
+obj_link.configure(table={
+    "server":           (obj_server, _NO_BHV),
+})
+
+map_path_item.configure(child=obj_path_item)
+map_response.configure(child=obj_response)
+map_content.configure(child=obj_media_type)
+map_header.configure(child=obj_parameter)
+map_encoding.configure(child=obj_encoding)
+map_parameter.configure(child=obj_parameter)
+map_request_body.configure(child=obj_request_body)
+map_link.configure(child=obj_link)
+map_callback.configure(child=map_path_item)
+map_server_var.configure(child=obj_server_var)
+map_scope.configure(child=data, behavior=Behavior(sort_key=text))
+# fmt: on
+
+
+# ---------------------------------------------------------------------------
+# Merge
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class MergeConflict:
+    file: Path
+    location: Location
+    destination: Any
+    source: Any
+
+
+@dataclass
+class FileNotFound:
+    path: Path
+
+
+class Specification(NamedTuple):
+    file: Path
+    data: Any
+
+
+class MergeStrategy(StrEnum):
+    # Left to right fold, one accumulator
+    FOLD = "fold"
+    # All documents in one traversal
+    NWAY = "nway"
+
+
+type MergeError = FileNotFound
+type NormalizeResult = tuple[list[Specification], list[FileNotFound]]
+
+
+@dataclass
+class MergeResult:
+    value: Any
+    conflicts: list[MergeConflict]
+    errors: list[MergeError]
+
+
+def upgrade_conflict(file: Path) -> Callable[[_MergeConflict], MergeConflict]:
+    def upgrader(conflict: _MergeConflict) -> MergeConflict:
+        return MergeConflict(
+            file=file,
+            location=conflict.location,
+            destination=conflict.destination,
+            source=conflict.source,
+        )
+
+    return upgrader
+
+
+def load(
+    file: Path,
+    scheme: str | None = None,
+    cache: Cache | None = None,
+    digests: Digests | None = None,
+    refs: RefIndex | None = None,
+) -> Specification | FileNotFound:
+    """Parse and behavior sort a single input file.
+
+    With `digests`, the normalized document is digested too. With `refs`,
+    its references are indexed, as document `./<file name>`.
+    """
+    root = (obj_root, _NO_BHV)
+    namespace = f"openapi-3.1:{NODE_TABLE_VERSION}:{scheme or 'forge'}"
+
+    def normalizing(parse: Load) -> Load:
+        return lambda data: normalize(
+            parse(data), root, scheme=scheme, digests=digests
+        )
+
+    loaders = {name: normalizing(parse) for name, parse in LOADERS.items()}
+    # YAML is normalized straight from the parser events
+    loaders["yaml"] = partial(
+        normalize_yaml, context=root, scheme=scheme, digests=digests
+    )
+
+    def sort(data: Path | bytes) -> Any:
+        return _load(data, suffix=file.suffix, loaders=loaders)
+
+    with phase("load", file) as span:
+        try:
+            if cache is None:
+                value = sort(file)
+            else:
+                # Read and hashed once, a miss builds from the same bytes
+                data = file.read_bytes()
+                key = cache.key(data, namespace)
+                (hit, value) = cache.get(key)
+                if not hit:
+                    value = sort(data)
+                    cache.put(key, value)
+                elif digests is not None:
+                    digest(value, digests, root)
+        except FileNotFoundError:
+            return FileNotFound(file)
+    # Counted once the phase is over, the walk is not load time
+    span.count(value)
+    if refs is not None:
+        refs.add(f"./{file.name}", value, ref_sites(value, root))
+    return Specification(file, value)
+
+
+@canonical_scope()
+def merge(
+    *args: Path,
+    scheme: str | None = None,
+    cache: Cache | None = None,
+    workers: int | None = None,
+    strategy: MergeStrategy = MergeStrategy.FOLD,
+    digests: bool = False,
+) -> MergeResult:
+    """Merge specification files, in argument order.
+
+    With `workers`, files are parsed and normalized on a pool of that many
+    workers (processes, or threads on free-threaded builds). NWAY merges
+    all documents in a single traversal. Every strategy yields the same
+    value and conflicts as FOLD.
+
+    With `digests`, every normalized document is digested first so that
+    subtrees identical across documents merge in constant time.
+
+    Canonical keys computed while loading are reused while merging, when
+    both happen in this process (see `canonical_scope`).
+    """
+    root = (obj_root, _NO_BHV)
+
+    def sort_step(
+        acc: NormalizeResult,
+        next: Specification | FileNotFound,
+    ) -> NormalizeResult:
+        if isinstance(next, FileNotFound):
+            acc[1].append(next)
+        else:
+            acc[0].append(next)
+        return acc
+
+    def merge_step(acc: MergeResult, spec: Specification) -> MergeResult:
+        (file, src) = spec
+        with phase("merge", file):
+            # The normalized documents are private to this call, nothing
+            # mutates them, so subtrees are shared rather than copied
+            (r, c) = _merge(acc.value, src, root, share=True, digests=table)
+        with phase("upgrade", file):
+            conflicts = list(map(upgrade_conflict(file), c))
+        # TODO evaluate conflicts. Upgrade some to errors
+        #      (ie: info.version missmatch)
+        return MergeResult(r, acc.conflicts + conflicts, acc.errors)
+
+    # Behavior sort all the input files. Digests are keyed by identity,
+    # loaders in other processes can not fill the table
+    table = Digests() if digests and len(args) > 1 else None
+    remote = workers is not None and workers > 1 and not free_threaded()
+    loader = partial(
+        load, scheme=scheme, cache=cache, digests=None if remote else table
+    )
+    # Loads in other processes are timed as a whole
+    with phase("load") if remote else contextlib.nullcontext():
+        loaded = map_ordered(loader, args, workers)
+    init: NormalizeResult = ([], [])
+    (behavior_sorted, errors) = reduce(sort_step, loaded, init)
+
+    if table is not None and remote:
+        for spec in behavior_sorted:
+            with phase("digest", spec.file):
+                digest(spec.data, table, root)
+
+    if strategy == MergeStrategy.NWAY:
+        docs = [spec.data for spec in behavior_sorted]
+        with phase("merge"):
+            (value, found) = merge_many(docs, root, share=True)
+        with phase("upgrade"):
+            conflicts = [
+                upgrade_conflict(behavior_sorted[doc].file)(c)
+                for doc, c in found
+            ]
+        return MergeResult(value, conflicts, errors)
+
+    rest = iter(behavior_sorted)
+    try:
+        # Pop the first specification off the list for which merge will appy
+        (_, first) = next(rest)
+        # Merge remaining specifications
+        result = reduce(merge_step, rest, MergeResult(first, [], errors))
+        return result
+    except StopIteration as _e:
+        return MergeResult(None, [], errors)
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import functools
 import re
 from dataclasses import dataclass
+from typing import Any
+from urllib.parse import unquote
+
+from .location import Location
 
 _SCHEME_RE = re.compile(
     r"^(?P<scheme>[a-zA-Z][a-zA-Z0-9-]*)://"
@@ -40,3 +45,197 @@ class Ref:
             base = f"./{module}.openapi.yaml"
             return f"{base}#{fragment}" if fragment else base
         return self.raw
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def normalize_ref(raw: str, scheme: str) -> str:
+    """`Ref(raw).normalize(scheme)`, memoized: documents repeat the same
+    few references many times."""
+    return Ref(raw).normalize(scheme)
+
+
+# (document, JSON pointer) of a node in an indexed document
+type Target = tuple[str, str]
+
+# Location of every object with a $ref in a document, and its (normalized)
+# reference, in document order
+type RefSites = list[tuple[Location, str]]
+
+
+# Depth of the units a document is made of, that dependencies are asked
+# about even when nothing references them: /components/<kind>/<name>,
+# /paths/<path>, /webhooks/<name>
+_UNITS = {"components": 3, "paths": 2, "webhooks": 2}
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _split(ref: str) -> tuple[str, str]:
+    """(document, pointer) of a reference, "" for the referring document."""
+    (base, _, fragment) = ref.partition("#")
+    return (base, unquote(fragment))
+
+
+class RefIndex:
+    """Forward and reverse $ref graph of normalized documents.
+
+    Documents are named like the references to them, after normalization:
+    `./<module>.openapi.yaml` for a module of the scheme, the URI for
+    anything else. A source is the object holding a `$ref`, a target what
+    it points to, both as `Target`s. Direct lookups are dict lookups, and
+    a target is resolved to its node on first lookup only.
+    """
+
+    __slots__ = (
+        "_contents",
+        "_docs",
+        "_forward",
+        "_nodes",
+        "_reverse",
+        "_sources",
+    )
+
+    def __init__(self) -> None:
+        self._docs: dict[str, Any] = {}
+        self._forward: dict[Target, Target] = {}
+        self._reverse: dict[Target, list[Target]] = {}
+        # document -> its sources, in document order
+        self._sources: dict[str, list[Target]] = {}
+        self._nodes: dict[Target, Any] = {}
+        # referenced target -> sources in its subtree, built on first use
+        self._contents: dict[Target, list[Target]] | None = None
+
+    def __contains__(self, document: object) -> bool:
+        return document in self._docs
+
+    def __len__(self) -> int:
+        return len(self._forward)
+
+    def add(self, document: str, root: Any, sites: RefSites) -> None:
+        """Index the references of `document`, replacing its previous
+        version. `sites` as collected by `walk.ref_sites`."""
+        if document in self._docs:
+            self.remove(document)
+        self._contents = None
+        self._docs[document] = root
+        sources = self._sources[document] = []
+        for loc, ref in sites:
+            source = (document, loc.to_pointer())
+            (base, pointer) = _split(ref)
+            target = (base or document, pointer)
+            self._forward[source] = target
+            self._reverse.setdefault(target, []).append(source)
+            sources.append(source)
+
+    def remove(self, document: str) -> None:
+        """Drop `document`, and the references from it."""
+        self._contents = None
+        self._docs.pop(document, None)
+        for source in self._sources.pop(document, []):
+            target = self._forward.pop(source)
+            users = self._reverse[target]
+            users.remove(source)
+            if not users:
+                del self._reverse[target]
+        self._nodes = {
+            t: node for (t, node) in self._nodes.items() if t[0] != document
+        }
+
+    def target(self, source: Target) -> Target | None:
+        """What the $ref of `source` points to, None when it has none."""
+        return self._forward.get(source)
+
+    def users(self, target: Target) -> list[Target]:
+        """Sources referencing `target` directly, in index order."""
+        return list(self._reverse.get(target, ()))
+
+    def resolve(self, target: Target) -> Any:
+        """Node of `target`. Raises KeyError when its document is not
+        indexed, LookupError when the pointer does not resolve."""
+        try:
+            return self._nodes[target]
+        except KeyError:
+            pass
+        (document, pointer) = target
+        root = self._docs[document]
+        try:
+            node = Location.from_pointer(pointer).resolve(root)
+        except (KeyError, IndexError, TypeError) as e:
+            raise LookupError(f"{document}#{pointer}") from e
+        self._nodes[target] = node
+        return node
+
+    def dangling(self) -> list[tuple[Target, Target]]:
+        """(source, target) of every reference that does not resolve."""
+        out = []
+        for source, target in self._forward.items():
+            try:
+                self.resolve(target)
+            except LookupError:
+                out.append((source, target))
+        return out
+
+    def dependencies(self, target: Target) -> set[Target]:
+        """Targets referenced from anywhere in `target`, and from those in
+        turn. `target` itself only when it is part of a cycle."""
+        out: set[Target] = set()
+        stack = [target]
+        while stack:
+            (document, pointer) = stack.pop()
+            for source in self._within(document, pointer):
+                found = self._forward[source]
+                if found not in out:
+                    out.add(found)
+                    stack.append(found)
+        return out
+
+    def dependents(self, target: Target) -> set[Target]:
+        """Targets and units (components, path items) that reference
+        `target` from anywhere in them, and those referencing them in turn.
+        For impact analysis."""
+        out: set[Target] = set()
+        stack = [target]
+        while stack:
+            for source in self._reverse.get(stack.pop(), ()):
+                for found in self._enclosing(source):
+                    if found not in out:
+                        out.add(found)
+                        stack.append(found)
+        return out
+
+    def _within(self, document: str, pointer: str) -> list[Target]:
+        """Sources in the subtree of `pointer`."""
+        if self._contents is None:
+            self._contents = {}
+            for source in self._forward:
+                for found in self._enclosing(source):
+                    self._contents.setdefault(found, []).append(source)
+        if (document, pointer) in self._reverse or _unit(pointer):
+            return self._contents.get((document, pointer), [])
+        # Neither referenced nor a unit, so not in the table
+        prefix = pointer + "/"
+        return [
+            s
+            for s in self._sources.get(document, ())
+            if s[1] == pointer or s[1].startswith(prefix)
+        ]
+
+    def _enclosing(self, source: Target) -> list[Target]:
+        """Referenced targets and the unit that `source` is in, itself
+        included."""
+        (document, pointer) = source
+        out = []
+        while True:
+            if (document, pointer) in self._reverse or _unit(pointer):
+                out.append((document, pointer))
+            if not pointer:
+                return out
+            pointer = pointer[: pointer.rindex("/")]
+
+
+def _unit(pointer: str) -> bool:
+    """Whether `pointer` is a unit of its document (see `_UNITS`)."""
+    parts = pointer.split("/", 2)
+    if len(parts) < 2:
+        return False
+    depth = _UNITS.get(parts[1])
+    return depth is not None and pointer.count("/") == depth
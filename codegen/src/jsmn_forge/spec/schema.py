@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from enum import StrEnum
 
-from .behavior import canonical
-from .node import _NO_BHV, Behavior, MapNode, Node, data
+from .automaton import compile_graph
+from .behavior import canonical, text
+from .node import _NO_BHV, Behavior, MapNode, Node, Transitions, data
 
 
 class SchemaKind(StrEnum):
@@ -40,12 +41,20 @@ class SchemaNode:
         keywords: dict[str, tuple[Node, Behavior]],
     ) -> None:
         self._keywords = keywords
+        compile_graph.cache_clear()
 
     def child(self, prop: str) -> tuple[Node, Behavior]:
         if prop.startswith("x-"):
             return (data, _NO_BHV)
         return self._keywords.get(prop, (self, _NO_BHV))
 
+    def transitions(self) -> Transitions:
+        return Transitions(
+            keys=self._keywords,
+            default=(self, _NO_BHV),
+            extensions=(data, _NO_BHV),
+        )
+
     def __repr__(self) -> str:
         return str(self._kind)
 
@@ -63,7 +72,7 @@ schema         = SchemaNode(SchemaKind.SCHEMA)
 # ---------------------------------------------------------------------------
 
 map_schema.configure(child=schema)
-map_string_set.configure(child=data, behavior=Behavior(sort_key=str))
+map_string_set.configure(child=data, behavior=Behavior(sort_key=text))
 
 # fmt: off
 schema.configure(keywords={
@@ -84,9 +93,9 @@ schema.configure(keywords={
     "xml":                      (data, _NO_BHV),
     "externalDocs":             (data, _NO_BHV),
     # Set-like arrays (sorted)
-    "required":                 (schema, Behavior(sort_key=str)),
+    "required":                 (schema, Behavior(sort_key=text)),
     "enum":                     (schema, Behavior(sort_key=canonical)),
-    "type":                     (schema, Behavior(sort_key=str)),
+    "type":                     (schema, Behavior(sort_key=text)),
     "anyOf":                    (schema, Behavior(sort_key=canonical)),
     "oneOf":                    (schema, Behavior(sort_key=canonical)),
     "allOf":                    (schema, Behavior(sort_key=canonical)),
@@ -0,0 +1,437 @@
+"""Columnar store of IR descriptors, for very large schema sets"""
+
+from __future__ import annotations
+
+from array import array
+from typing import TYPE_CHECKING, Any, get_args
+
+from jsmn_forge.codegen import (
+    ArrayDescriptor,
+    BoolDescriptor,
+    BoolType,
+    Bound,
+    Dim,
+    Field,
+    NullDescriptor,
+    NullType,
+    NumberDescriptor,
+    NumberFormat,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringDescriptor,
+    StringType,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from jsmn_forge.codegen import Descriptor, FieldType
+
+_TYPE_KINDS = ("bool", "null", "number", "string", "ref")
+_DESCRIPTOR_KINDS = ("null", "bool", "number", "string", "array", "object")
+_FORMATS: tuple[NumberFormat, ...] = get_args(NumberFormat)
+
+# Flags of a type row
+_MINIMUM = 1
+_MINIMUM_EXCLUSIVE = 2
+_MAXIMUM = 4
+_MAXIMUM_EXCLUSIVE = 8
+_DIMS = 16
+# An integer bound, its magnitude is in the integer column of the bound
+_MINIMUM_INT = 32
+_MINIMUM_NEGATIVE = 64
+_MAXIMUM_INT = 128
+_MAXIMUM_NEGATIVE = 256
+
+# Flags of each bound: set, exclusive, integer, negative
+_BOUNDS = {
+    "minimum": (_MINIMUM, _MINIMUM_EXCLUSIVE, _MINIMUM_INT, _MINIMUM_NEGATIVE),
+    "maximum": (_MAXIMUM, _MAXIMUM_EXCLUSIVE, _MAXIMUM_INT, _MAXIMUM_NEGATIVE),
+}
+
+
+class TypeView:
+    """A field type in an `IRStore`, with the attributes of the codegen
+    type of its `kind`. Attributes of other kinds are None."""
+
+    __slots__ = ("_row", "_store")
+
+    def __init__(self, store: IRStore, row: int) -> None:
+        self._store = store
+        self._row = row
+
+    def __repr__(self) -> str:
+        return f"TypeView({self.kind!r}, row={self._row})"
+
+    @property
+    def kind(self) -> str:
+        return _TYPE_KINDS[self._store._kind[self._row]]
+
+    @property
+    def format(self) -> NumberFormat | None:
+        if self.kind != "number":
+            return None
+        return _FORMATS[self._store._format[self._row]]
+
+    @property
+    def minimum(self) -> Bound | None:
+        return self._store._bound(self._row, "minimum")
+
+    @property
+    def maximum(self) -> Bound | None:
+        return self._store._bound(self._row, "maximum")
+
+    @property
+    def max_length(self) -> int | None:
+        if self.kind != "string":
+            return None
+        return self._store._max_length[self._row]
+
+    @property
+    def min_length(self) -> int | None:
+        length = self._store._min_length[self._row]
+        return None if length < 0 else length
+
+    @property
+    def pattern(self) -> str | None:
+        return self._store._string(self._store._pattern[self._row])
+
+    @property
+    def to(self) -> str | None:
+        return self._store._string(self._store._to[self._row])
+
+    @property
+    def dims(self) -> tuple[Dim, ...] | None:
+        (store, row) = (self._store, self._row)
+        if not store._flags[row] & _DIMS:
+            return None
+        return store._dims(store._dim_start[row], store._dim_count[row])
+
+
+class FieldView:
+    """A `Field` of an object in an `IRStore`."""
+
+    __slots__ = ("_row", "_store")
+
+    def __init__(self, store: IRStore, row: int) -> None:
+        self._store = store
+        self._row = row
+
+    def __repr__(self) -> str:
+        return f"FieldView({self.name!r})"
+
+    @property
+    def name(self) -> str:
+        return self._store._strings[self._store._field_name[self._row]]
+
+    @property
+    def type(self) -> TypeView:
+        return TypeView(self._store, self._store._field_type[self._row])
+
+    @property
+    def required(self) -> bool:
+        return bool(self._store._field_required[self._row])
+
+
+class DescriptorView:
+    """A descriptor in an `IRStore`, with the attributes of the codegen
+    descriptor of its `kind`. Attributes of other kinds are None."""
+
+    __slots__ = ("_store", "handle")
+
+    def __init__(self, store: IRStore, handle: int) -> None:
+        self._store = store
+        self.handle = handle
+
+    def __repr__(self) -> str:
+        return f"DescriptorView({self.name!r}, {self.kind!r})"
+
+    @property
+    def name(self) -> str:
+        return self._store._strings[self._store._name[self.handle]]
+
+    @property
+    def kind(self) -> str:
+        return _DESCRIPTOR_KINDS[self._store._descriptor_kind[self.handle]]
+
+    @property
+    def _type(self) -> TypeView:
+        # Items of an array, attributes of a number or a string
+        return TypeView(self._store, self._store._type[self.handle])
+
+    @property
+    def format(self) -> NumberFormat | None:
+        return self._type.format if self.kind == "number" else None
+
+    @property
+    def minimum(self) -> Bound | None:
+        return self._type.minimum if self.kind == "number" else None
+
+    @property
+    def maximum(self) -> Bound | None:
+        return self._type.maximum if self.kind == "number" else None
+
+    @property
+    def max_length(self) -> int | None:
+        return self._type.max_length if self.kind == "string" else None
+
+    @property
+    def min_length(self) -> int | None:
+        return self._type.min_length if self.kind == "string" else None
+
+    @property
+    def pattern(self) -> str | None:
+        return self._type.pattern if self.kind == "string" else None
+
+    @property
+    def items(self) -> TypeView | None:
+        return self._type if self.kind == "array" else None
+
+    @property
+    def dims(self) -> tuple[Dim, ...] | None:
+        if self.kind != "array":
+            return None
+        (store, handle) = (self._store, self.handle)
+        return store._dims(store._start[handle], store._count[handle])
+
+    @property
+    def fields(self) -> tuple[FieldView, ...] | None:
+        if self.kind != "object":
+            return None
+        (store, handle) = (self._store, self.handle)
+        start = store._start[handle]
+        rows = range(start, start + store._count[handle])
+        return tuple(FieldView(store, row) for row in rows)
+
+
+class IRStore:
+    """Descriptors held in parallel `array` columns, by integer handle.
+
+    The IR of a large schema set costs an object per descriptor, field,
+    field type and dimension. The store keeps one row per descriptor,
+    field and field type, and per dimension, in typed columns, names and
+    patterns once each in a string table. Views (`store[handle]`) expose
+    the attributes of the codegen IR without building it, code switching
+    on `kind` reads them alike; `descriptor` builds the codegen value.
+
+    Integer bounds are stored exactly, down to -(2**64 - 1) and up to
+    2**64 - 1, other bounds as doubles.
+    """
+
+    def __init__(self, descriptors: Iterable[Descriptor] = ()) -> None:
+        self._strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        # Descriptors: start and count of the fields of an object, or of
+        # the dims of an array. Type row of the items of an array, or of
+        # the attributes of a number or a string
+        self._descriptor_kind = array("B")
+        self._name = array("I")
+        self._type = array("i")
+        self._start = array("I")
+        self._count = array("I")
+        # Fields
+        self._field_name = array("I")
+        self._field_type = array("I")
+        self._field_required = array("B")
+        # Field types, string ids are -1 for None
+        self._kind = array("B")
+        self._format = array("B")
+        self._flags = array("H")
+        self._minimum = array("d")
+        self._maximum = array("d")
+        self._minimum_int = array("Q")
+        self._maximum_int = array("Q")
+        self._max_length = array("I")
+        self._min_length = array("i")
+        self._pattern = array("i")
+        self._to = array("i")
+        self._dim_start = array("I")
+        self._dim_count = array("B")
+        # Dimensions
+        self._dim_min = array("I")
+        self._dim_max = array("I")
+        for descriptor in descriptors:
+            self.add(descriptor)
+
+    def __len__(self) -> int:
+        return len(self._descriptor_kind)
+
+    def __getitem__(self, handle: int) -> DescriptorView:
+        if not 0 <= handle < len(self):
+            raise IndexError(handle)
+        return DescriptorView(self, handle)
+
+    def __iter__(self) -> Iterator[DescriptorView]:
+        return (DescriptorView(self, h) for h in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the columns, the string table excluded."""
+        columns = [v for v in vars(self).values() if isinstance(v, array)]
+        return sum(c.itemsize * len(c) for c in columns)
+
+    def _intern(self, s: str | None) -> int:
+        if s is None:
+            return -1
+        found = self._string_ids.get(s)
+        if found is None:
+            found = self._string_ids[s] = len(self._strings)
+            self._strings.append(s)
+        return found
+
+    def _string(self, i: int) -> str | None:
+        return None if i < 0 else self._strings[i]
+
+    def _add_dims(self, dims: tuple[Dim, ...]) -> int:
+        start = len(self._dim_min)
+        for dim in dims:
+            self._dim_min.append(dim.min)
+            self._dim_max.append(dim.max)
+        return start
+
+    def _dims(self, start: int, count: int) -> tuple[Dim, ...]:
+        rows = range(start, start + count)
+        return tuple(Dim(self._dim_min[i], self._dim_max[i]) for i in rows)
+
+    def _columns(self, bound: str) -> tuple[array[float], array[int]]:
+        if bound == "minimum":
+            return (self._minimum, self._minimum_int)
+        return (self._maximum, self._maximum_int)
+
+    def _add_bound(self, bound: str, value: Bound | None) -> int:
+        """Append `value` to the columns of `bound`, returns its flags."""
+        (has, exclusive, integer, negative) = _BOUNDS[bound]
+        (floats, ints) = self._columns(bound)
+        if value is None:
+            floats.append(0.0)
+            ints.append(0)
+            return 0
+        flags = has | (exclusive if value.exclusive else 0)
+        if not isinstance(value.value, int):
+            floats.append(value.value)
+            ints.append(0)
+            return flags
+        if abs(value.value) >= 2**64:
+            msg = f"{bound} {value.value} does not fit in 64 bits"
+            raise ValueError(msg)
+        floats.append(0.0)
+        ints.append(abs(value.value))
+        return flags | integer | (negative if value.value < 0 else 0)
+
+    def _bound(self, row: int, bound: str) -> Bound | None:
+        (has, exclusive, integer, negative) = _BOUNDS[bound]
+        flags = self._flags[row]
+        if not flags & has:
+            return None
+        (floats, ints) = self._columns(bound)
+        value: float = floats[row]
+        if flags & integer:
+            value = -ints[row] if flags & negative else ints[row]
+        return Bound(value, bool(flags & exclusive))
+
+    def _add_type(self, kind: str, attrs: Any) -> int:
+        """Row of a type of `kind`, with the attributes of `attrs` (a field
+        type, or a number or string descriptor)."""
+        row = len(self._kind)
+        self._kind.append(_TYPE_KINDS.index(kind))
+        fmt = getattr(attrs, "format", None)
+        self._format.append(_FORMATS.index(fmt) if fmt is not None else 0)
+        flags = 0
+        for bound in _BOUNDS:
+            flags |= self._add_bound(bound, getattr(attrs, bound, None))
+        dims: tuple[Dim, ...] | None = getattr(attrs, "dims", None)
+        if dims is not None:
+            flags |= _DIMS
+        self._flags.append(flags)
+        self._max_length.append(getattr(attrs, "max_length", 0))
+        min_length = getattr(attrs, "min_length", None)
+        self._min_length.append(-1 if min_length is None else min_length)
+        self._pattern.append(self._intern(getattr(attrs, "pattern", None)))
+        self._to.append(self._intern(getattr(attrs, "to", None)))
+        self._dim_start.append(self._add_dims(dims or ()))
+        self._dim_count.append(len(dims or ()))
+        return row
+
+    def add(self, descriptor: Descriptor) -> int:
+        """Store `descriptor`, returns its handle."""
+        handle = len(self)
+        (start, count, row) = (0, 0, -1)
+        if isinstance(descriptor, ObjectDescriptor):
+            (start, count) = (len(self._field_name), len(descriptor.fields))
+            for field in descriptor.fields:
+                self._field_name.append(self._intern(field.name))
+                row = self._add_type(field.type.kind, field.type)
+                self._field_type.append(row)
+                self._field_required.append(field.required)
+            row = -1
+        elif isinstance(descriptor, ArrayDescriptor):
+            start = self._add_dims(descriptor.dims)
+            count = len(descriptor.dims)
+            row = self._add_type(descriptor.items.kind, descriptor.items)
+        elif isinstance(descriptor, NumberDescriptor | StringDescriptor):
+            row = self._add_type(descriptor.kind, descriptor)
+        self._descriptor_kind.append(_DESCRIPTOR_KINDS.index(descriptor.kind))
+        self._name.append(self._intern(descriptor.name))
+        self._type.append(row)
+        self._start.append(start)
+        self._count.append(count)
+        return handle
+
+    def field_type(self, view: TypeView) -> FieldType:
+        """Codegen field type of `view`."""
+        kind = view.kind
+        if kind == "bool":
+            return BoolType(dims=view.dims)
+        if kind == "null":
+            return NullType(dims=view.dims)
+        if kind == "number":
+            assert view.format is not None
+            return NumberType(
+                view.format,
+                minimum=view.minimum,
+                maximum=view.maximum,
+                dims=view.dims,
+            )
+        if kind == "string":
+            assert view.max_length is not None
+            return StringType(
+                view.max_length,
+                min_length=view.min_length,
+                pattern=view.pattern,
+                dims=view.dims,
+            )
+        assert view.to is not None
+        return RefType(view.to, dims=view.dims)
+
+    def descriptor(self, handle: int) -> Descriptor:
+        """Codegen descriptor of `handle`."""
+        view = self[handle]
+        (kind, name) = (view.kind, view.name)
+        if kind == "object":
+            fields = tuple(
+                Field(f.name, self.field_type(f.type), f.required)
+                for f in view.fields or ()
+            )
+            return ObjectDescriptor(name, fields)
+        if kind == "array":
+            assert view.items is not None
+            items = self.field_type(view.items)
+            return ArrayDescriptor(name, items, view.dims or ())
+        if kind in ("number", "string"):
+            value = self.field_type(view._type)
+            assert isinstance(value, NumberType | StringType)
+            if isinstance(value, NumberType):
+                return NumberDescriptor(
+                    name,
+                    value.format,
+                    minimum=value.minimum,
+                    maximum=value.maximum,
+                )
+            return StringDescriptor(
+                name,
+                value.max_length,
+                min_length=value.min_length,
+                pattern=value.pattern,
+            )
+        return BoolDescriptor(name) if kind == "bool" else NullDescriptor(name)
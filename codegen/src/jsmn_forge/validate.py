@@ -0,0 +1,286 @@
+"""Validation of workspace documents, every error collected"""
+
+from __future__ import annotations
+
+import functools
+import re
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from jsonschema import Draft202012Validator  # type: ignore[import-untyped]
+from jsonschema.validators import validator_for  # type: ignore[import-untyped]
+from ruamel.yaml.error import YAMLError
+
+from jsmn_forge.loader import load, yaml
+from jsmn_forge.parallel import map_ordered
+from jsmn_forge.profile import phase
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+    from pathlib import Path
+
+    from jsmn_forge.cache import Cache
+
+# Structure of an OpenAPI 3.1 document, the parts codegen reads. Schema
+# objects are only checked to be schemas (objects or booleans), the full
+# meta-schema costs more than loading the document
+OPENAPI = yaml.load("""
+    $id: "urn:jsmn-forge:openapi-3.1"
+    type: object
+    required: [openapi, info]
+    anyOf:
+        - required: [paths]
+        - required: [components]
+        - required: [webhooks]
+    properties:
+        openapi:
+            type: string
+            pattern: "^3\\\\.1\\\\.\\\\d+(-.+)?$"
+        $id:
+            type: string
+        jsonSchemaDialect:
+            type: string
+        info:
+            type: object
+            required: [title, version]
+            properties:
+                title:
+                    type: string
+                version:
+                    type: string
+        servers:
+            type: array
+            items:
+                type: object
+                required: [url]
+        paths:
+            type: object
+            propertyNames:
+                pattern: "^/"
+            additionalProperties:
+                $ref: "#/$defs/path"
+        webhooks:
+            type: object
+            additionalProperties:
+                $ref: "#/$defs/path"
+        components:
+            type: object
+            properties:
+                schemas:
+                    type: object
+                    additionalProperties:
+                        $ref: "#/$defs/schema"
+                responses:
+                    type: object
+                    additionalProperties:
+                        $ref: "#/$defs/response"
+                parameters:
+                    type: object
+                    additionalProperties:
+                        $ref: "#/$defs/parameter"
+                pathItems:
+                    type: object
+                    additionalProperties:
+                        $ref: "#/$defs/path"
+        tags:
+            type: array
+            items:
+                type: object
+                required: [name]
+    $defs:
+        schema:
+            type: [object, boolean]
+        ref:
+            type: object
+            required: [$ref]
+            properties:
+                $ref:
+                    type: string
+        path:
+            type: object
+            properties:
+                get: {$ref: "#/$defs/operation"}
+                put: {$ref: "#/$defs/operation"}
+                post: {$ref: "#/$defs/operation"}
+                delete: {$ref: "#/$defs/operation"}
+                options: {$ref: "#/$defs/operation"}
+                head: {$ref: "#/$defs/operation"}
+                patch: {$ref: "#/$defs/operation"}
+                trace: {$ref: "#/$defs/operation"}
+                parameters:
+                    type: array
+                    items:
+                        $ref: "#/$defs/parameter"
+        operation:
+            type: object
+            properties:
+                operationId:
+                    type: string
+                parameters:
+                    type: array
+                    items:
+                        $ref: "#/$defs/parameter"
+                requestBody:
+                    type: object
+                    properties:
+                        content:
+                            $ref: "#/$defs/content"
+                responses:
+                    type: object
+                    additionalProperties:
+                        $ref: "#/$defs/response"
+        parameter:
+            oneOf:
+                - $ref: "#/$defs/ref"
+                - type: object
+                  required: [name, in]
+                  properties:
+                      name:
+                          type: string
+                      in:
+                          enum: [query, header, path, cookie]
+                      required:
+                          type: boolean
+                      schema:
+                          $ref: "#/$defs/schema"
+        response:
+            oneOf:
+                - $ref: "#/$defs/ref"
+                - type: object
+                  required: [description]
+                  properties:
+                      description:
+                          type: string
+                      content:
+                          $ref: "#/$defs/content"
+        content:
+            type: object
+            additionalProperties:
+                type: object
+                properties:
+                    schema:
+                        $ref: "#/$defs/schema"
+""")
+
+
+class Problem(NamedTuple):
+    # Document the problem is in, None when it was not read from a file
+    file: Path | None
+    # JSON pointer to the offending value
+    pointer: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.file or '<document>'}#{self.pointer}: {self.message}"
+
+
+class InvalidDocumentError(Exception):
+    """Raised with every problem found in one or more documents."""
+
+    def __init__(self, problems: Sequence[Problem]) -> None:
+        super().__init__("\n".join(str(p) for p in problems))
+        self.problems = list(problems)
+
+
+def _pointer(path: Iterable[Any]) -> str:
+    return "".join(
+        "/" + str(p).replace("~", "~0").replace("/", "~1") for p in path
+    )
+
+
+# $id of a schema -> validator
+_VALIDATORS: dict[str, Any] = {}
+
+
+def validator(schema: Any) -> Any:
+    """Validator of `schema`, checked and built on first use of its `$id`
+    only. A schema without an `$id` is checked and built every time.
+    """
+    key = schema.get("$id") if isinstance(schema, dict) else None
+    found = _VALIDATORS.get(key) if isinstance(key, str) else None
+    if found is not None:
+        return found
+    cls = validator_for(schema, default=Draft202012Validator)
+    cls.check_schema(schema)
+    found = cls(schema)
+    if isinstance(key, str):
+        _VALIDATORS[key] = found
+    return found
+
+
+def check(
+    instance: Any, schema: Any, file: Path | None = None
+) -> list[Problem]:
+    """Every problem of `instance` against `schema`, by pointer."""
+    errors = validator(schema).iter_errors(instance)
+    problems = [
+        Problem(file, _pointer(e.absolute_path), e.message) for e in errors
+    ]
+    return sorted(problems, key=lambda p: p.pointer)
+
+
+def check_openapi(doc: Any, file: Path | None = None) -> list[Problem]:
+    """Problems of `doc` as an OpenAPI 3.1 document (see `OPENAPI`)."""
+    with phase("validate", file):
+        return check(doc, OPENAPI, file)
+
+
+# regex for validating $id URIs: scheme://module/resource/vN
+RE_URI = re.compile(
+    r"^[a-zA-Z][a-zA-Z0-9-]*://[a-zA-Z0-9_-]+/[a-zA-Z0-9_-]+/v\d+$"
+)
+
+
+def check_id(doc: Any, file: Path | None = None) -> list[Problem]:
+    """Problem of the `$id` of `doc`, when it has one that is not a valid
+    resource URI (see `RE_URI`)."""
+    if not isinstance(doc, dict) or "$id" not in doc:
+        return []
+    if RE_URI.match(str(doc["$id"])):
+        return []
+    return [Problem(file, "/$id", f"{doc['$id']!r} is not a valid $id")]
+
+
+# Cache namespace of the problems of a document, bump when OPENAPI or the
+# checks change
+NAMESPACE = "openapi-problems:2"
+
+
+# Errors reading and parsing a document, see `unreadable`
+READ_ERRORS = (OSError, ValueError, YAMLError)
+
+
+def unreadable(file: Path, error: Exception) -> Problem:
+    """Problem of a document that raised one of `READ_ERRORS`."""
+    if isinstance(error, OSError):
+        return Problem(file, "", f"cannot read: {error.strerror}")
+    return Problem(file, "", f"cannot parse: {error}")
+
+
+def _check_file(file: Path, cache: Cache | None = None) -> list[Problem]:
+    def build(data: bytes) -> list[Problem]:
+        doc = load(data, suffix=file.suffix)
+        return check_openapi(doc, file) + check_id(doc, file)
+
+    try:
+        if cache is None:
+            return build(file.read_bytes())
+        problems: list[Problem] = cache.load(file, NAMESPACE, build)
+    except READ_ERRORS as e:
+        return [unreadable(file, e)]
+    # Cached by content, identical files share the problems of the first
+    return [p._replace(file=file) for p in problems]
+
+
+def files(
+    paths: Sequence[Path],
+    *,
+    workers: int | None = None,
+    cache: Cache | None = None,
+) -> list[Problem]:
+    """Problems of every OpenAPI document in `paths`, in path order.
+
+    Documents are loaded and validated on `workers` (see `map_ordered`),
+    and with `cache` a document is only validated again when it changed.
+    """
+    fn = functools.partial(_check_file, cache=cache)
+    return [p for found in map_ordered(fn, paths, workers) for p in found]
@@ -1,9 +1,23 @@
-from .merge import MergeConflict, MergeResult, merge
-from .normalize import normalize
+from .digest import Digests, digest
+from .merge import (
+    MergeConflict,
+    MergeManyResult,
+    MergeResult,
+    merge,
+    merge_many,
+)
+from .normalize import normalize, ref_sites
+from .stream import normalize_yaml
 
 __all__ = [
+    "Digests",
     "MergeConflict",
+    "MergeManyResult",
     "MergeResult",
+    "digest",
     "merge",
+    "merge_many",
     "normalize",
+    "normalize_yaml",
+    "ref_sites",
 ]
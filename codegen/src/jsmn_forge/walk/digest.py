@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import marshal
+from hashlib import blake2b
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any
+
+from jsmn_forge.spec.automaton import compile_graph
+
+if TYPE_CHECKING:
+    from jsmn_forge.spec.behavior import SortKey
+    from jsmn_forge.spec.node import Behavior, Node
+
+_CONTAINERS = (dict, list)
+
+
+def dedups(items: list[Any], sort_key: SortKey) -> bool:
+    """True when two members of a sorted set like list share a key, a
+    merge keeps one of them."""
+    return any(sort_key(a) == sort_key(b) for (a, b) in pairwise(items))
+
+
+class Digests:
+    """Content digests of dict/list subtrees, looked up by identity.
+
+    Equal digests imply equal (`==`) subtrees, so walkers may skip a pair
+    of subtrees in constant time. The converse does not hold: values that
+    only compare equal across types (1 == 1.0) or dicts with a different
+    key order digest differently, and are compared the slow way.
+
+    The table keeps every digested container alive, so an id can not be
+    reused by another object while the table exists. Digested containers
+    must not be mutated.
+
+    Containers are also marked when a set like list at or below them
+    `dedups`: merging such a subtree, even with itself, changes it.
+    """
+
+    __slots__ = ("_dedup", "_table")
+
+    def __init__(self) -> None:
+        self._table: dict[int, tuple[Any, bytes]] = {}
+        self._dedup: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def get(self, obj: Any) -> bytes | None:
+        entry = self._table.get(id(obj))
+        return entry[1] if entry is not None else None
+
+    def add(
+        self, obj: dict[Any, Any] | list[Any], *, dedup: bool = False
+    ) -> bytes:
+        """Digest `obj`, whose container children are already digested.
+
+        `dedup` marks a set like list that `dedups`.
+        """
+        table = self._table
+        children = obj.values() if isinstance(obj, dict) else obj
+        if dedup or (
+            self._dedup
+            and any(
+                id(v) in self._dedup
+                for v in children
+                if isinstance(v, _CONTAINERS)
+            )
+        ):
+            self._dedup.add(id(obj))
+        # A child container is represented by a 1-tuple of its digest, no
+        # scalar loaded from YAML/JSON is a tuple
+        if isinstance(obj, dict):
+            values = [
+                (table[id(v)][1],) if isinstance(v, _CONTAINERS) else v
+                for v in obj.values()
+            ]
+            data: Any = (tuple(obj), values)
+        else:
+            data = [
+                (table[id(v)][1],) if isinstance(v, _CONTAINERS) else v
+                for v in obj
+            ]
+        try:
+            # Version 2 has no back references, which would make the
+            # encoding depend on object identity
+            blob = b"m" + marshal.dumps(data, 2)
+        except ValueError:
+            # Not marshallable (ie: a YAML timestamp), repr is exact enough
+            # for the plain data types a loader produces
+            blob = b"r" + repr(data).encode("utf-8", "surrogatepass")
+        digest = blake2b(blob, digest_size=16).digest()
+        table[id(obj)] = (obj, digest)
+        return digest
+
+    def same(self, a: Any, b: Any) -> bool:
+        """True when `a` and `b` are known equal by digest."""
+        if a is b:
+            return True
+        da = self._table.get(id(a))
+        if da is None:
+            return False
+        db = self._table.get(id(b))
+        return db is not None and da[1] == db[1]
+
+    def stable(self, a: Any, b: Any) -> bool:
+        """True when merging `b` into `a` leaves `a` as is: both are known
+        equal and nothing below them dedups."""
+        dedup = self._dedup
+        return self.same(a, b) and id(a) not in dedup and id(b) not in dedup
+
+
+def digest(
+    obj: Any,
+    digests: Digests,
+    context: tuple[Node, Behavior] | None = None,
+) -> bytes | None:
+    """Digest every container of an existing tree, bottom up.
+
+    With the `context` the tree was normalized for, set like lists are
+    checked for members a merge would drop. Without it, every list of two
+    or more members is taken to dedup.
+    """
+    if not isinstance(obj, _CONTAINERS):
+        return None
+    known = digests.get(obj)
+    if known is not None:
+        return known
+    (auto, edge) = (None, -1) if context is None else compile_graph(context)
+    # Post order without recursion: children before their parent
+    stack: list[tuple[Any, int, bool]] = [(obj, edge, False)]
+    while stack:
+        (node, edge, expanded) = stack.pop()
+        if expanded:
+            if not isinstance(node, list):
+                dedup = False
+            elif auto is None:
+                dedup = len(node) > 1
+            else:
+                key = auto.sort_key[edge]
+                dedup = key is not None and dedups(node, key)
+            digests.add(node, dedup=dedup)
+            continue
+        stack.append((node, edge, True))
+        if isinstance(node, list):
+            children = [(child, edge) for child in node]
+        else:
+            state = -1 if auto is None else auto.target[edge]
+            children = [
+                (child, -1 if auto is None else auto.step(state, k))
+                for (k, child) in node.items()
+            ]
+        for child, e in children:
+            if isinstance(child, _CONTAINERS) and digests.get(child) is None:
+                stack.append((child, e, False))
+    return digests.get(obj)
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from copy import deepcopy
+import heapq
 from dataclasses import dataclass
+from operator import itemgetter
 from typing import TYPE_CHECKING, Any, NamedTuple
 
+from jsmn_forge.spec.automaton import Automaton, compile_graph
+from jsmn_forge.spec.behavior import canonical_scope
 from jsmn_forge.spec.location import ROOT, Location
 from jsmn_forge.spec.node import Behavior, ConflictPolicy, Node
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Sequence
+
+    from .digest import Digests
 
 
 @dataclass
@@ -23,24 +28,58 @@ class MergeResult(NamedTuple):
     conflicts: list[MergeConflict]
 
 
-def _merge_dict(
-    dst: dict[str, Any],
-    src: dict[str, Any],
-    node: Node,
-    loc: Location = ROOT,
-) -> MergeResult:
-    result = dict(dst)
-    conflicts: list[MergeConflict] = []
-    for k, v in src.items():
-        if k not in result:
-            result[k] = deepcopy(v)
-        else:
-            child = node.child(k)
-            child_loc = loc.push(k)
-            (x, c) = merge(result[k], v, child, child_loc)
-            conflicts.extend(c)
-            result[k] = x
-    return MergeResult(result, conflicts)
+_CONTAINERS = (dict, list)
+
+
+def _share(x: Any) -> Any:
+    return x
+
+
+def _copy(x: Any) -> Any:
+    """`deepcopy` of a JSON value, with an explicit stack. Like it, a
+    container met twice is copied once."""
+    if not isinstance(x, _CONTAINERS):
+        return x
+    memo: dict[int, Any] = {}
+    holder = [x]
+    # (original, container, slot): copy original into container[slot]
+    stack: list[tuple[Any, Any, Any]] = [(x, holder, 0)]
+    while stack:
+        (x, container, slot) = stack.pop()
+        known = memo.get(id(x))
+        if known is not None:
+            container[slot] = known
+            continue
+        out = dict(x) if isinstance(x, dict) else list(x)
+        memo[id(x)] = container[slot] = out
+        items = x.items() if isinstance(x, dict) else enumerate(x)
+        stack += [(v, out, k) for (k, v) in items if isinstance(v, _CONTAINERS)]
+    return holder[0]
+
+
+def _differ(a: Any, b: Any) -> bool:
+    """`a != b` for JSON values, with an explicit stack once they nest
+    deeper than the recursion limit."""
+    try:
+        return bool(a != b)
+    except RecursionError:
+        pass
+    stack = [(a, b)]
+    while stack:
+        (a, b) = stack.pop()
+        if a is b:
+            continue
+        if isinstance(a, dict) and isinstance(b, dict):
+            if a.keys() != b.keys():
+                return True
+            stack += [(v, b[k]) for (k, v) in a.items()]
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                return True
+            stack += zip(a, b, strict=True)
+        elif a != b:
+            return True
+    return False
 
 
 def _merge_set_like(
@@ -49,41 +88,140 @@ def _merge_set_like(
     sort_key: Callable[[Any], str],
     conflict_policy: ConflictPolicy,
     loc: Location = ROOT,
+    *,
+    share: bool = False,
+    digests: Digests | None = None,
 ) -> MergeResult:
     # NOTE sort_key is behaving like an "identity"
     #      convert list into dict for set like symantics
+    copy = _share if share else _copy
     conflicts: list[MergeConflict] = []
     seen = {sort_key(x): x for x in dst}
     for item in src:
         k = sort_key(item)
         if k not in seen:
-            seen[k] = deepcopy(item)
-        elif seen[k] != item:
-            conflicts.append(MergeConflict(loc, seen[k], item))
+            seen[k] = copy(item)
+            continue
+        known = seen[k]
+        if not (digests and digests.same(known, item)) and _differ(known, item):
+            conflicts.append(MergeConflict(loc, known, item))
             if conflict_policy == ConflictPolicy.REPLACE:
-                seen[k] = deepcopy(item)
+                seen[k] = copy(item)
     return MergeResult(
         sorted(seen.values(), key=sort_key),
         conflicts,
     )
 
 
-def _merge_list(
+# (dst, src, edge, location, container, slot): merge dst and src into
+# container[slot]
+type _Task = tuple[Any, Any, int, Location, Any, Any]
+
+
+def _expand_dict(
+    auto: Automaton,
+    dst: dict[str, Any],
+    src: dict[str, Any],
+    edge: int,
+    loc: Location,
+    *,
+    copy: Callable[[Any], Any],
+) -> tuple[dict[str, Any], list[_Task]]:
+    """A fresh result holding `dst` and the `src` only keys, and the
+    pairs still to merge into it, in `src` order."""
+    state = auto.target[edge]
+    table = auto.table[state]
+    ext = auto.extension[state]
+    default = auto.default[state]
+    result = dict(dst)
+    children: list[_Task] = []
+    for k, v in src.items():
+        if k not in result:
+            result[k] = copy(v)
+        else:
+            # Automaton.step, inlined
+            e = table.get(k)
+            if e is None:
+                e = ext if ext >= 0 and k.startswith("x-") else default
+            children.append((result[k], v, e, loc.push(k), result, k))
+    return (result, children)
+
+
+def _expand_list(
     dst: list[Any],
     src: list[Any],
-    context: tuple[Node, Behavior],
-    loc: Location = ROOT,
-) -> MergeResult:
-    conflicts: list[MergeConflict] = []
+    edge: int,
+    loc: Location,
+    *,
+    copy: Callable[[Any], Any],
+    digests: Digests | None,
+) -> tuple[list[Any], list[_Task]]:
+    """Positional counterpart of `_expand_dict`."""
     lresult = list(dst)
+    children: list[_Task] = []
     n = min(len(dst), len(src))
     for i in range(n):
-        if lresult[i] != src[i]:
-            (x, c) = merge(lresult[i], src[i], context, loc.push(str(i)))
-            conflicts.extend(c)
-            lresult[i] = x
-    lresult += [deepcopy(x) for x in src[n:]]
-    return MergeResult(lresult, conflicts)
+        if digests is not None and digests.stable(lresult[i], src[i]):
+            continue
+        if _differ(lresult[i], src[i]):
+            children.append(
+                (lresult[i], src[i], edge, loc.push(str(i)), lresult, i)
+            )
+    lresult += [copy(x) for x in src[n:]]
+    return (lresult, children)
+
+
+def _merge(
+    auto: Automaton,
+    dst: Any,
+    src: Any,
+    edge: int,
+    loc: Location,
+    *,
+    share: bool = False,
+    digests: Digests | None = None,
+) -> MergeResult:
+    copy = _share if share else _copy
+    conflicts: list[MergeConflict] = []
+    # Pairs are taken in document order, so conflicts are reported in the
+    # order a recursive walk would find them
+    holder = [dst]
+    stack: list[_Task] = [(dst, src, edge, loc, holder, 0)]
+    while stack:
+        (dst, src, edge, loc, container, slot) = stack.pop()
+        if digests is not None and digests.stable(dst, src):
+            # container[slot] already holds dst
+            continue
+        if isinstance(dst, dict) and isinstance(src, dict):
+            (container[slot], children) = _expand_dict(
+                auto, dst, src, edge, loc, copy=copy
+            )
+        elif isinstance(dst, list) and isinstance(src, list):
+            sort_key, conflict_policy = auto.sort_key[edge], auto.policy[edge]
+            if sort_key:
+                (container[slot], c) = _merge_set_like(
+                    dst,
+                    src,
+                    sort_key,
+                    conflict_policy,
+                    loc,
+                    share=share,
+                    digests=digests,
+                )
+                conflicts.extend(c)
+                continue
+            (container[slot], children) = _expand_list(
+                dst, src, edge, loc, copy=copy, digests=digests
+            )
+        else:
+            if dst != src:
+                keep = auto.policy[edge] == ConflictPolicy.KEEP
+                container[slot] = dst if keep else src
+                conflicts.append(MergeConflict(loc, dst, src))
+            continue
+        children.reverse()
+        stack += children
+    return MergeResult(holder[0], conflicts)
 
 
 def merge(
@@ -91,20 +229,281 @@ def merge(
     src: Any,
     context: tuple[Node, Behavior],
     loc: Location = ROOT,
+    *,
+    share: bool = False,
+    digests: Digests | None = None,
 ) -> MergeResult:
-    (node, behavior) = context
-    if isinstance(dst, dict) and isinstance(src, dict):
-        return _merge_dict(dst, src, node, loc)
-
-    if isinstance(dst, list) and isinstance(src, list):
-        sort_key, conflict_policy = behavior.sort_key, behavior.conflict_policy
-        if sort_key:
-            return _merge_set_like(dst, src, sort_key, conflict_policy, loc)
+    """Merge `src` into `dst`. Neither input is modified.
+
+    Containers on paths present in both inputs are always fresh. Any
+    other subtree of `dst` is shared with the result. Subtrees only
+    present in `src` are deep copied, unless `share` is set, in which
+    case they are shared too and the result may alias both inputs.
+    Conflict destination/source values alias the inputs in either mode.
+    Use `share` when neither input is mutated after the call.
+
+    With `digests`, subtrees known identical by digest are not merged,
+    the `dst` subtree is kept as is, unless a set-like array below it
+    holds duplicate members (see `Digests.stable`). The result is the
+    same as without `digests`.
+    """
+    (auto, edge) = compile_graph(context)
+    with canonical_scope():
+        return _merge(auto, dst, src, edge, loc, share=share, digests=digests)
+
+
+class MergeManyResult(NamedTuple):
+    value: Any
+    # (index of the source document, conflict)
+    conflicts: list[tuple[int, MergeConflict]]
+
+
+# (document index, value, position). A position is the path of indexes
+# (key order, list index) to the value in its document, as a linked list
+# (parent, index), only flattened for conflicts
+type _Pos = tuple[_Pos, int] | None
+type _Member = tuple[int, Any, _Pos]
+# (members, edge, location, container, slot)
+type _Group = tuple[list[_Member], int, Location, Any, Any]
+# (document index, position, conflict), sorts in fold order
+type _Found = tuple[int, tuple[int, ...], MergeConflict]
+
+
+def _flatten(pos: _Pos) -> tuple[int, ...]:
+    out: list[int] = []
+    while pos is not None:
+        (pos, i) = pos
+        out.append(i)
+    out.reverse()
+    return tuple(out)
+
+
+def _group_keys(
+    members: list[_Member],
+    *,
+    take: Callable[[int, Any], Any],
+) -> tuple[dict[str, Any], dict[str, list[_Member]]]:
+    """Result holding every key in first seen order, with the values of
+    keys only one document has, and the members of every other key."""
+    # The first member is the destination of every merge below it, its
+    # position is never reported
+    (first_doc, first, _) = members[0]
+    result = dict(first)
+    groups: dict[str, list[_Member]] = {}
+    # Keys first found in a later document
+    later: dict[str, _Member] = {}
+    for doc, value, pos in members[1:]:
+        for i, (k, v) in enumerate(value.items()):
+            group = groups.get(k)
+            if group is not None:
+                group.append((doc, v, (pos, i)))
+            elif k in first:
+                groups[k] = [(first_doc, first[k], None), (doc, v, (pos, i))]
+            elif k in later:
+                groups[k] = [later[k], (doc, v, (pos, i))]
+            else:
+                later[k] = (doc, v, (pos, i))
+                result[k] = None
+    for k, (doc, v, _) in later.items():
+        if k not in groups:
+            result[k] = take(doc, v)
+    if first_doc != 0:
+        for k, v in first.items():
+            if k not in groups:
+                result[k] = take(first_doc, v)
+    return (result, groups)
+
+
+def _gather_dict(
+    auto: Automaton,
+    members: list[_Member],
+    edge: int,
+    loc: Location,
+    *,
+    take: Callable[[int, Any], Any],
+) -> tuple[dict[str, Any], list[_Group]]:
+    """The result for dict members, and the groups still to merge into
+    it."""
+    (result, groups) = _group_keys(members, take=take)
+    state = auto.target[edge]
+    children: list[_Group] = []
+    for k, group in groups.items():
+        value = group[0][1]
+        if not isinstance(value, _CONTAINERS) and all(
+            m[1] == value for m in group
+        ):
+            # Agreeing scalars, the common case
+            result[k] = value
         else:
-            return _merge_list(dst, src, context, loc)
+            e = auto.step(state, k)
+            children.append((group, e, loc.push(k), result, k))
+    return (result, children)
+
+
+def _gather_list(
+    members: list[_Member],
+    edge: int,
+    loc: Location,
+    *,
+    take: Callable[[int, Any], Any],
+) -> tuple[list[Any], list[_Group]]:
+    """Positional counterpart of `_gather_dict`."""
+    result: list[Any] = []
+    children: list[_Group] = []
+    for i in range(max(len(value) for (_, value, _) in members)):
+        group: list[_Member] = [
+            (doc, value[i], (pos, i))
+            for doc, value, pos in members
+            if i < len(value)
+        ]
+        if len(group) == 1:
+            result.append(take(group[0][0], group[0][1]))
+        else:
+            result.append(None)
+            children.append((group, edge, loc.push(str(i)), result, i))
+    return (result, children)
+
+
+def _merge_sorted(
+    members: list[_Member],
+    sort_key: Callable[[Any], str],
+    conflict_policy: ConflictPolicy,
+    loc: Location,
+    *,
+    take: Callable[[int, Any], Any],
+    found: list[_Found],
+) -> list[Any]:
+    """k-way merge of set-like arrays already sorted by `sort_key`.
+
+    Members sharing a key are met in document order. Like the fold, the
+    last of the first document's duplicates wins silently, any later
+    member is compared to the current one.
+    """
+    first = members[0][0]
+    positions = {doc: pos for (doc, _, pos) in members}
+    streams = [
+        [(sort_key(x), doc, i, x) for i, x in enumerate(value)]
+        for (doc, value, _) in members
+    ]
+    result: list[Any] = []
+    current: Any = None
+    current_key: str | None = None
+    for k, doc, i, x in heapq.merge(*streams, key=itemgetter(0)):
+        if k != current_key:
+            if current_key is not None:
+                result.append(current)
+            (current_key, current) = (k, take(doc, x))
+        elif doc == first:
+            current = take(doc, x)
+        elif _differ(current, x):
+            conflict = MergeConflict(loc, current, x)
+            found.append((doc, (*_flatten(positions[doc]), i), conflict))
+            if conflict_policy == ConflictPolicy.REPLACE:
+                current = take(doc, x)
+    if current_key is not None:
+        result.append(current)
+    return result
+
+
+def _fold(
+    auto: Automaton,
+    members: list[_Member],
+    edge: int,
+    loc: Location,
+    *,
+    share: bool,
+    take: Callable[[int, Any], Any],
+    found: list[_Found],
+) -> Any:
+    """Pairwise merge of members of different types, left to right."""
+    (doc, value, _) = members[0]
+    value = take(doc, value)
+    for doc, src, pos in members[1:]:
+        if isinstance(src, (dict, list)):
+            (value, c) = _merge(auto, value, src, edge, loc, share=share)
+            base = _flatten(pos)
+            found += [(doc, (*base, n), x) for n, x in enumerate(c)]
+        elif value != src:
+            found.append((doc, _flatten(pos), MergeConflict(loc, value, src)))
+            if auto.policy[edge] == ConflictPolicy.REPLACE:
+                value = src
+    return value
+
+
+def merge_many(
+    docs: Sequence[Any],
+    context: tuple[Node, Behavior],
+    loc: Location = ROOT,
+    *,
+    share: bool = False,
+) -> MergeManyResult:
+    """Merge all `docs` in one traversal. None of the inputs is modified.
+
+    Same value and conflicts, in the same order, as merging each
+    document into the result of merging the ones before it, with the
+    same aliasing (see `merge`): subtrees only the first document has
+    are shared, those first found in a later one are deep copied unless
+    `share` is set. At every dict key, the values of all documents that
+    have the key are merged together; set-like arrays are merged with a
+    k-way merge on their sort key, so `docs` must be normalized with
+    `context`.
+    """
+    if not docs:
+        return MergeManyResult(None, [])
+    (auto, edge) = compile_graph(context)
+    if len(docs) == 2:
+        # A single pairwise merge is one traversal already, and cheaper
+        with canonical_scope():
+            (value, c) = _merge(auto, docs[0], docs[1], edge, loc, share=share)
+        return MergeManyResult(value, [(1, x) for x in c])
+    copy = _share if share else _copy
+
+    def take(doc: int, value: Any) -> Any:
+        return value if doc == 0 else copy(value)
 
-    if dst != src:
-        v = dst if behavior.conflict_policy == ConflictPolicy.KEEP else src
-        return MergeResult(v, [MergeConflict(loc, dst, src)])
-    else:
-        return MergeResult(dst, [])
+    found: list[_Found] = []
+    holder: list[Any] = [None]
+    members: list[_Member] = [(doc, x, None) for doc, x in enumerate(docs)]
+    # Groups are independent, conflicts are put in order at the end
+    stack: list[_Group] = [(members, edge, loc, holder, 0)]
+    with canonical_scope():
+        while stack:
+            (members, edge, loc, container, slot) = stack.pop()
+            values = [value for (_, value, _) in members]
+            if len(members) == 1:
+                container[slot] = take(members[0][0], values[0])
+                continue
+            if all(isinstance(x, dict) for x in values):
+                (container[slot], children) = _gather_dict(
+                    auto, members, edge, loc, take=take
+                )
+                stack += children
+                continue
+            sort_key = auto.sort_key[edge]
+            if all(isinstance(x, list) for x in values):
+                if sort_key:
+                    container[slot] = _merge_sorted(
+                        members,
+                        sort_key,
+                        auto.policy[edge],
+                        loc,
+                        take=take,
+                        found=found,
+                    )
+                    continue
+                (container[slot], children) = _gather_list(
+                    members, edge, loc, take=take
+                )
+                stack += children
+                continue
+            container[slot] = _fold(
+                auto,
+                members,
+                edge,
+                loc,
+                share=share,
+                take=take,
+                found=found,
+            )
+    found.sort(key=lambda f: (f[0], f[1]))
+    return MergeManyResult(holder[0], [(doc, c) for (doc, _, c) in found])
@@ -1,8 +1,117 @@
 from typing import Any
 
+from jsmn_forge.spec.automaton import Automaton, compile_graph
 from jsmn_forge.spec.location import ROOT, Location
 from jsmn_forge.spec.node import Behavior, Node
-from jsmn_forge.spec.ref import Ref
+from jsmn_forge.spec.ref import RefSites, normalize_ref
+
+from .digest import Digests, dedups
+
+# (input, output container, edge, location). A None location marks the
+# finish of the output container, once all of its children are done
+type _Task = tuple[Any, Any, int, Location | None]
+
+
+def _empty(obj: Any) -> Any:
+    """A new output container for `obj`, None for scalars."""
+    if isinstance(obj, dict):
+        return {}
+    if isinstance(obj, list):
+        return []
+    return None
+
+
+def _expand_dict(
+    auto: Automaton,
+    obj: dict[str, Any],
+    out: dict[str, Any],
+    edge: int,
+    loc: Location,
+    *,
+    scheme: str,
+) -> list[_Task]:
+    """Fill `out` with the scalars of `obj` and new containers for the
+    children still to normalize, returned in document order."""
+    state = auto.target[edge]
+    opaque = auto.opaque[state]
+    table = auto.table[state]
+    ext = auto.extension[state]
+    default = auto.default[state]
+    children: list[_Task] = []
+    for key, val in obj.items():
+        if key == "$ref" and not opaque:
+            out[key] = (
+                normalize_ref(val, scheme) if isinstance(val, str) else val
+            )
+            continue
+        # Automaton.step, inlined
+        e = table.get(key)
+        if e is None:
+            e = ext if ext >= 0 and key.startswith("x-") else default
+        child = _empty(val)
+        if child is None:
+            out[key] = val
+        else:
+            out[key] = child
+            children.append((val, child, e, loc.push(key)))
+    return children
+
+
+def _expand_list(
+    obj: list[Any],
+    out: list[Any],
+    edge: int,
+    loc: Location,
+) -> list[_Task]:
+    """List counterpart of `_expand_dict`, items share the list's edge."""
+    children: list[_Task] = []
+    for i, item in enumerate(obj):
+        child = _empty(item)
+        if child is None:
+            out.append(item)
+        else:
+            out.append(child)
+            children.append((item, child, edge, loc.push(str(i))))
+    return children
+
+
+def _normalize(
+    auto: Automaton,
+    obj: Any,
+    edge: int,
+    loc: Location,
+    *,
+    scheme: str,
+    digests: Digests | None,
+) -> Any:
+    root = _empty(obj)
+    if root is None:
+        return obj
+    # Containers are created (and linked into their parent) in pre order,
+    # finished (sorted, digested) in post order
+    stack: list[_Task] = [(obj, root, edge, loc)]
+    while stack:
+        (obj, out, edge, task_loc) = stack.pop()
+        if task_loc is None:
+            key = auto.sort_key[edge] if isinstance(out, list) else None
+            if key is not None:
+                out.sort(key=key)
+            if digests is not None:
+                digests.add(out, dedup=key is not None and dedups(out, key))
+            continue
+        if isinstance(out, dict):
+            children = _expand_dict(
+                auto, obj, out, edge, task_loc, scheme=scheme
+            )
+            finish = digests is not None
+        else:
+            children = _expand_list(obj, out, edge, task_loc)
+            finish = digests is not None or bool(auto.sort_key[edge])
+        if finish:
+            stack.append((None, out, edge, None))
+        children.reverse()
+        stack += children
+    return root
 
 
 def normalize(
@@ -11,30 +120,55 @@ def normalize(
     loc: Location = ROOT,
     *,
     scheme: str | None = None,
+    digests: Digests | None = None,
 ) -> Any:
-    (node, behavior) = context
-    if isinstance(obj, dict):
-        out: dict[str, Any] = {}
-        for key, val in obj.items():
-            if key == "$ref" and not node.opaque:
-                out[key] = (
-                    Ref(val).normalize(scheme or "forge")
-                    if isinstance(val, str)
-                    else val
-                )
-            else:
-                out[key] = normalize(
-                    val,
-                    node.child(key),
-                    loc.push(key),
-                    scheme=scheme,
-                )
-        return out
-    if isinstance(obj, list):
-        sort_key = behavior.sort_key
-        items = [
-            normalize(item, context, loc.push(str(i)), scheme=scheme)
-            for i, item in enumerate(obj)
+    """Normalize `obj` for `context`, returning a new tree.
+
+    With `digests`, every container of the result is digested as it is
+    built (see `Digests`).
+    """
+    (auto, edge) = compile_graph(context)
+    return _normalize(
+        auto, obj, edge, loc, scheme=scheme or "forge", digests=digests
+    )
+
+
+def ref_sites(
+    obj: Any,
+    context: tuple[Node, Behavior],
+    loc: Location = ROOT,
+) -> RefSites:
+    """Location of every object with a `$ref` in a normalized tree, with
+    its reference, in document order (see `RefIndex`).
+
+    Walked once normalization is done: sorted lists move the objects in
+    them.
+    """
+    (auto, edge) = compile_graph(context)
+    sites: RefSites = []
+    if _empty(obj) is None:
+        return sites
+    stack: list[tuple[Any, int, Location]] = [(obj, edge, loc)]
+    while stack:
+        (obj, edge, loc) = stack.pop()
+        if isinstance(obj, list):
+            stack += [
+                (item, edge, loc.push(str(i)))
+                for (i, item) in reversed(list(enumerate(obj)))
+                if isinstance(item, (dict, list))
+            ]
+            continue
+        state = auto.target[edge]
+        opaque = auto.opaque[state]
+        ref = obj.get("$ref")
+        if isinstance(ref, str) and not opaque:
+            sites.append((loc, ref))
+        # Like `_expand_dict`, a $ref value is kept as is
+        children = [
+            (val, auto.step(state, key), loc.push(key))
+            for (key, val) in obj.items()
+            if isinstance(val, (dict, list)) and (opaque or key != "$ref")
         ]
-        return sorted(items, key=sort_key) if sort_key else items
-    return obj
+        children.reverse()
+        stack += children
+    return sites
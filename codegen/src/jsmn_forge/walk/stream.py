@@ -0,0 +1,229 @@
+"""Normalize YAML straight from the parser event stream"""
+
+from __future__ import annotations
+
+import contextlib
+from pathlib import PurePath
+from typing import TYPE_CHECKING, Any
+
+from ruamel.yaml.error import YAMLError
+from ruamel.yaml.events import (
+    AliasEvent,
+    DocumentStartEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceEndEvent,
+    SequenceStartEvent,
+)
+from ruamel.yaml.nodes import ScalarNode
+
+from jsmn_forge.loader import yaml
+from jsmn_forge.spec.automaton import Automaton, compile_graph
+from jsmn_forge.spec.ref import normalize_ref
+
+from .digest import dedups
+from .normalize import normalize
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from pathlib import Path
+
+    from ruamel.yaml import YAML
+
+    from jsmn_forge.spec.node import Behavior, Node
+
+    from .digest import Digests
+
+# Edge of a container kept as loaded, the value of a `$ref` that is not a
+# string is not normalized
+_RAW = -1
+
+# Pending key of a mapping frame waiting for its next key
+_NO_KEY: Any = object()
+
+
+class _Fallback(Exception):
+    """The stream uses YAML the event walker leaves to the full loader:
+    aliases, merge keys, tagged or complex keys and collections, duplicate
+    keys, several documents. The loader then builds the document (or
+    raises the error it always raised)."""
+
+
+class _Frame:
+    """An open container and what its children normalize with."""
+
+    __slots__ = ("default", "edge", "ext", "key", "opaque", "out", "table")
+
+    def __init__(self, auto: Automaton, out: Any, edge: int) -> None:
+        self.out = out
+        self.edge = edge
+        self.key = _NO_KEY
+        if edge == _RAW or isinstance(out, list):
+            (self.table, self.ext, self.default) = ({}, -1, _RAW)
+            self.opaque = True
+            return
+        state = auto.target[edge]
+        self.table = auto.table[state]
+        self.ext = auto.extension[state]
+        self.default = auto.default[state]
+        self.opaque = auto.opaque[state]
+
+
+def _scalars(loader: YAML) -> Callable[[Any], Any]:
+    """Scalar event to value, as the safe constructor builds it."""
+    resolve = loader.resolver.resolve
+    construct = loader.constructor.construct_non_recursive_object
+    merge = "tag:yaml.org,2002:merge"
+    # Plain scalars repeat a lot (types, formats, names), the value only
+    # depends on the text
+    plain: dict[str, Any] = {}
+
+    def scalar(event: ScalarEvent) -> Any:
+        (tag, value) = (event.tag, event.value)
+        if tag is None:
+            if not event.implicit[0]:
+                # Quoted, always a string
+                return value
+            try:
+                return plain[value]
+            except KeyError:
+                pass
+        if tag is None or tag == "!":
+            tag = resolve(ScalarNode, value, event.implicit)
+        if tag == merge:
+            raise _Fallback
+        try:
+            out = construct(ScalarNode(tag, value))
+        except YAMLError as e:
+            raise _Fallback from e
+        if event.tag is None:
+            plain[value] = out
+        return out
+
+    return scalar
+
+
+def _finish(auto: Automaton, frame: _Frame, digests: Digests | None) -> None:
+    """Sort and digest a container once all of its children are done."""
+    if frame.edge == _RAW:
+        return
+    out = frame.out
+    key = auto.sort_key[frame.edge] if isinstance(out, list) else None
+    if key is not None:
+        out.sort(key=key)
+    if digests is not None:
+        digests.add(out, dedup=key is not None and dedups(out, key))
+
+
+def _place(frame: _Frame, value: Any, *, scheme: str) -> tuple[Any, int]:
+    """Add `value` to the open container, returning the value added and
+    the edge it normalizes with. `_RAW` for a mapping key."""
+    out = frame.out
+    if isinstance(out, list):
+        out.append(value)
+        return (value, frame.edge)
+    key = frame.key
+    if key is _NO_KEY:
+        if isinstance(value, (dict, list)) or value in out:
+            raise _Fallback
+        frame.key = value
+        return (value, _RAW)
+    frame.key = _NO_KEY
+    if frame.edge == _RAW:
+        e = _RAW
+    elif key == "$ref" and not frame.opaque:
+        e = _RAW
+        if isinstance(value, str):
+            value = normalize_ref(value, scheme)
+    else:
+        # Automaton.step, inlined
+        step = frame.table.get(key)
+        if step is not None:
+            e = step
+        elif frame.ext >= 0 and key.startswith("x-"):
+            e = frame.ext
+        else:
+            e = frame.default
+    out[key] = value
+    return (value, e)
+
+
+def _walk(
+    events: Iterable[Any],
+    auto: Automaton,
+    edge: int,
+    *,
+    scalar: Callable[[Any], Any],
+    scheme: str,
+    digests: Digests | None,
+) -> Any:
+    root: Any = None
+    started = False
+    stack: list[_Frame] = []
+    for event in events:
+        kind = type(event)
+        if kind is ScalarEvent:
+            value = scalar(event)
+        elif kind is MappingStartEvent or kind is SequenceStartEvent:
+            if event.tag is not None:
+                raise _Fallback
+            value = {} if kind is MappingStartEvent else []
+        elif kind is MappingEndEvent or kind is SequenceEndEvent:
+            _finish(auto, stack.pop(), digests)
+            continue
+        elif kind is AliasEvent:
+            raise _Fallback
+        else:
+            if kind is DocumentStartEvent:
+                if started or event.version is not None:
+                    raise _Fallback
+                started = True
+            continue
+        if stack:
+            (value, e) = _place(stack[-1], value, scheme=scheme)
+        else:
+            (root, e) = (value, edge)
+        if kind is not ScalarEvent:
+            stack.append(_Frame(auto, value, e))
+    return root
+
+
+def normalize_yaml(
+    stream: Path | bytes | str,
+    context: tuple[Node, Behavior],
+    *,
+    scheme: str | None = None,
+    digests: Digests | None = None,
+) -> Any:
+    """Parse and normalize a YAML document in one pass.
+
+    Same result as `normalize(yaml.load(stream), context)`, built from
+    the parser events without composing the loaded document first.
+    Documents the event walker does not handle (ie: with aliases or merge
+    keys) are loaded and normalized the usual way.
+    """
+    (auto, edge) = compile_graph(context)
+    scheme = scheme or "forge"
+    # NOTE: YAML.parse does not open paths (it returns the generator of
+    # the opened file from a generator, which yields nothing)
+    with (
+        stream.open("rb")
+        if isinstance(stream, PurePath)
+        else contextlib.nullcontext(stream)
+    ) as data:
+        events = yaml.parse(data)
+        try:
+            return _walk(
+                events,
+                auto,
+                edge,
+                scalar=_scalars(yaml),
+                scheme=scheme,
+                digests=digests,
+            )
+        except _Fallback:
+            pass
+        finally:
+            events.close()
+    return normalize(yaml.load(stream), context, scheme=scheme, digests=digests)
@@ -0,0 +1,300 @@
+"""Incremental re-merge of specification files as they change"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from jsmn_forge.spec.behavior import canonical_scope
+from jsmn_forge.spec.location import Location
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import (
+    FileNotFound,
+    MergeConflict,
+    MergeResult,
+    load,
+    obj_root,
+    upgrade_conflict,
+)
+from jsmn_forge.walk.merge import MergeConflict as _MergeConflict
+from jsmn_forge.walk.merge import merge
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Sequence
+    from pathlib import Path
+
+    from jsmn_forge.cache import Cache
+    from jsmn_forge.spec.node import Behavior, Node
+
+# A subtree merged independently of the others, by path: paths/<path>,
+# components/<section>/<name> or any other top level key
+type Bucket = tuple[str, ...]
+
+# (file index, conflict)
+type _Found = tuple[int, _MergeConflict]
+
+# Levels below these top level keys that are split into buckets
+_SPLIT = {"paths": 1, "components": 2}
+
+# Bucket value of an empty dict above the bucket level
+_EMPTY: Any = object()
+
+# (st_mtime_ns, st_size), None for a missing file
+type _Stat = tuple[int, int] | None
+
+
+class Cycle(NamedTuple):
+    changed: list[Path]
+    # None when the whole merge was redone
+    buckets: int | None
+    conflicts: int
+    seconds: float
+
+
+def _split(
+    out: dict[Bucket, Any],
+    key: Bucket,
+    value: Any,
+    depth: int,
+) -> bool:
+    if depth == 0:
+        out[key] = value
+        return True
+    if not isinstance(value, dict):
+        return False
+    if not value:
+        # Nothing to merge, but the assembled result has the container
+        out[key] = _EMPTY
+        return True
+    return all(_split(out, (*key, k), v, depth - 1) for k, v in value.items())
+
+
+def buckets(doc: Any) -> dict[Bucket, Any] | None:
+    """Split a normalized document into buckets, in document order.
+
+    Merging two documents merges each of their common buckets and
+    nothing else, as long as every level above a bucket is a dict. None
+    when the document is not shaped that way.
+    """
+    if not isinstance(doc, dict):
+        return None
+    out: dict[Bucket, Any] = {}
+    for k, v in doc.items():
+        if not _split(out, (k,), v, _SPLIT.get(k, 0)):
+            return None
+    return out
+
+
+def _stat(file: Path) -> _Stat:
+    try:
+        st = file.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _assemble(parts: Iterable[dict[Bucket, Any]], merged: Any) -> Any:
+    """Rebuild the merged document from bucket results, keys in first
+    seen order like the fold."""
+    root: dict[str, Any] = {}
+    for part in parts:
+        for bucket, value in part.items():
+            node = root
+            for k in bucket[:-1]:
+                node = node.setdefault(k, {})
+            if value is _EMPTY:
+                node.setdefault(bucket[-1], {})
+            elif bucket[-1] not in node:
+                node[bucket[-1]] = merged[bucket]
+    return root
+
+
+class IncrementalMerge:
+    """Merge of specification files kept up to date as files change.
+
+    Every file is normalized once and split into buckets (see `buckets`).
+    `update` re-normalizes only the changed files and re-merges only the
+    buckets whose content changed in them. Results (value, conflicts and
+    their order) are the same as `spec.merge` of the files in order. If
+    a document can not be split, the whole merge is redone.
+    """
+
+    def __init__(
+        self,
+        files: Sequence[Path],
+        *,
+        scheme: str | None = None,
+        cache: Cache | None = None,
+    ) -> None:
+        self.files = list(files)
+        self.scheme = scheme
+        self.cache = cache
+        self._stats: list[_Stat] = [_stat(f) for f in self.files]
+        self._docs: list[Any] = []
+        self._errors: dict[int, FileNotFound] = {}
+        self._parts: list[dict[Bucket, Any] | None] = []
+        # bucket -> (merged value, [(file index, conflict)])
+        self._merged: dict[Bucket, tuple[Any, list[_Found]]] = {}
+        for i, file in enumerate(self.files):
+            self._docs.append(None)
+            self._parts.append({})
+            self._load(i, file)
+        self._split = all(p is not None for p in self._parts)
+        self.result = MergeResult(None, [], [])
+        with canonical_scope():
+            if self._split:
+                self._remerge(set().union(*self._parts_split()))
+            self._publish()
+
+    def _load(self, i: int, file: Path) -> None:
+        spec = load(file, self.scheme, self.cache)
+        if isinstance(spec, FileNotFound):
+            self._errors[i] = spec
+            (self._docs[i], self._parts[i]) = (None, {})
+        else:
+            self._errors.pop(i, None)
+            (self._docs[i], self._parts[i]) = (spec.data, buckets(spec.data))
+
+    def _parts_split(self) -> list[dict[Bucket, Any]]:
+        return [p for p in self._parts if p is not None]
+
+    def _context(self, bucket: Bucket) -> tuple[Node, Behavior]:
+        ctx: tuple[Node, Behavior] = (obj_root, _NO_BHV)
+        for k in bucket:
+            ctx = ctx[0].child(k)
+        return ctx
+
+    def _remerge(self, changed: Iterable[Bucket]) -> int:
+        n = 0
+        for bucket in changed:
+            values = [
+                (i, part[bucket])
+                for i, part in enumerate(self._parts)
+                if part is not None
+                and bucket in part
+                and part[bucket] is not _EMPTY
+            ]
+            if not values:
+                self._merged.pop(bucket, None)
+                continue
+            context = self._context(bucket)
+            loc = Location(bucket)
+            (_, value) = values[0]
+            found: list[_Found] = []
+            for i, src in values[1:]:
+                (value, c) = merge(value, src, context, loc, share=True)
+                found += [(i, x) for x in c]
+            self._merged[bucket] = (value, found)
+            n += 1
+        return n
+
+    def _publish(self) -> None:
+        errors = [self._errors[i] for i in sorted(self._errors)]
+        if not self._split:
+            self.result = self._fold(errors)
+            return
+        if len(errors) == len(self.files):
+            self.result = MergeResult(None, [], errors)
+            return
+        merged = {b: v for b, (v, _) in self._merged.items()}
+        value = _assemble(self._parts_split(), merged)
+        # Conflicts by source file, then in the source's bucket order
+        found: dict[int, dict[Bucket, list[_MergeConflict]]] = {}
+        for bucket, (_, bucket_found) in self._merged.items():
+            for i, c in bucket_found:
+                found.setdefault(i, {}).setdefault(bucket, []).append(c)
+        conflicts: list[MergeConflict] = []
+        for i in sorted(found):
+            (part, at) = (self._parts[i] or {}, found[i])
+            upgrade = upgrade_conflict(self.files[i])
+            for bucket in part:
+                conflicts += map(upgrade, at.get(bucket, ()))
+        self.result = MergeResult(value, conflicts, errors)
+
+    def _fold(self, errors: list[FileNotFound]) -> MergeResult:
+        context = (obj_root, _NO_BHV)
+        docs = [
+            (self.files[i], doc)
+            for i, doc in enumerate(self._docs)
+            if i not in self._errors
+        ]
+        if not docs:
+            return MergeResult(None, [], errors)
+        (_, value) = docs[0]
+        conflicts: list[MergeConflict] = []
+        for file, src in docs[1:]:
+            (value, c) = merge(value, src, context, share=True)
+            conflicts += map(upgrade_conflict(file), c)
+        return MergeResult(value, conflicts, errors)
+
+    def poll(self) -> list[Path]:
+        """Files whose mtime or size changed since they were loaded."""
+        return [
+            file
+            for i, file in enumerate(self.files)
+            if _stat(file) != self._stats[i]
+        ]
+
+    def update(self, changed: Iterable[Path]) -> int | None:
+        """Reload `changed` files. Returns the number of buckets merged,
+        None when the whole merge was redone."""
+        dirty: set[Bucket] = set()
+        with canonical_scope():
+            paths = set(changed)
+            for i, file in enumerate(self.files):
+                if file not in paths:
+                    continue
+                self._stats[i] = _stat(file)
+                old = self._parts[i]
+                self._load(i, file)
+                new = self._parts[i]
+                if old is None or new is None:
+                    continue
+                dirty.update(b for b in old if b not in new)
+                dirty.update(
+                    b for b, v in new.items() if b not in old or old[b] != v
+                )
+            split = all(p is not None for p in self._parts)
+            if split and not self._split:
+                # Back from a full merge, no bucket result is current
+                self._merged.clear()
+                dirty = set().union(*self._parts_split())
+            self._split = split
+            n = self._remerge(dirty) if split else None
+            self._publish()
+        return n
+
+
+def watch(
+    files: Sequence[Path],
+    *,
+    scheme: str | None = None,
+    interval: float = 0.25,
+    cycles: int | None = None,
+    report: Callable[[Cycle, MergeResult], None] | None = None,
+) -> IncrementalMerge:
+    """Poll `files` every `interval` seconds, updating the merge when any
+    of them changes. Runs until interrupted, or for `cycles` updates.
+
+    `report` is called after the initial merge, then after every update.
+    """
+    start = time.perf_counter()
+    state = IncrementalMerge(files, scheme=scheme)
+    if report is not None:
+        seconds = time.perf_counter() - start
+        cycle = Cycle(list(files), None, len(state.result.conflicts), seconds)
+        report(cycle, state.result)
+    done = 0
+    while cycles is None or done < cycles:
+        changed = state.poll()
+        if not changed:
+            time.sleep(interval)
+            continue
+        start = time.perf_counter()
+        n = state.update(changed)
+        seconds = time.perf_counter() - start
+        done += 1
+        if report is not None:
+            cycle = Cycle(changed, n, len(state.result.conflicts), seconds)
+            report(cycle, state.result)
+    return state
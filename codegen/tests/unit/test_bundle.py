@@ -1,29 +1,140 @@
-from pathlib import Path
-
-from jsmn_forge.bundle import bundle
-
-
-def test_bundle_scan() -> None:
-    """Test that bundle discovers all workspace modules and creates registry."""
-    fixture = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
-    project = [fixture / module for module in fixture.iterdir()]
-    registry = bundle("forge", project)
-    resolver = registry.resolver()
-
-    # Expected URIs (unordered)
-    expected_keys = {
-        "forge://sdk/common/v0",
-        "forge://sdk/auth/v0",
-        "forge://sensors/temperature/v0",
-        "forge://sensors/humidity/v0",
-        "forge://network/ethernet/v0",
-        "forge://network/wifi/v0",
-    }
-
-    # Verify all expected keys are present
-    actual_keys = set(registry.keys())
-    assert actual_keys == expected_keys
-
-    # Verify content keys match
-    for k in registry:
-        assert resolver.lookup(k).contents["$id"] == k
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from jsmn_forge import bundle as bundle_module
+from jsmn_forge.bundle import Config, Manifest, bundle, discover
+from jsmn_forge.cache import Cache
+from jsmn_forge.profile import profile
+from jsmn_forge.validate import InvalidDocumentError, Problem
+from referencing.exceptions import Unresolvable, Unretrievable
+
+
+def test_bundle_scan() -> None:
+    """Test that bundle discovers all workspace modules and creates registry."""
+    fixture = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
+    project = [fixture / module for module in fixture.iterdir()]
+    registry = bundle("forge", project)
+    resolver = registry.resolver()
+
+    # Expected URIs (unordered)
+    expected_keys = {
+        "forge://sdk/common/v0",
+        "forge://sdk/auth/v0",
+        "forge://sensors/temperature/v0",
+        "forge://sensors/humidity/v0",
+        "forge://network/ethernet/v0",
+        "forge://network/wifi/v0",
+    }
+
+    # Verify all expected keys are present
+    actual_keys = set(registry.keys())
+    assert actual_keys == expected_keys
+
+    # Verify content keys match
+    for k in registry:
+        assert resolver.lookup(k).contents["$id"] == k
+
+
+def test_bundle_lazy() -> None:
+    """Test that a lazy registry loads a resource on its first lookup only."""
+    fixture = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
+    project = [fixture / module for module in fixture.iterdir()]
+    with profile() as prof:
+        registry = bundle("forge", project, lazy=True)
+        resolver = registry.resolver()
+        token = "forge://sdk/auth/v0#/components/schemas/auth_token"
+        for _ in range(2):
+            resolved = resolver.lookup(token)
+            assert resolved.contents["required"] == ["token", "expires"]
+            assert registry.resolver().lookup("forge://sdk/auth/v0")
+
+    # Only the looked up resource was loaded, once
+    assert set(registry) == set()
+    loaded = [s.file for s in prof.spans if s.phase == "load"]
+    assert loaded == [fixture / "sdk" / "schemas" / "auth.openapi.yaml"]
+
+    # References to other resources load those in turn
+    status = "forge://sdk/common/v0#/components/schemas/device_status"
+    temperature = resolver.lookup("forge://sensors/temperature/v0")
+    assert temperature.resolver.lookup(status).contents == (
+        resolver.lookup(status).contents
+    )
+
+    with pytest.raises(Unresolvable):
+        resolver.lookup("forge://sdk/missing/v0")
+
+
+def test_bundle_id_mismatch(tmp_path: Path) -> None:
+    """Test that both registries reject a $id other than the config URI."""
+    fixture = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
+    shutil.copytree(fixture, tmp_path, dirs_exist_ok=True)
+    auth = tmp_path / "sdk" / "schemas" / "auth.openapi.yaml"
+    auth.write_text(auth.read_text().replace("sdk/auth/v0", "sdk/login/v0"))
+    project = sorted(tmp_path.iterdir())
+    expect = [
+        Problem(
+            auth,
+            "/$id",
+            "'forge://sdk/login/v0' is not the resource URI "
+            "'forge://sdk/auth/v0'",
+        )
+    ]
+
+    with pytest.raises(InvalidDocumentError) as e:
+        bundle("forge", project)
+    assert e.value.problems == expect
+
+    # Raised by the lookup, wrapped by referencing
+    registry = bundle("forge", project, lazy=True)
+    with pytest.raises(Unretrievable) as retrieve:
+        registry.get_or_retrieve("forge://sdk/auth/v0")
+    assert isinstance(retrieve.value.__cause__, InvalidDocumentError)
+    assert retrieve.value.__cause__.problems == expect
+    with pytest.raises(Unresolvable) as resolve:
+        registry.resolver().lookup("forge://sdk/auth/v0")
+    assert isinstance(resolve.value.__cause__, Unretrievable)
+    assert registry.resolver().lookup("forge://sdk/common/v0")
+
+
+def test_discover_manifest(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that discovery only re-reads configs that changed."""
+    fixture = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
+    workspace = tmp_path / "workspace"
+    shutil.copytree(fixture, workspace)
+    project = sorted(workspace.iterdir())
+    parsed: list[str] = []
+    parse = bundle_module._parse_workspace
+
+    def counting(path: Path | str, config: Path) -> Config:
+        parsed.append(Path(path).name)
+        return parse(path, config)
+
+    monkeypatch.setattr(bundle_module, "_parse_workspace", counting)
+    cache = Cache(tmp_path / "cache")
+
+    def run() -> list[str]:
+        parsed.clear()
+        registry = bundle("forge", project, cache=cache)
+        assert len(set(registry)) == 6
+        return sorted(parsed)
+
+    assert run() == ["network", "sdk", "sensors"]
+    assert run() == []
+    assert discover(project, Manifest.load(cache)) == discover(project)
+    assert parsed == ["network", "sdk", "sensors"]
+
+    # Edited in place
+    config = workspace / "sdk" / ".jsmn-forge.yaml"
+    config.write_text(config.read_text() + "\n")
+    os.utime(config, ns=(0, 0))
+    assert run() == ["sdk"]
+    assert run() == []
+
+    # Renamed, the directory changes
+    config.rename(workspace / "sdk" / "jsmnForge.yaml")
+    assert run() == ["sdk"]
+    assert run() == []
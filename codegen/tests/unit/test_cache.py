@@ -0,0 +1,142 @@
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.bundle import bundle
+from jsmn_forge.cache import Cache
+from jsmn_forge.spec import merge
+from jsmn_forge.spec.openapi_3_1 import Specification, load
+
+FIXTURES = Path(__file__).parent.parent.absolute() / "fixtures"
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> Cache:
+    return Cache(tmp_path / "cache")
+
+
+def test_load_builds_once(cache: Cache, tmp_path: Path) -> None:
+    """A second load of unchanged content is served from disk."""
+    file = tmp_path / "doc.yaml"
+    file.write_text("a: 1")
+    calls: list[bytes] = []
+
+    def build(data: bytes) -> Any:
+        calls.append(data)
+        return {"len": len(data)}
+
+    assert cache.load(file, "ns", build) == {"len": 4}
+    assert cache.load(file, "ns", build) == {"len": 4}
+    assert len(calls) == 1
+    # Same content under another namespace is a different entry
+    cache.load(file, "other", build)
+    assert len(calls) == 2
+
+
+def test_key_follows_content(cache: Cache, tmp_path: Path) -> None:
+    """Editing a file invalidates its entry, moving it does not."""
+    file = tmp_path / "doc.yaml"
+    file.write_text("a: 1")
+    cache.load(file, "ns", len)
+    file.write_text("a: 22")
+    assert cache.load(file, "ns", len) == 5
+    moved = tmp_path / "moved.yaml"
+    file.rename(moved)
+    assert cache.get(cache.key(moved.read_bytes(), "ns")) == (True, 5)
+
+
+def test_corrupt_entry_is_a_miss(cache: Cache, tmp_path: Path) -> None:
+    file = tmp_path / "doc.yaml"
+    file.write_text("a: 1")
+    cache.load(file, "ns", len)
+    key = cache.key(file.read_bytes(), "ns")
+    (cache.root / key[:2] / key).write_bytes(b"garbage")
+    assert cache.get(key) == (False, None)
+    assert cache.load(file, "ns", len) == 4
+
+
+@pytest.mark.parametrize(
+    "blob",
+    [
+        # A class since renamed, a module since removed, a bad opcode arg
+        b"cjsmn_forge.cache\nRenamed\n.",
+        b"cjsmn_forge.removed\nCache\n.",
+        b"\x80\x04\x95",
+    ],
+)
+def test_stale_entry_is_a_miss(cache: Cache, blob: bytes) -> None:
+    key = "ab" * 20
+    cache.put(key, 1)
+    (cache.root / key[:2] / key).write_bytes(blob)
+    assert cache.get(key) == (False, None)
+
+
+def test_overwrite_size(cache: Cache) -> None:
+    key = "ab" * 20
+    cache.put("cd" * 20, 1)
+    for value in (b"x" * 1000, b"x" * 100, b"x" * 500):
+        cache.put(key, value)
+    entries = [p for p in cache.root.rglob("*") if p.is_file()]
+    assert cache._size == sum(p.stat().st_size for p in entries)
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    cache = Cache(tmp_path / "cache", max_bytes=1 << 20)
+    keys = [f"{i:02x}" * 20 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, b"x" * 1000)
+        entry = cache.root / key[:2] / key
+        os.utime(entry, (i, i))
+    # Touch the oldest entry, it becomes the most recently used
+    assert cache.get(keys[0])[0]
+    size = (cache.root / keys[0][:2] / keys[0]).stat().st_size
+    cache.evict(2 * size)
+    assert not cache.get(keys[1])[0]
+    assert cache.get(keys[0])[0]
+    assert cache.get(keys[2])[0]
+
+
+def test_merge_with_cache(cache: Cache) -> None:
+    """Cached normalize produces the same merge as an uncached run."""
+    walk = FIXTURES / "walk"
+    files = (walk / "merge_union_a.yaml", walk / "merge_union_b.yaml")
+    expect = merge(*files)
+    cold = merge(*files, cache=cache)
+    warm = merge(*files, cache=cache)
+    assert cold.value == expect.value
+    assert warm.value == expect.value
+    assert warm.conflicts == expect.conflicts
+
+
+def test_load_reads_once(cache: Cache, monkeypatch: pytest.MonkeyPatch) -> None:
+    file = FIXTURES / "walk" / "merge_union_a.yaml"
+    read_bytes = Path.read_bytes
+    reads: list[Path] = []
+
+    def counting(path: Path) -> bytes:
+        reads.append(path)
+        return read_bytes(path)
+
+    monkeypatch.setattr(Path, "read_bytes", counting)
+    cold = load(file, cache=cache)
+    assert reads == [file]
+    warm = load(file, cache=cache)
+    assert reads == [file, file]
+    assert isinstance(cold, Specification)
+    assert isinstance(warm, Specification)
+    assert warm.data == cold.data
+
+
+def test_merge_with_cache_missing_file(cache: Cache, tmp_path: Path) -> None:
+    missing = tmp_path / "missing.yaml"
+    result = merge(missing, cache=cache)
+    assert [e.path for e in result.errors] == [missing]
+
+
+def test_bundle_with_cache(cache: Cache) -> None:
+    fixture = FIXTURES / "workspace"
+    project = [fixture / module for module in fixture.iterdir()]
+    for _ in range(2):
+        registry = bundle("forge", project, cache=cache)
+        assert len(set(registry.keys())) == 6
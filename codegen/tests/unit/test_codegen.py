@@ -0,0 +1,88 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError, replace
+from typing import Any
+
+import pytest
+from jsmn_forge.codegen import (
+    Bound,
+    Dim,
+    Field,
+    NumberDescriptor,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringType,
+    digest,
+)
+from jsmn_forge.graph import Graph
+
+
+def _point(name: str = "point") -> ObjectDescriptor:
+    return ObjectDescriptor(
+        name,
+        (
+            Field("x", NumberType("int32", dims=(Dim(0, 2),)), required=True),
+            Field("label", StringType(8, min_length=1), required=False),
+        ),
+    )
+
+
+def test_interned() -> None:
+    assert _point() is _point()
+    assert _point() is not _point("other")
+    assert _point().fields == _point("other").fields
+    assert NumberType("int8", minimum=Bound(0)) is NumberType(
+        format="int8", minimum=Bound(0)
+    )
+    assert RefType("a") is not RefType("a", dims=(Dim(1, 1),))
+    assert replace(RefType("a"), dims=(Dim(1, 1),)) is RefType(
+        "a", dims=(Dim(1, 1),)
+    )
+    assert len({_point(), _point(), _point("other")}) == 2
+
+
+def test_interned_by_type() -> None:
+    # 1 == 1.0 == True, but each is its own field value
+    one = NumberType("double", minimum=Bound(1))
+    real = NumberType("double", minimum=Bound(1.0))
+    assert one is not real
+    assert real.minimum is not None
+    assert type(real.minimum.value) is float
+    loose: Any = Dim(False, 3.0)  # type: ignore[arg-type]
+    assert loose == Dim(0, 3)
+    assert StringType(3, dims=(loose,)) is not StringType(3, dims=(Dim(0, 3),))
+    descriptors = [NumberDescriptor("n", "double", minimum=Bound(1))]
+    fingerprint = Graph(descriptors).fingerprints["n"]
+    descriptors = [NumberDescriptor("n", "double", minimum=Bound(1.0))]
+    assert Graph(descriptors).fingerprints["n"] != fingerprint
+
+
+def test_frozen() -> None:
+    point = _point()
+    with pytest.raises(FrozenInstanceError):
+        point.name = "other"  # type: ignore[misc]
+    assert not hasattr(point, "__dict__")
+    # Lists are taken as tuples
+    fields: Any = list(point.fields)
+    assert ObjectDescriptor("point", fields) is point
+    assert replace(point, fields=fields) is point
+    dims: Any = [Dim(0, 2)]
+    assert NumberType("int32", dims=dims) is point.fields[0].type
+
+
+def test_digest() -> None:
+    point = _point()
+    found = digest(point)
+    # Kept by the value, and by the values in it
+    assert digest(point) is found
+    assert digest(point.fields[0]) is digest(_point("other").fields[0])
+    assert digest(_point("other")) != found
+    assert digest(StringType(8)) != digest(StringType(8, dims=(Dim(0, 8),)))
+
+
+def test_copies() -> None:
+    point = _point()
+    assert pickle.loads(pickle.dumps(point)) is point
+    assert copy.copy(point) is point
+    assert copy.deepcopy([point])[0] is point
@@ -0,0 +1,177 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.codegen import (
+    ArrayDescriptor,
+    BoolType,
+    Bound,
+    Dim,
+    Field,
+    NullDescriptor,
+    NumberDescriptor,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+    StringDescriptor,
+    StringType,
+)
+from jsmn_forge.flatten import FlattenError, flatten, ref_name
+from jsmn_forge.graph import Graph
+from jsmn_forge.loader import yaml
+
+TEMPLATES = Path(__file__).parent.parent.absolute() / "fixtures" / "templates"
+
+
+def _template(name: str) -> Any:
+    return yaml.load(TEMPLATES / f"{name}.yml")
+
+
+def _fields(descriptor: Any) -> dict[str, Field]:
+    assert isinstance(descriptor, ObjectDescriptor)
+    return {field.name: field for field in descriptor.fields}
+
+
+def test_ref_name() -> None:
+    assert ref_name("boom") == "boom"
+    assert ref_name("#/components/schemas/thing") == "thing"
+    assert ref_name("forge://sdk/auth/v0#/components/schemas/a~1b") == "a/b"
+
+
+def test_object() -> None:
+    (nested, a_1, thing) = flatten(_template("object_prefix"))
+    assert nested == ObjectDescriptor(
+        "thing_nested", (Field("foo", NumberType("int32"), required=True),)
+    )
+    assert a_1.name == "thing_a_1"
+    fields = _fields(thing)
+    assert fields["bool"].type == BoolType()
+    assert fields["s32"].type == StringType(32)
+    assert fields["many_numbers"].type == NumberType(
+        "uint32", dims=(Dim(5, 5),)
+    )
+    assert fields["nested"].type == RefType("thing_nested")
+    assert fields["multi_string"].type == StringType(
+        9, dims=(Dim(3, 3), Dim(4, 4))
+    )
+    assert fields["a_1"].type == RefType("thing_a_1", dims=(Dim(3, 3),))
+    assert isinstance(thing, ObjectDescriptor)
+    assert all(field.required for field in thing.fields)
+
+
+def test_optionals() -> None:
+    fields = _fields(flatten(_template("object_optionals"))[-1])
+    assert [name for (name, f) in fields.items() if f.required] == []
+
+
+def test_variable_length_arrays() -> None:
+    fields = _fields(flatten(_template("variable_length_arrays"))[-1])
+    assert fields["vla_0"].type.dims == (Dim(0, 3),)
+    assert fields["vla_4"].type.dims == (Dim(0, 5), Dim(4, 4), Dim(0, 3))
+
+
+def test_components() -> None:
+    descriptors = flatten(
+        {
+            **_template("generic"),
+            **_template("null"),
+            **_template("string"),
+            "ranged": {
+                "type": "integer",
+                "minimum": 1,
+                "exclusiveMaximum": 10,
+            },
+        }
+    )
+    by_name = {d.name: d for d in descriptors}
+    assert by_name["variable_object"] == ArrayDescriptor(
+        "variable_object", RefType("object"), (Dim(3, 8),)
+    )
+    assert by_name["fixed_object"] == ArrayDescriptor(
+        "fixed_object", RefType("object"), (Dim(8, 8),)
+    )
+    assert by_name["nullish"] == NullDescriptor("nullish")
+    assert by_name["string"] == StringDescriptor("string", 9, min_length=8)
+    assert by_name["ranged"] == NumberDescriptor(
+        "ranged", "int64", minimum=Bound(1), maximum=Bound(10, exclusive=True)
+    )
+    assert Graph(descriptors).order[:2] == ["object", "variable_object"]
+
+
+def test_memoized() -> None:
+    point = {
+        "type": "object",
+        "properties": {"x": {"type": "number", "format": "int32"}},
+    }
+    descriptors = flatten(
+        {
+            "a": {
+                "type": "object",
+                "properties": {
+                    "p": dict(point),
+                    "q": {"type": "array", "maxItems": 2, "items": point},
+                },
+            },
+            "b": {"type": "object", "properties": {"p": dict(point)}},
+            "c": {"type": "object", "properties": {"p": {"$ref": "point"}}},
+            "point": dict(point),
+        }
+    )
+    # Every equal inline object refers to the equal component
+    assert [d.name for d in descriptors] == ["a", "b", "c", "point"]
+    fields = _fields(descriptors[0])
+    assert fields["p"].type == RefType("point")
+    assert fields["q"].type == RefType("point", dims=(Dim(0, 2),))
+    assert _fields(descriptors[1])["p"].type is fields["p"].type
+
+    (inline, _, b) = flatten(
+        {
+            "a": {"type": "object", "properties": {"p": dict(point)}},
+            "b": {"type": "object", "properties": {"p": dict(point)}},
+        }
+    )
+    assert inline.name == "a_p"
+    assert _fields(b)["p"].type == RefType("a_p")
+
+
+@pytest.mark.parametrize(
+    ("schema", "message"),
+    [
+        ({"type": "string"}, "/a: string without maxLength"),
+        ({"type": "array", "items": {}}, "/a: array without maxItems"),
+        (
+            {"properties": {"b": {"type": ["string", "null"]}}},
+            "/a/properties/b: unsupported type",
+        ),
+        (
+            {"type": "object", "properties": {"b": 1}},
+            "/a/properties/b: schema must be",
+        ),
+        ({"oneOf": []}, "/a: unsupported type None"),
+    ],
+)
+def test_errors(schema: Any, message: str) -> None:
+    with pytest.raises(FlattenError, match=message):
+        flatten({"a": schema})
+
+
+def test_collapsed() -> None:
+    # Objects differing in key order and descriptions lower to the same
+    # fields, the second inline one shares the first's struct
+    x = {"type": "number", "format": "int32"}
+    y = {"type": "string", "maxLength": 4}
+    (inline, a, b) = flatten(
+        {
+            "a": {"properties": {"p": {"properties": {"x": x, "y": y}}}},
+            "b": {
+                "properties": {
+                    "q": {
+                        "description": "a point",
+                        "properties": {"x": dict(x), "y": dict(y)},
+                    },
+                },
+            },
+        }
+    )
+    assert inline.name == "a_p"
+    assert _fields(b)["q"].type is _fields(a)["p"].type
@@ -0,0 +1,118 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pytest
+from jsmn_forge.cache import Cache
+from jsmn_forge.codegen import (
+    ArrayDescriptor,
+    Descriptor,
+    Dim,
+    Field,
+    NumberDescriptor,
+    NumberType,
+    ObjectDescriptor,
+    RefType,
+)
+from jsmn_forge.graph import (
+    DependencyError,
+    Graph,
+    IncrementalEmitter,
+    dependencies,
+)
+
+
+def _struct(name: str, *refs: str) -> ObjectDescriptor:
+    fields = [Field("a", NumberType("uint32"), required=True)]
+    fields += [Field(ref, RefType(ref), required=True) for ref in refs]
+    return ObjectDescriptor(name, tuple(fields))
+
+
+def _emit(descriptor: Descriptor) -> str:
+    return f"struct {descriptor.name};"
+
+
+def test_dependencies() -> None:
+    assert dependencies(_struct("thing", "boom", "bang", "boom")) == [
+        "boom",
+        "bang",
+    ]
+    assert dependencies(
+        ArrayDescriptor("list", RefType("thing"), (Dim(0, 4),))
+    ) == ["thing"]
+    assert dependencies(NumberDescriptor("n", "int8")) == []
+
+
+def test_order() -> None:
+    # Like the bugfix-dependency-order fixture: thing embeds boom, boom
+    # is emitted first
+    graph = Graph([_struct("thing", "boom"), _struct("boom")])
+    assert graph.order == ["boom", "thing"]
+    graph = Graph(
+        [
+            _struct("a", "c", "b"),
+            _struct("b", "c"),
+            _struct("c"),
+            _struct("d"),
+        ]
+    )
+    assert graph.order == ["c", "b", "a", "d"]
+    assert graph.dependents("c") == {"a", "b"}
+    assert graph.dependents("d") == set()
+
+
+@pytest.mark.parametrize(
+    ("descriptors", "message"),
+    [
+        ([_struct("a", "b")], "a refers to unknown descriptor b"),
+        ([_struct("a"), _struct("a")], "duplicate descriptor a"),
+        (
+            [_struct("a", "b"), _struct("b", "c"), _struct("c", "b")],
+            "cycle: b -> c -> b",
+        ),
+    ],
+)
+def test_errors(descriptors: list[Descriptor], message: str) -> None:
+    with pytest.raises(DependencyError, match=message):
+        Graph(descriptors)
+
+
+def test_fingerprints() -> None:
+    descriptors = [_struct("a", "b"), _struct("b", "c"), _struct("c")]
+    before = Graph(descriptors).fingerprints
+    assert Graph(descriptors).fingerprints == before
+    # A change reaches everything depending on it, transitively
+    changed = Graph([*descriptors[:2], replace(descriptors[2], fields=())])
+    assert [n for n in "abc" if changed.fingerprints[n] != before[n]] == [
+        "a",
+        "b",
+        "c",
+    ]
+    changed = Graph([replace(descriptors[0], name="a"), *descriptors[1:]])
+    assert changed.fingerprints == before
+
+
+def test_incremental(tmp_path: Path) -> None:
+    descriptors = [_struct("a", "b"), _struct("b"), _struct("c")]
+    emitter = IncrementalEmitter(_emit, namespace="test:1")
+    run = emitter.run(Graph(descriptors))
+    assert run.outputs == ["struct b;", "struct a;", "struct c;"]
+    assert run.emitted == ["b", "a", "c"]
+    assert emitter.run(Graph(descriptors)).emitted == []
+
+    # Only b and what depends on it
+    field = replace(_struct("b").fields[0], required=False)
+    b = ObjectDescriptor("b", (field,))
+    run = emitter.run(Graph([descriptors[0], b, descriptors[2]]))
+    assert run.emitted == ["b", "a"]
+    assert len(run.outputs) == 3
+
+    # A fresh emitter reuses the outputs in the cache
+    cache = Cache(tmp_path)
+    IncrementalEmitter(_emit, namespace="test:1", cache=cache).run(
+        Graph(descriptors)
+    )
+    emitter = IncrementalEmitter(_emit, namespace="test:1", cache=cache)
+    run = emitter.run(Graph([*descriptors, _struct("d")]))
+    assert run.emitted == ["d"]
+    emitter = IncrementalEmitter(_emit, namespace="test:2", cache=cache)
+    assert emitter.run(Graph(descriptors)).emitted == ["b", "a", "c"]
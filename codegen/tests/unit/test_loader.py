@@ -0,0 +1,67 @@
+import json
+from pathlib import Path
+
+import pytest
+from jsmn_forge import loader
+from jsmn_forge.loader import LOADERS, formats, load, register, yaml
+from jsmn_forge.spec import merge
+
+WALK = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+
+
+@pytest.mark.parametrize(
+    ("data", "suffix", "expect"),
+    [
+        (b"a: 1", ".yaml", ["yaml"]),
+        (b"a: 1", "", ["yaml"]),
+        (b'  \n{"a": 1}', ".yml", ["json", "yaml"]),
+        (b"[1]", "", ["json", "yaml"]),
+        (b"a: 1", ".JSON", ["json", "yaml"]),
+    ],
+)
+def test_formats(data: bytes, suffix: str, expect: list[str]) -> None:
+    assert formats(data, suffix) == expect
+
+
+def test_load(tmp_path: Path) -> None:
+    (doc, text) = ({"a": [1, "b"]}, "a: [1, b]\n")
+    for name, content in [
+        ("doc.json", json.dumps(doc)),
+        ("doc.yaml", json.dumps(doc)),
+        ("doc.yaml", text),
+        # Not JSON after all, back to YAML
+        ("doc.json", text),
+        ("doc.yaml", "{a: [1, b]}"),
+    ]:
+        (tmp_path / name).write_text(content)
+        assert load(tmp_path / name) == doc
+        assert load(content.encode()) == doc
+
+
+def test_load_errors() -> None:
+    with pytest.raises(Exception) as expect:
+        yaml.load("{a: [1")
+    with pytest.raises(expect.type):
+        load(b"{a: [1", suffix=".json")
+
+
+def test_register(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(loader, "LOADERS", dict(LOADERS))
+    monkeypatch.setattr(loader, "SUFFIXES", dict(loader.SUFFIXES))
+    register("lines", lambda data: data.decode().splitlines(), ".txt")
+    assert load(b"a\nb", suffix=".txt") == ["a", "b"]
+    assert formats(b"a", ".txt") == ["lines"]
+
+
+def test_merge_json(tmp_path: Path) -> None:
+    files = sorted(WALK.glob("merge_union_*.yaml"))
+    copies = []
+    for file in files:
+        copy = tmp_path / f"{file.stem}.json"
+        copy.write_text(json.dumps(yaml.load(file)))
+        copies.append(copy)
+    (a, b) = (merge(*files), merge(*copies))
+    assert a.value == b.value
+    assert [c.location for c in a.conflicts] == [
+        c.location for c in b.conflicts
+    ]
@@ -0,0 +1,103 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from jsmn_forge.bundle import bundle
+from jsmn_forge.cli import main
+from jsmn_forge.loader import yaml
+from jsmn_forge.profile import nodes, phase, profile
+from jsmn_forge.spec import MergeStrategy, merge
+
+FIXTURES = Path(__file__).parent.parent.absolute() / "fixtures"
+WALK = FIXTURES / "walk"
+
+FILES = [
+    WALK / "merge_conflict_a.yaml",
+    WALK / "merge_conflict_b.yaml",
+    WALK / "missing.yaml",
+]
+
+
+def test_nodes() -> None:
+    assert nodes(1) == 1
+    assert nodes({"a": [1, {"b": None}], "c": {}}) == 6
+
+
+def test_disabled() -> None:
+    with phase("load", FILES[0]) as span:
+        span.count({"a": 1})
+    with profile() as prof:
+        pass
+    assert prof.spans == []
+
+
+def test_merge() -> None:
+    with profile() as outer:
+        with profile() as prof:
+            result = merge(*FILES)
+        with phase("after"):
+            pass
+    assert list(prof.phases()) == ["load", "merge", "upgrade"]
+    assert prof.phases()["load"]["runs"] == len(FILES)
+    assert list(prof.files()) == list(map(str, FILES))
+    assert list(prof.files()[str(FILES[1])]) == ["load", "merge", "upgrade"]
+    # Inner profile spans only go to the inner profile
+    assert [s.phase for s in outer.spans] == ["after"]
+    assert prof.seconds >= sum(s.seconds for s in prof.spans if s.file)
+    assert result.value is not None
+
+
+def test_count_untimed(monkeypatch: pytest.MonkeyPatch) -> None:
+    def slow(obj: object) -> int:
+        time.sleep(0.2)
+        return 1
+
+    monkeypatch.setattr("jsmn_forge.profile.nodes", slow)
+    with profile() as prof:
+        merge(*FILES[:2])
+    load = [s for s in prof.spans if s.phase == "load"]
+    assert [s.nodes for s in load] == [1, 1]
+    assert all(s.seconds < 0.2 for s in load)
+
+
+def test_merge_nway() -> None:
+    with profile() as prof:
+        merge(*FILES, strategy=MergeStrategy.NWAY)
+    load = [s for s in prof.spans if s.phase == "load"]
+    assert [s.nodes for s in load[:2]] == [
+        nodes(yaml.load(f)) for f in FILES[:2]
+    ]
+    assert load[2].nodes is None
+    assert [s.file for s in prof.spans if s.phase != "load"] == [None, None]
+
+
+def test_bundle() -> None:
+    workspace = FIXTURES / "workspace"
+    with profile() as prof:
+        bundle("forge", list(workspace.iterdir()))
+    phases = prof.phases()
+    assert list(phases) == ["discover", "load", "validate", "registry"]
+    assert phases["load"]["runs"] == 6
+    assert phases["validate"]["runs"] == 6
+    assert phases["load"]["nodes"] > 0
+
+
+def test_cli(tmp_path: Path) -> None:
+    (report, out) = (tmp_path / "profile.json", tmp_path / "out.yaml")
+    main(
+        ["--profile", str(report), "merge", *map(str, FILES), "--out", str(out)]
+    )
+    assert yaml.load(out) == merge(*FILES).value
+    data = json.loads(report.read_text())
+    assert set(data) == {"seconds", "phases", "files", "spans"}
+    assert data["phases"]["load"]["runs"] == len(FILES)
+
+
+def test_cli_failed(tmp_path: Path) -> None:
+    (report, out) = (tmp_path / "profile.json", tmp_path / "no" / "out.yaml")
+    argv = ["--profile", str(report), "merge", *map(str, FILES)]
+    with pytest.raises(FileNotFoundError):
+        main([*argv, "--out", str(out)])
+    data = json.loads(report.read_text())
+    assert data["phases"]["load"]["runs"] == len(FILES)
@@ -0,0 +1,94 @@
+import pytest
+from jsmn_forge.spec.automaton import MAX_GRAPHS, compile_graph
+from jsmn_forge.spec.node import _NO_BHV, Behavior, ObjectNode, data
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.spec.schema import SchemaNode, schema
+
+ROOT = (obj_root, _NO_BHV)
+
+PROPS = [
+    "paths",
+    "components",
+    "schemas",
+    "properties",
+    "required",
+    "enum",
+    "allOf",
+    "parameters",
+    "security",
+    "tags",
+    "default",
+    "x-meta",
+    "x-",
+    "unknown",
+    "get",
+    "/items",
+    "200",
+]
+
+
+def test_compile_is_cached() -> None:
+    assert compile_graph(ROOT) is compile_graph(ROOT)
+
+
+def test_root_edge() -> None:
+    (auto, edge) = compile_graph(ROOT)
+    assert auto.context(edge) == ROOT
+
+
+@pytest.mark.parametrize("prop", PROPS)
+def test_step_matches_child(prop: str) -> None:
+    """Every state steps exactly like Node.child of the node it was
+    compiled from."""
+    (auto, _) = compile_graph(ROOT)
+    for state, node in enumerate(auto.nodes):
+        edge = auto.step(state, prop)
+        (child, behavior) = node.child(prop)
+        assert auto.nodes[auto.target[edge]] is child
+        assert auto.behavior[edge] == behavior
+        assert auto.sort_key[edge] is behavior.sort_key
+        assert auto.policy[edge] == behavior.conflict_policy
+
+
+def test_reachable_nodes() -> None:
+    (auto, _) = compile_graph(ROOT)
+    assert obj_root in auto.nodes
+    assert schema in auto.nodes
+    assert data in auto.nodes
+    assert len(auto.nodes) == len(set(map(id, auto.nodes)))
+
+
+def test_extension_shadows_table() -> None:
+    """x-* props take the extension rule even if the table lists them."""
+    node = SchemaNode("shadowed")
+    node.configure(keywords={"x-a": (node, _NO_BHV), "b": (node, _NO_BHV)})
+    (auto, edge) = compile_graph((node, _NO_BHV))
+    state = auto.target[edge]
+    assert node.child("x-a") == (data, _NO_BHV)
+    assert auto.nodes[auto.target[auto.step(state, "x-a")]] is data
+    assert auto.nodes[auto.target[auto.step(state, "b")]] is node
+
+
+def test_distinct_roots() -> None:
+    node = ObjectNode("local")
+    node.configure(table={"a": (data, Behavior(sort_key=str))})
+    (auto, edge) = compile_graph((node, _NO_BHV))
+    assert auto.nodes == [node, data]
+    assert auto.sort_key[auto.step(auto.target[edge], "a")] is str
+
+
+def test_configure_invalidates() -> None:
+    node = ObjectNode("local")
+    node.configure(table={"a": (data, _NO_BHV)})
+    (before, _) = compile_graph((node, _NO_BHV))
+    node.configure(table={})
+    (after, edge) = compile_graph((node, _NO_BHV))
+    assert after is not before
+    state = after.target[edge]
+    assert after.step(state, "a") == after.default[state]
+
+
+def test_bounded() -> None:
+    for i in range(MAX_GRAPHS + 8):
+        compile_graph((ObjectNode(f"n{i}"), _NO_BHV))
+    assert compile_graph.cache_info().currsize <= MAX_GRAPHS
@@ -0,0 +1,95 @@
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.spec import canonical, canonical_scope, identity_key
+from jsmn_forge.spec.behavior import text
+from ruamel.yaml import YAML
+
+WALK = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+
+VALUES = [
+    None,
+    True,
+    0,
+    -1.5,
+    float("nan"),
+    float("inf"),
+    "",
+    "é\n\"'\x00\U0001f600",
+    [],
+    {},
+    [1, [2, [3]], {"b": 1, "a": [None, False]}],
+    {"z": {"y": {}}, "a": [], "é": "x", "": 0},
+    {"a": (1, 2)},
+    {2: "b", 1: "a"},
+    {None: 1},
+]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_scope_matches_json(value: Any) -> None:
+    expect = json.dumps(value, sort_keys=True)
+    assert canonical(value) == expect
+    with canonical_scope():
+        assert canonical(value) == expect
+        # Again, from the memo
+        assert canonical(value) == expect
+
+
+@pytest.mark.parametrize("name", ["schema_sets_a", "merge_union_b", "refs"])
+def test_scope_matches_json_yaml(name: str) -> None:
+    value = YAML().load(WALK / f"{name}.yaml")
+    with canonical_scope():
+        assert canonical(value) == json.dumps(value, sort_keys=True)
+
+
+def test_scope_errors_like_json() -> None:
+    with canonical_scope(), pytest.raises(TypeError):
+        canonical({"a": {1, 2}})
+    with canonical_scope(), pytest.raises(TypeError):
+        canonical({1: 1, "a": 2})
+
+
+def test_scope_memoizes_containers() -> None:
+    value: list[Any] = [{"b": 1}]
+    with canonical_scope():
+        canonical(value)
+        # Not recomputed: stale after mutation, which the scope forbids
+        value.append(1)
+        assert canonical(value) == '[{"b": 1}]'
+    # Memo is gone with the scope
+    assert canonical(value) == '[{"b": 1}, 1]'
+
+
+def test_deeper_than_recursion_limit() -> None:
+    depth = sys.getrecursionlimit() * 2
+    leaf = {"b": [1, 2.5, None, True, "\u00e9"], "a": {}}
+    x: Any = leaf
+    for _ in range(depth):
+        x = {"k": [x]}
+    dumped = json.dumps(leaf, sort_keys=True)
+    assert canonical(x) == '{"k": [' * depth + dumped + "]}" * depth
+    assert text(x) == "{'k': [" * depth + str(leaf) + "]}" * depth
+
+
+def test_nested_scopes_share_memo() -> None:
+    value = {"a": 1}
+    with canonical_scope():
+        canonical(value)
+        with canonical_scope():
+            value["b"] = 2
+            assert canonical(value) == '{"a": 1}'
+        assert canonical(value) == '{"a": 1}'
+
+
+def test_identity_key_uses_scope() -> None:
+    key = identity_key("name")
+    value = [1]
+    with canonical_scope():
+        assert key(value) == "[1]"
+        value.append(2)
+        assert key(value) == "[1]"
+    assert key({"name": "x"}) == "x"
@@ -1,97 +1,187 @@
-from jsmn_forge.spec import (
-    Extra,
-    Missing,
-    MissMatch,
-    diff,
-    sort_set,
-    sort_set_by,
-)
-
-
-def test_identical_returns_empty() -> None:
-    a = {"x": 1, "y": [1, 2]}
-    assert diff(a, a) == {}
-
-
-def test_top_level_missing_and_extra() -> None:
-    a = {"a": 1}
-    b = {"b": 2}
-    result = diff(a, b)
-    assert result == {
-        ("a",): Missing(1),
-        ("b",): Extra(2),
-    }
-
-
-def test_top_level_mismatch() -> None:
-    a = {"a": 1}
-    b = {"a": 2}
-    result = diff(a, b)
-    assert result == {("a",): MissMatch(1, 2)}
-
-
-def test_nested_dict_diff() -> None:
-    a = {"info": {"title": "Foo", "version": "1.0"}}
-    b = {"info": {"title": "Bar", "version": "1.0"}}
-    result = diff(a, b)
-    assert result == {("info", "title"): MissMatch("Foo", "Bar")}
-
-
-def test_nested_dict_missing_key() -> None:
-    a = {"info": {"title": "Foo", "desc": "hello"}}
-    b = {"info": {"title": "Foo"}}
-    result = diff(a, b)
-    assert result == {("info", "desc"): Missing("hello")}
-
-
-def test_list_extra_element() -> None:
-    a = {"tags": ["api"]}
-    b = {"tags": ["api", "v2"]}
-    result = diff(a, b)
-    assert result == {("tags", "1"): Extra("v2")}
-
-
-def test_list_missing_element() -> None:
-    a = {"tags": ["api", "v1"]}
-    b = {"tags": ["api"]}
-    result = diff(a, b)
-    assert result == {("tags", "1"): Missing("v1")}
-
-
-def test_list_of_dicts() -> None:
-    a = {"params": [{"name": "id", "in": "path"}]}
-    b = {"params": [{"name": "id", "in": "query"}]}
-    result = diff(a, b)
-    assert result == {("params", "0", "in"): MissMatch("path", "query")}
-
-
-def test_type_mismatch_scalar_vs_dict() -> None:
-    a = {"x": "string"}
-    b = {"x": {"type": "string"}}
-    result = diff(a, b)
-    assert result == {("x",): MissMatch("string", {"type": "string"})}
-
-
-def test_sort_set_strings() -> None:
-    assert sort_set(["c", "a", "b"]) == ["a", "b", "c"]
-
-
-def test_sort_set_mixed_types() -> None:
-    arr = [True, "alpha", 1, None]
-    assert sort_set(arr) == sort_set(list(reversed(arr)))
-
-
-def test_sort_set_objects() -> None:
-    a = [{"z": 1, "a": 2}, {"m": 3}]
-    b = [{"m": 3}, {"a": 2, "z": 1}]
-    assert sort_set(a) == sort_set(b)
-
-
-def test_sort_set_by() -> None:
-    arr = [
-        {"k1": "b", "k2": "x", "other": 1},
-        {"k1": "a", "k2": "y", "other": 2},
-    ]
-    result = sort_set_by(arr, "k1", "k2")
-    assert result[0]["k1"] == "a"
-    assert result[1]["k1"] == "b"
+from typing import Any
+
+from jsmn_forge.spec import (
+    Extra,
+    Missing,
+    MissMatch,
+    diff,
+    extra,
+    iter_diff,
+    missing,
+    missmatch,
+    sort_set,
+    sort_set_by,
+)
+from jsmn_forge.spec.location import Location
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def test_identical_returns_empty() -> None:
+    a = {"x": 1, "y": [1, 2]}
+    assert diff(a, a) == {}
+
+
+def test_top_level_missing_and_extra() -> None:
+    a = {"a": 1}
+    b = {"b": 2}
+    result = diff(a, b)
+    assert result == {
+        ("a",): Missing(1),
+        ("b",): Extra(2),
+    }
+
+
+def test_top_level_mismatch() -> None:
+    a = {"a": 1}
+    b = {"a": 2}
+    result = diff(a, b)
+    assert result == {("a",): MissMatch(1, 2)}
+
+
+def test_nested_dict_diff() -> None:
+    a = {"info": {"title": "Foo", "version": "1.0"}}
+    b = {"info": {"title": "Bar", "version": "1.0"}}
+    result = diff(a, b)
+    assert result == {("info", "title"): MissMatch("Foo", "Bar")}
+
+
+def test_nested_dict_missing_key() -> None:
+    a = {"info": {"title": "Foo", "desc": "hello"}}
+    b = {"info": {"title": "Foo"}}
+    result = diff(a, b)
+    assert result == {("info", "desc"): Missing("hello")}
+
+
+def test_list_extra_element() -> None:
+    a = {"tags": ["api"]}
+    b = {"tags": ["api", "v2"]}
+    result = diff(a, b)
+    assert result == {("tags", "1"): Extra("v2")}
+
+
+def test_list_missing_element() -> None:
+    a = {"tags": ["api", "v1"]}
+    b = {"tags": ["api"]}
+    result = diff(a, b)
+    assert result == {("tags", "1"): Missing("v1")}
+
+
+def test_list_of_dicts() -> None:
+    a = {"params": [{"name": "id", "in": "path"}]}
+    b = {"params": [{"name": "id", "in": "query"}]}
+    result = diff(a, b)
+    assert result == {("params", "0", "in"): MissMatch("path", "query")}
+
+
+def test_type_mismatch_scalar_vs_dict() -> None:
+    a = {"x": "string"}
+    b = {"x": {"type": "string"}}
+    result = diff(a, b)
+    assert result == {("x",): MissMatch("string", {"type": "string"})}
+
+
+def test_sort_set_strings() -> None:
+    assert sort_set(["c", "a", "b"]) == ["a", "b", "c"]
+
+
+def test_sort_set_mixed_types() -> None:
+    arr = [True, "alpha", 1, None]
+    assert sort_set(arr) == sort_set(list(reversed(arr)))
+
+
+def test_sort_set_objects() -> None:
+    a = [{"z": 1, "a": 2}, {"m": 3}]
+    b = [{"m": 3}, {"a": 2, "z": 1}]
+    assert sort_set(a) == sort_set(b)
+
+
+def test_sort_set_by() -> None:
+    arr = [
+        {"k1": "b", "k2": "x", "other": 1},
+        {"k1": "a", "k2": "y", "other": 2},
+    ]
+    result = sort_set_by(arr, "k1", "k2")
+    assert result[0]["k1"] == "a"
+    assert result[1]["k1"] == "b"
+
+
+def test_iter_diff_document_order() -> None:
+    a = {"a": {"x": 1, "y": [1, 2, 3]}, "b": 1, "c": [0]}
+    b = {"d": 4, "c": [1, 5], "a": {"y": [1, 9], "z": 2}}
+    assert list(iter_diff(a, b)) == [
+        (Location(("a", "x")), Missing(1)),
+        (Location(("a", "y", "1")), MissMatch(2, 9)),
+        (Location(("a", "y", "2")), Missing(3)),
+        (Location(("a", "z")), Extra(2)),
+        (Location(("b",)), Missing(1)),
+        (Location(("c", "0")), MissMatch(0, 1)),
+        (Location(("c", "1")), Extra(5)),
+        (Location(("d",)), Extra(4)),
+    ]
+    assert list(diff(a, b).items()) == list(iter_diff(a, b))
+
+
+def test_iter_diff_early_exit() -> None:
+    a = {str(i): {"v": i} for i in range(1000)}
+    b = {str(i): {"v": -i} for i in range(1000)}
+    it = iter_diff(a, b)
+    assert next(it) == (Location(("1", "v")), MissMatch(1, -1))
+    assert next(iter_diff(a, a), None) is None
+
+
+def test_filters_accept_iterables() -> None:
+    a = {"a": 1, "b": 2}
+    b = {"b": 3, "c": 4}
+    assert missing(iter_diff(a, b)) == {("a",): Missing(1)}
+    assert extra(iter_diff(a, b)) == {("c",): Extra(4)}
+    assert missmatch(iter_diff(a, b)) == missmatch(diff(a, b))
+
+
+def _schema(**kw: Any) -> dict[str, Any]:
+    return {"components": {"schemas": {"s": kw}}}
+
+
+def test_context_enum_insert() -> None:
+    a = _schema(enum=list(range(0, 1000, 2)))
+    b = _schema(enum=sorted([*range(0, 1000, 2), 501]))
+    # Positional: every member after the insert
+    assert len(diff(a, b)) == 250
+    loc = ("components", "schemas", "s", "enum", "501")
+    assert diff(a, b, context=ROOT) == {loc: Extra(501)}
+
+
+def test_context_matches_by_identity() -> None:
+    """parameters are keyed by (in, name), a changed member is diffed
+    field by field below its key."""
+    a = {
+        "parameters": [
+            {"in": "path", "name": "id", "required": True},
+            {"in": "query", "name": "limit", "schema": {"type": "integer"}},
+        ]
+    }
+    b = {
+        "parameters": [
+            {"in": "header", "name": "trace"},
+            {"in": "path", "name": "id", "required": True},
+            {"in": "query", "name": "limit", "schema": {"type": "string"}},
+        ]
+    }
+    op = {"paths": {"/items": {"get": a}}}
+    other = {"paths": {"/items": {"get": b}}}
+    prefix = ("paths", "/items", "get", "parameters")
+    assert diff(op, other, context=ROOT) == {
+        (*prefix, "query\x00limit", "schema", "type"): MissMatch(
+            "integer", "string"
+        ),
+        (*prefix, "header\x00trace"): Extra(b["parameters"][0]),
+    }
+
+
+def test_context_positional_lists() -> None:
+    """Arrays without a sort key still diff by position."""
+    a = {"servers": [{"url": "a"}, {"url": "b"}]}
+    b = {"servers": [{"url": "b"}]}
+    assert diff(a, b, context=ROOT) == diff(a, b)
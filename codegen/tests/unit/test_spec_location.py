@@ -1,3 +1,6 @@
+import copy
+import pickle
+
 import pytest
 from jsmn_forge.spec.location import ROOT, Location
 
@@ -124,7 +127,7 @@ def test_iteration() -> None:
 
 def test_hashable() -> None:
     loc = Location(("a", "b"))
-    d: dict[tuple[str, ...], str] = {loc: "value"}
+    d: dict[object, str] = {loc: "value"}
     assert d[("a", "b")] == "value"
 
 
@@ -136,3 +139,54 @@ def test_unpack_extend() -> None:
 
 def test_equality_with_tuple() -> None:
     assert Location(("a", "b")) == ("a", "b")
+
+
+def test_ordering() -> None:
+    locs = [Location(("b",)), ROOT.push("a").push("b"), Location(("a",))]
+    assert sorted(locs) == [("a",), ("a", "b"), ("b",)]
+    assert Location(("a",)) < ("b",)
+    assert Location(("a", "b")) >= ("a",)
+
+
+def test_equality_with_other_types() -> None:
+    assert Location(("a",)) != ["a"]
+    assert Location(("a",)) != "a"
+    with pytest.raises(TypeError):
+        _ = Location(("a",)) < ["a"]
+
+
+# --- parent pointers ---
+
+
+def test_push_shares_parent() -> None:
+    parent = ROOT.push("a")
+    (b, c) = (parent.push("b"), parent.push("c"))
+    assert b == ("a", "b")
+    assert c == ("a", "c")
+    assert len(b) == 2
+    assert parent == ("a",)
+
+
+def test_pushed_hash_matches_tuple() -> None:
+    loc = Location(("a",)).push("b").push("c")
+    assert hash(loc) == hash(("a", "b", "c"))
+    assert {loc: 1} == {("a", "b", "c"): 1}
+    assert loc == Location(("a", "b", "c"))
+
+
+def test_pushed_pointer() -> None:
+    loc = ROOT.push("paths").push("/items").push("get")
+    assert loc.to_pointer() == "/paths/~1items/get"
+    assert loc.resolve({"paths": {"/items": {"get": 1}}}) == 1
+
+
+def test_resolve_list() -> None:
+    doc = {"allOf": [{"a": 1}, {"b": [2, 3]}]}
+    assert Location.from_pointer("/allOf/1/b/0").resolve(doc) == 2
+
+
+def test_pickle_copy() -> None:
+    loc = ROOT.push("a").push("b")
+    assert pickle.loads(pickle.dumps(loc)) == loc
+    assert copy.deepcopy(loc) == loc
+    assert isinstance(copy.deepcopy(loc), Location)
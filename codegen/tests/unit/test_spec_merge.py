@@ -1,158 +1,292 @@
-from pathlib import Path
-from typing import Any
-
-import pytest
-from jsmn_forge.spec import diff, merge
-from jsmn_forge.spec.node import _NO_BHV
-from jsmn_forge.spec.openapi_3_1 import obj_root
-from jsmn_forge.walk.normalize import normalize
-from ruamel.yaml import YAML
-
-yaml = YAML(typ="safe")
-
-
-@pytest.fixture
-def walk_data() -> dict[str, Any]:
-    walk = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
-    # return {file.stem: yaml.load(file) for file in walk.iterdir()}
-    return {file.stem: file.absolute() for file in walk.iterdir()}
-
-
-def test_merge_schema_sets(walk_data: dict[str, Any]) -> None:
-    """Schema-level set arrays (required, enum, type, oneOf) normalize
-    to the same result regardless of authoring order."""
-    test_files = (walk_data["schema_sets_a"], walk_data["schema_sets_b"])
-    result = merge(*test_files)
-    assert result.conflicts == []
-    widget = result.value["components"]["schemas"]["widget"]
-    assert widget["required"] == ["alpha", "beta"]
-    assert widget["properties"]["alpha"]["type"] == ["null", "string"]
-    assert widget["properties"]["alpha"]["enum"] == ["fast", "slow"]
-    # oneOf sorted by canonical:
-    # {"format":..,"type":"integer"} < {"maxLength":..,"type":"string"}
-    assert widget["properties"]["beta"]["oneOf"][0]["type"] == "integer"
-    assert widget["properties"]["beta"]["oneOf"][1]["type"] == "string"
-
-
-def test_merge_openapi_sets(walk_data: dict[str, Any]) -> None:
-    """OpenAPI-level set arrays (parameters, tags, security, scopes,
-    server_var.enum) normalize equivalently regardless of order."""
-    test_files = (walk_data["openapi_sets_a"], walk_data["openapi_sets_b"])
-    result = merge(*test_files)
-    assert result.conflicts == []
-    op = result.value["paths"]["/items"]["get"]
-    assert op["tags"] == ["admin", "inventory"]
-    # parameters sorted by (in, name): path/id < query/limit
-    assert op["parameters"][0]["name"] == "id"
-    assert op["parameters"][0]["in"] == "path"
-    assert op["parameters"][1]["name"] == "limit"
-    assert op["parameters"][1]["in"] == "query"
-    # security sorted by canonical: apiKey < oauth
-    assert list(op["security"][0].keys()) == ["apiKey"]
-    assert list(op["security"][1].keys()) == ["oauth"]
-    # security scopes sorted by str
-    assert op["security"][1]["oauth"] == ["read", "write"]
-    # server_var.enum sorted by str
-    server_var = result.value["servers"][0]["variables"]["env"]
-    assert server_var["enum"] == ["prod", "staging"]
-
-
-def test_merge_ordered(walk_data: dict[str, Any]) -> None:
-    """Ordered arrays (servers, prefixItems, root tags) must NOT be
-    sorted by normalize — different authoring order stays different."""
-    a = walk_data["ordered_a"]
-    b = walk_data["ordered_b"]
-    result = merge(a, b)
-    # Ordered arrays produce positional conflicts/differences
-    assert result.conflicts != []
-    # Verify the diffs are real — normalize preserves order
-    merged_a = merge(a)
-    merged_b = merge(b)
-    assert diff(merged_a.value, merged_b.value) != {}
-
-
-def test_merge_union(walk_data: dict[str, Any]) -> None:
-    """Disjoint + overlapping content merges cleanly: dict key union,
-    required set union, new schema deep-copied."""
-    test_files = (walk_data["merge_union_a"], walk_data["merge_union_b"])
-    result = merge(*test_files)
-    assert result.conflicts == []
-    schemas = result.value["components"]["schemas"]
-    # alpha: required is union of both
-    assert schemas["alpha"]["required"] == ["code", "name"]
-    # alpha: properties merged from both sides
-    assert "name" in schemas["alpha"]["properties"]
-    assert "code" in schemas["alpha"]["properties"]
-    # beta: deep-copied from b
-    assert "beta" in schemas
-    assert schemas["beta"]["properties"]["active"]["type"] == "boolean"
-
-
-def test_merge_conflict(walk_data: dict[str, Any]) -> None:
-    """Conflicting scalars and parameter identity produce MergeConflict
-    objects with correct locations."""
-    test_files = (walk_data["merge_conflict_a"], walk_data["merge_conflict_b"])
-    result = merge(*test_files)
-    locs = {c.location for c in result.conflicts}
-    assert ("info", "title") in locs
-    assert ("info", "version") in locs
-    # parameter with same (in, name) but different schema
-    assert ("paths", "/items", "get", "parameters") in locs
-    assert len(result.conflicts) == 3
-
-
-def test_ref_rewriting(walk_data: dict[str, Any]) -> None:
-    """$ref values are rewritten in schema-aware contexts but left
-    untouched inside data traps (default, x-*)."""
-    raw = yaml.load(walk_data["refs"])
-    result = normalize(raw, (obj_root, _NO_BHV), scheme="forge")
-    schemas = result["components"]["schemas"]
-
-    # Direct $ref — local, unchanged
-    assert schemas["direct"]["$ref"] == "#/components/schemas/target"
-
-    # Properties: local unchanged, external rewritten
-    props = schemas["in_properties"]["properties"]
-    assert props["local"]["$ref"] == "#/components/schemas/target"
-    assert (
-        props["external"]["$ref"]
-        == "./sdk.openapi.yaml#/components/schemas/Foo"
-    )
-
-    # allOf: scheme ref rewritten, relative ref collapsed to fragment
-    allOf = schemas["in_properties"]["allOf"]
-    refs = sorted(item["$ref"] for item in allOf)
-    assert "#/components/schemas/Baz" in refs
-    assert "./sdk.openapi.yaml#/components/schemas/Bar" in refs
-
-    # $ref with sibling keys — ref rewritten, siblings preserved
-    assert schemas["with_siblings"]["$ref"] == "#/components/schemas/target"
-    assert schemas["with_siblings"]["description"] == "has sibling keys"
-
-    # Data traps — $ref is just data, NOT rewritten
-    traps = schemas["data_traps"]
-    assert traps["default"]["$ref"] == "#/not_a_real_ref"
-    assert traps["x-meta"]["$ref"] == "forge://sdk/common/v0#/not_a_real_ref"
-
-
-def test_merge_schema_dispatch(walk_data: dict[str, Any]) -> None:
-    """Data traps (default, x-*) preserve content unchanged while
-    schema-aware paths (dependentRequired, $defs, enum, examples) sort."""
-    test_files = (
-        walk_data["schema_dispatch_a"],
-        walk_data["schema_dispatch_b"],
-    )
-    result = merge(*test_files)
-    assert result.conflicts == []
-    gadget = result.value["components"]["schemas"]["gadget"]
-    name_prop = gadget["properties"]["name"]
-    # default is a data trap — unsorted array preserved
-    assert name_prop["default"]["required"] == ["zebra", "apple"]
-    # x-meta is a data trap — unsorted array preserved
-    assert name_prop["x-meta"]["tags"] == ["beta", "alpha"]
-    # dependentRequired values sorted as string sets
-    assert gadget["dependentRequired"]["name"] == ["desc", "label"]
-    # $defs recurse into schema — enum and examples sorted
-    mode = gadget["$defs"]["mode"]
-    assert mode["enum"] == ["off", "on"]
-    assert mode["examples"] == ["off", "on"]
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.spec import MergeStrategy, diff, merge
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.spec.schema import schema
+from jsmn_forge.walk.merge import merge as merge_tree
+from jsmn_forge.walk.merge import merge_many
+from jsmn_forge.walk.normalize import normalize
+from ruamel.yaml import YAML
+
+yaml = YAML(typ="safe")
+
+
+@pytest.fixture
+def walk_data() -> dict[str, Any]:
+    walk = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+    # return {file.stem: yaml.load(file) for file in walk.iterdir()}
+    return {file.stem: file.absolute() for file in walk.iterdir()}
+
+
+def test_merge_schema_sets(walk_data: dict[str, Any]) -> None:
+    """Schema-level set arrays (required, enum, type, oneOf) normalize
+    to the same result regardless of authoring order."""
+    test_files = (walk_data["schema_sets_a"], walk_data["schema_sets_b"])
+    result = merge(*test_files)
+    assert result.conflicts == []
+    widget = result.value["components"]["schemas"]["widget"]
+    assert widget["required"] == ["alpha", "beta"]
+    assert widget["properties"]["alpha"]["type"] == ["null", "string"]
+    assert widget["properties"]["alpha"]["enum"] == ["fast", "slow"]
+    # oneOf sorted by canonical:
+    # {"format":..,"type":"integer"} < {"maxLength":..,"type":"string"}
+    assert widget["properties"]["beta"]["oneOf"][0]["type"] == "integer"
+    assert widget["properties"]["beta"]["oneOf"][1]["type"] == "string"
+
+
+def test_merge_openapi_sets(walk_data: dict[str, Any]) -> None:
+    """OpenAPI-level set arrays (parameters, tags, security, scopes,
+    server_var.enum) normalize equivalently regardless of order."""
+    test_files = (walk_data["openapi_sets_a"], walk_data["openapi_sets_b"])
+    result = merge(*test_files)
+    assert result.conflicts == []
+    op = result.value["paths"]["/items"]["get"]
+    assert op["tags"] == ["admin", "inventory"]
+    # parameters sorted by (in, name): path/id < query/limit
+    assert op["parameters"][0]["name"] == "id"
+    assert op["parameters"][0]["in"] == "path"
+    assert op["parameters"][1]["name"] == "limit"
+    assert op["parameters"][1]["in"] == "query"
+    # security sorted by canonical: apiKey < oauth
+    assert list(op["security"][0].keys()) == ["apiKey"]
+    assert list(op["security"][1].keys()) == ["oauth"]
+    # security scopes sorted by str
+    assert op["security"][1]["oauth"] == ["read", "write"]
+    # server_var.enum sorted by str
+    server_var = result.value["servers"][0]["variables"]["env"]
+    assert server_var["enum"] == ["prod", "staging"]
+
+
+def test_merge_ordered(walk_data: dict[str, Any]) -> None:
+    """Ordered arrays (servers, prefixItems, root tags) must NOT be
+    sorted by normalize — different authoring order stays different."""
+    a = walk_data["ordered_a"]
+    b = walk_data["ordered_b"]
+    result = merge(a, b)
+    # Ordered arrays produce positional conflicts/differences
+    assert result.conflicts != []
+    # Verify the diffs are real — normalize preserves order
+    merged_a = merge(a)
+    merged_b = merge(b)
+    assert diff(merged_a.value, merged_b.value) != {}
+
+
+def test_merge_union(walk_data: dict[str, Any]) -> None:
+    """Disjoint + overlapping content merges cleanly: dict key union,
+    required set union, new schema deep-copied."""
+    test_files = (walk_data["merge_union_a"], walk_data["merge_union_b"])
+    result = merge(*test_files)
+    assert result.conflicts == []
+    schemas = result.value["components"]["schemas"]
+    # alpha: required is union of both
+    assert schemas["alpha"]["required"] == ["code", "name"]
+    # alpha: properties merged from both sides
+    assert "name" in schemas["alpha"]["properties"]
+    assert "code" in schemas["alpha"]["properties"]
+    # beta: deep-copied from b
+    assert "beta" in schemas
+    assert schemas["beta"]["properties"]["active"]["type"] == "boolean"
+
+
+def test_merge_conflict(walk_data: dict[str, Any]) -> None:
+    """Conflicting scalars and parameter identity produce MergeConflict
+    objects with correct locations."""
+    test_files = (walk_data["merge_conflict_a"], walk_data["merge_conflict_b"])
+    result = merge(*test_files)
+    locs = {c.location for c in result.conflicts}
+    assert ("info", "title") in locs
+    assert ("info", "version") in locs
+    # parameter with same (in, name) but different schema
+    assert ("paths", "/items", "get", "parameters") in locs
+    assert len(result.conflicts) == 3
+
+
+def test_ref_rewriting(walk_data: dict[str, Any]) -> None:
+    """$ref values are rewritten in schema-aware contexts but left
+    untouched inside data traps (default, x-*)."""
+    raw = yaml.load(walk_data["refs"])
+    result = normalize(raw, (obj_root, _NO_BHV), scheme="forge")
+    schemas = result["components"]["schemas"]
+
+    # Direct $ref — local, unchanged
+    assert schemas["direct"]["$ref"] == "#/components/schemas/target"
+
+    # Properties: local unchanged, external rewritten
+    props = schemas["in_properties"]["properties"]
+    assert props["local"]["$ref"] == "#/components/schemas/target"
+    assert (
+        props["external"]["$ref"]
+        == "./sdk.openapi.yaml#/components/schemas/Foo"
+    )
+
+    # allOf: scheme ref rewritten, relative ref collapsed to fragment
+    allOf = schemas["in_properties"]["allOf"]
+    refs = sorted(item["$ref"] for item in allOf)
+    assert "#/components/schemas/Baz" in refs
+    assert "./sdk.openapi.yaml#/components/schemas/Bar" in refs
+
+    # $ref with sibling keys — ref rewritten, siblings preserved
+    assert schemas["with_siblings"]["$ref"] == "#/components/schemas/target"
+    assert schemas["with_siblings"]["description"] == "has sibling keys"
+
+    # Data traps — $ref is just data, NOT rewritten
+    traps = schemas["data_traps"]
+    assert traps["default"]["$ref"] == "#/not_a_real_ref"
+    assert traps["x-meta"]["$ref"] == "forge://sdk/common/v0#/not_a_real_ref"
+
+
+def test_merge_schema_dispatch(walk_data: dict[str, Any]) -> None:
+    """Data traps (default, x-*) preserve content unchanged while
+    schema-aware paths (dependentRequired, $defs, enum, examples) sort."""
+    test_files = (
+        walk_data["schema_dispatch_a"],
+        walk_data["schema_dispatch_b"],
+    )
+    result = merge(*test_files)
+    assert result.conflicts == []
+    gadget = result.value["components"]["schemas"]["gadget"]
+    name_prop = gadget["properties"]["name"]
+    # default is a data trap — unsorted array preserved
+    assert name_prop["default"]["required"] == ["zebra", "apple"]
+    # x-meta is a data trap — unsorted array preserved
+    assert name_prop["x-meta"]["tags"] == ["beta", "alpha"]
+    # dependentRequired values sorted as string sets
+    assert gadget["dependentRequired"]["name"] == ["desc", "label"]
+    # $defs recurse into schema — enum and examples sorted
+    mode = gadget["$defs"]["mode"]
+    assert mode["enum"] == ["off", "on"]
+    assert mode["examples"] == ["off", "on"]
+
+
+def test_merge_keeps_file_not_found(walk_data: dict[str, Any]) -> None:
+    """Missing inputs are reported without interrupting the merge."""
+    missing = walk_data["merge_union_a"].with_name("missing.yaml")
+    test_files = (walk_data["merge_union_a"], missing, walk_data["refs"])
+    result = merge(*test_files)
+    assert [e.path for e in result.errors] == [missing]
+    assert "beta" not in result.value["components"]["schemas"]
+    assert "direct" in result.value["components"]["schemas"]
+
+
+def test_merge_workers(walk_data: dict[str, Any]) -> None:
+    """Loading on a worker pool preserves input order and errors."""
+    missing = walk_data["merge_conflict_a"].with_name("missing.yaml")
+    test_files = (
+        walk_data["merge_conflict_a"],
+        missing,
+        walk_data["merge_conflict_b"],
+        walk_data["merge_union_a"],
+    )
+    serial = merge(*test_files)
+    parallel = merge(*test_files, workers=2)
+    assert parallel.value == serial.value
+    assert parallel.conflicts == serial.conflicts
+    assert parallel.errors == serial.errors
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        # conflict free
+        ("schema_sets_a", "schema_sets_b", "merge_union_a", "merge_union_b"),
+        ("openapi_sets_a", "openapi_sets_b", "schema_dispatch_a", "refs"),
+        # conflicting
+        ("merge_conflict_a", "merge_union_a", "merge_conflict_b", "ordered_b"),
+        ("ordered_a", "ordered_b", "ordered_a", "merge_conflict_b"),
+    ],
+)
+def test_merge_nway(
+    walk_data: dict[str, Any],
+    names: tuple[str, ...],
+) -> None:
+    """NWAY matches the fold, value and conflicts alike."""
+    test_files = [walk_data[name] for name in names]
+    fold = merge(*test_files)
+    nway = merge(*test_files, strategy=MergeStrategy.NWAY)
+    assert nway.value == fold.value
+    assert list(nway.value) == list(fold.value)
+    assert nway.conflicts == fold.conflicts
+
+
+def test_merge_nway_workers(walk_data: dict[str, Any]) -> None:
+    names = ("schema_sets_a", "schema_sets_b", "merge_union_a", "refs")
+    test_files = [walk_data[name] for name in names]
+    fold = merge(*test_files)
+    nway = merge(*test_files, strategy=MergeStrategy.NWAY, workers=2)
+    assert nway.value == fold.value
+    assert nway.conflicts == []
+
+
+def test_merge_share() -> None:
+    """Shared merges alias source-only subtrees instead of copying, and
+    never modify either input."""
+    dst: dict[str, Any] = {"components": {"schemas": {"a": {"type": "string"}}}}
+    src: dict[str, Any] = {
+        "components": {"schemas": {"b": {"type": "integer"}}},
+        "servers": [{"url": "/"}],
+    }
+    root = (obj_root, _NO_BHV)
+    (copied, _) = merge_tree(dst, src, root)
+    (shared, _) = merge_tree(dst, src, root, share=True)
+    assert copied == shared
+    b = src["components"]["schemas"]["b"]
+    assert copied["components"]["schemas"]["b"] is not b
+    assert shared["components"]["schemas"]["b"] is b
+    assert shared["servers"] is src["servers"]
+    # dst subtrees are shared in both modes, merged paths are fresh
+    a = dst["components"]["schemas"]["a"]
+    assert shared["components"]["schemas"]["a"] is a
+    assert shared["components"] is not dst["components"]
+    assert dst == {"components": {"schemas": {"a": {"type": "string"}}}}
+    assert list(src["components"]["schemas"]) == ["b"]
+
+
+def _chain(leaf: str, depth: int) -> dict[str, Any]:
+    node: dict[str, Any] = {"type": leaf}
+    for _ in range(depth):
+        node = {"type": "object", "properties": {"p": node}}
+    return node
+
+
+def test_walk_deeper_than_recursion_limit() -> None:
+    """normalize, merge and diff walk with explicit stacks."""
+    root = (obj_root, _NO_BHV)
+    depth = sys.getrecursionlimit() * 2
+    a = normalize(_chain("string", depth), root)
+    b = normalize(_chain("integer", depth), root)
+    (value, conflicts) = merge_tree(a, b, root)
+    assert len(conflicts) == 1
+    assert len(conflicts[0].location) == 2 * depth + 1
+    assert value is not a
+    assert len(diff(a, b)) == 1
+
+
+def test_merge_copies_deep_source_only() -> None:
+    root = (obj_root, _NO_BHV)
+    src = normalize(_chain("string", sys.getrecursionlimit() * 2), root)
+    (value, conflicts) = merge_tree({"type": "object"}, src, root)
+    assert conflicts == []
+    assert value["properties"] is not src["properties"]
+    assert len(diff(value, src)) == 0
+
+
+def test_deep_set_members() -> None:
+    """Deep members of set-like arrays are sorted and compared without
+    recursing."""
+    context = (schema, _NO_BHV)
+    depth = sys.getrecursionlimit() * 2
+    (a, b) = (_chain("string", depth), _chain("integer", depth))
+    doc = {"allOf": [a, b], "required": [a, "x"], "x-items": [b]}
+    (one, two) = (normalize(doc, context), normalize(doc, context))
+    assert len(diff(one["allOf"], [b, a])) == 0
+    assert len(diff(one["required"], ["x", a])) == 0
+    (value, conflicts) = merge_tree(one, two, context)
+    assert conflicts == []
+    assert len(diff(value, one)) == 0
+    (value, many) = merge_many([one, two, normalize(doc, context)], context)
+    assert many == []
+    assert len(diff(value, one)) == 0
@@ -1,5 +1,16 @@
+from pathlib import Path
+
 import pytest
-from jsmn_forge.spec.ref import Ref
+from jsmn_forge.cache import Cache
+from jsmn_forge.loader import yaml
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import Specification, load, obj_root
+from jsmn_forge.spec.ref import Ref, RefIndex, Target, normalize_ref
+from jsmn_forge.walk import normalize, ref_sites
+
+WALK = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+
+ROOT = (obj_root, _NO_BHV)
 
 
 @pytest.mark.parametrize(
@@ -44,3 +55,116 @@ def test_is_relative() -> None:
     assert Ref("./file.yaml#/foo").is_relative
     assert not Ref("#/foo").is_relative
     assert not Ref("forge://m/r/v0#/foo").is_relative
+
+
+def test_normalize_ref() -> None:
+    for raw in ("#/a", "./b.yaml#/c", "forge://sdk/common/v0#/d", "x://y"):
+        assert normalize_ref(raw, "forge") == Ref(raw).normalize("forge")
+
+
+def test_sites() -> None:
+    doc = normalize(yaml.load(WALK / "refs.yaml"), ROOT)
+    sites = ref_sites(doc, ROOT)
+    for loc, ref in sites:
+        assert loc.resolve(doc)["$ref"] == ref
+    schemas = "/components/schemas"
+    # Data (default, x-*) is not searched for references, locations are
+    # those of the normalized (sorted) document
+    assert [(loc.to_pointer(), ref) for (loc, ref) in sites] == [
+        (f"{schemas}/direct", f"#{schemas}/target"),
+        (f"{schemas}/in_properties/properties/local", f"#{schemas}/target"),
+        (
+            f"{schemas}/in_properties/properties/external",
+            f"./sdk.openapi.yaml#{schemas}/Foo",
+        ),
+        (f"{schemas}/in_properties/allOf/0", f"#{schemas}/Baz"),
+        (
+            f"{schemas}/in_properties/allOf/1",
+            f"./sdk.openapi.yaml#{schemas}/Bar",
+        ),
+        (f"{schemas}/with_siblings", f"#{schemas}/target"),
+    ]
+
+
+def _index() -> RefIndex:
+    """Module a: A refs B, B refs C (in module b), C refs A and D, E
+    refs D and is not referenced. A and C form a cycle through B."""
+    schemas = "#/components/schemas"
+    docs = {
+        "./a.openapi.yaml": {
+            "A": {"properties": {"b": {"$ref": f"{schemas}/B"}}},
+            "B": {"items": {"$ref": f"forge://b/x/v0{schemas}/C"}},
+            "E": {"$ref": f"forge://b/x/v0{schemas}/D"},
+        },
+        "./b.openapi.yaml": {
+            "C": {
+                "allOf": [
+                    {"$ref": f"forge://a/x/v0{schemas}/A"},
+                    {"$ref": f"{schemas}/D"},
+                ]
+            },
+        },
+    }
+    index = RefIndex()
+    for name, schemas_ in docs.items():
+        doc = {"openapi": "3.1.0", "components": {"schemas": schemas_}}
+        doc = normalize(doc, ROOT)
+        index.add(name, doc, ref_sites(doc, ROOT))
+    return index
+
+
+def _t(document: str, name: str) -> Target:
+    return (document, f"/components/schemas/{name}")
+
+
+def test_index() -> None:
+    index = _index()
+    (a, b, c, d, e) = (
+        _t("./a.openapi.yaml", "A"),
+        _t("./a.openapi.yaml", "B"),
+        _t("./b.openapi.yaml", "C"),
+        _t("./b.openapi.yaml", "D"),
+        _t("./a.openapi.yaml", "E"),
+    )
+    assert len(index) == 5
+    assert "./a.openapi.yaml" in index
+    assert index.target((a[0], a[1] + "/properties/b")) == b
+    assert index.target(a) is None
+    assert index.users(c) == [("./a.openapi.yaml", b[1] + "/items")]
+    assert index.users(e) == []
+    assert index.resolve(c) is index.resolve(c)
+    assert "allOf" in index.resolve(c)
+    assert index.dangling() == [(e, d), ((c[0], c[1] + "/allOf/0"), d)]
+    with pytest.raises(LookupError):
+        index.resolve(d)
+
+    assert index.dependencies(a) == {a, b, c, d}
+    assert index.dependencies(e) == {d}
+    assert index.dependents(a) == {a, b, c}
+    assert index.dependents(d) == {a, b, c, e}
+    assert index.dependents(e) == set()
+
+    # Replacing a document drops its old references
+    index.add("./b.openapi.yaml", {}, [])
+    assert index.users(a) == []
+    assert index.dependencies(a) == {b, c}
+    with pytest.raises(LookupError):
+        index.resolve(c)
+    index.remove("./b.openapi.yaml")
+    assert "./b.openapi.yaml" not in index
+    with pytest.raises(KeyError):
+        index.resolve(c)
+
+
+def test_load(tmp_path: Path) -> None:
+    cache = Cache(tmp_path)
+    file = WALK / "refs.yaml"
+    (first, second) = (RefIndex(), RefIndex())
+    for index in (first, second):
+        assert isinstance(load(file, cache=cache, refs=index), Specification)
+    schemas = "/components/schemas"
+    target = ("./refs.yaml", f"{schemas}/target")
+    assert first.users(target) == second.users(target)
+    assert len(second.users(target)) == 3
+    # Neither the targets nor sdk.openapi.yaml are in the fixture
+    assert len(second.dangling()) == len(second)
@@ -0,0 +1,123 @@
+import pickle
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.codegen import (
+    BoolDescriptor,
+    Bound,
+    Descriptor,
+    Dim,
+    NullDescriptor,
+    NumberDescriptor,
+    NumberFormat,
+    StringDescriptor,
+)
+from jsmn_forge.flatten import flatten
+from jsmn_forge.loader import yaml
+from jsmn_forge.store import IRStore
+
+TEMPLATES = Path(__file__).parent.parent.absolute() / "fixtures" / "templates"
+
+
+def _descriptors() -> list[Descriptor]:
+    schemas: dict[str, Any] = {}
+    for name in ("object_prefix", "generic"):
+        schemas |= yaml.load(TEMPLATES / f"{name}.yml")
+    return [
+        *flatten(schemas),
+        NullDescriptor("nullish"),
+        BoolDescriptor("boolish"),
+        NumberDescriptor(
+            "ranged", "int32", minimum=Bound(-1), maximum=Bound(8, True)
+        ),
+        StringDescriptor("id", 36, min_length=36, pattern="^[0-9a-f-]+$"),
+    ]
+
+
+def test_round_trip() -> None:
+    descriptors = _descriptors()
+    store = IRStore(descriptors)
+    assert len(store) == len(descriptors)
+    # Interned, so the same objects again
+    for handle, descriptor in enumerate(descriptors):
+        assert store.descriptor(handle) is descriptor
+    assert store.nbytes > 0
+
+
+def test_views() -> None:
+    store = IRStore(_descriptors())
+    views = {view.name: view for view in store}
+    thing = views["thing"]
+    assert thing.kind == "object"
+    assert thing.format is None
+    fields = {f.name: f for f in thing.fields or ()}
+    assert fields["u8"].required
+    assert fields["u8"].type.kind == "number"
+    assert fields["u8"].type.format == "uint8"
+    assert fields["u8"].type.dims is None
+    assert fields["multi_string"].type.max_length == 9
+    assert fields["multi_string"].type.dims == (Dim(3, 3), Dim(4, 4))
+    assert fields["a_1"].type.to == "thing_a_1"
+    assert fields["a_1"].type.format is None
+
+    variable = views["variable_object"]
+    assert variable.kind == "array"
+    assert variable.dims == (Dim(3, 8),)
+    assert variable.items is not None
+    assert variable.items.to == "object"
+    assert variable.fields is None
+
+    ranged = views["ranged"]
+    assert (ranged.format, ranged.minimum, ranged.maximum) == (
+        "int32",
+        Bound(-1),
+        Bound(8, exclusive=True),
+    )
+    uuid = views["id"]
+    assert (uuid.max_length, uuid.min_length, uuid.pattern) == (
+        36,
+        36,
+        "^[0-9a-f-]+$",
+    )
+    assert uuid.minimum is None
+    assert views["nullish"].kind == "null"
+    with pytest.raises(IndexError):
+        store[len(store)]
+
+
+def test_pickle() -> None:
+    store = pickle.loads(pickle.dumps(IRStore(_descriptors())))
+    assert [v.name for v in store][-1] == "id"
+
+
+def test_exact_bounds() -> None:
+    bounds: dict[NumberFormat, tuple[Bound, Bound]] = {
+        "int64": (Bound(-(2**63)), Bound(2**63 - 1)),
+        "uint64": (Bound(0), Bound(2**64 - 1, exclusive=True)),
+        "double": (Bound(0.5), Bound(2.0**64)),
+    }
+    store = IRStore(
+        NumberDescriptor(fmt, fmt, minimum=low, maximum=high)
+        for fmt, (low, high) in bounds.items()
+    )
+    for view in store:
+        assert view.format is not None
+        (low, high) = bounds[view.format]
+        assert (view.minimum, view.maximum) == (low, high)
+        assert view.maximum is not None
+        assert type(view.maximum.value) is type(high.value)
+    with pytest.raises(ValueError, match="maximum 18446744073709551616"):
+        store.add(NumberDescriptor("big", "uint128", maximum=Bound(2**64)))
+
+
+def test_round_trip_bound_types() -> None:
+    # Equal bounds of different types, each its own descriptor
+    descriptors = [
+        NumberDescriptor("n", "double", minimum=Bound(value))
+        for value in (1.0, 1)
+    ]
+    assert descriptors[0] is not descriptors[1]
+    store = IRStore(descriptors)
+    for handle, descriptor in enumerate(descriptors):
+        assert store.descriptor(handle) is descriptor
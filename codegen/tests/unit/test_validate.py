@@ -0,0 +1,189 @@
+import shutil
+from pathlib import Path
+
+import pytest
+from jsmn_forge import validate
+from jsmn_forge.bundle import SCHEMA, bundle
+from jsmn_forge.cache import Cache
+from jsmn_forge.cli import main
+from jsmn_forge.loader import yaml
+from jsmn_forge.validate import (
+    InvalidDocumentError,
+    Problem,
+    check,
+    check_openapi,
+    files,
+    validator,
+)
+
+WORKSPACE = Path(__file__).parent.parent.absolute() / "fixtures" / "workspace"
+
+INVALID = """
+openapi: "3.0.3"
+info:
+  title: 1
+paths:
+  /a:
+    get:
+      parameters:
+        - name: q
+          in: body
+      responses:
+        "200": {}
+"""
+
+
+def test_validator_cached() -> None:
+    assert validator(SCHEMA) is validator(SCHEMA)
+    assert check({"resources": []}, SCHEMA) == []
+    # By $id, a schema without one is built every time
+    schema = {"type": "object"}
+    assert validator(schema) is not validator(schema)
+    assert validator({**SCHEMA}) is validator(SCHEMA)
+
+
+def test_check_collects() -> None:
+    problems = check_openapi(yaml.load(INVALID), Path("a.yaml"))
+    assert [p.pointer for p in problems] == [
+        "/info",
+        "/info/title",
+        "/openapi",
+        "/paths/~1a/get/parameters/0",
+        "/paths/~1a/get/responses/200",
+    ]
+    assert all(p.file == Path("a.yaml") for p in problems)
+    assert str(problems[0]) == "a.yaml#/info: 'version' is a required property"
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_files(tmp_path: Path, workers: int | None) -> None:
+    specs = sorted(WORKSPACE.glob("*/schemas/*.yaml"))
+    (bad, broken) = (tmp_path / "bad.yaml", tmp_path / "broken.yaml")
+    bad.write_text(INVALID)
+    broken.write_text("a: [")
+    problems = files(
+        [*specs, bad, broken, tmp_path / "missing.yaml"], workers=workers
+    )
+    assert [p.file for p in problems] == [bad] * 5 + [
+        broken,
+        tmp_path / "missing.yaml",
+    ]
+
+
+def test_files_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = Cache(tmp_path / "cache")
+    spec = tmp_path / "bad.yaml"
+    spec.write_text(INVALID)
+    expect = files([spec], cache=cache)
+    monkeypatch.setattr(validate, "check_openapi", None)
+    assert files([spec], cache=cache) == expect
+
+
+def test_files_cached_identical(tmp_path: Path) -> None:
+    cache = Cache(tmp_path / "cache")
+    (a, b) = (tmp_path / "a.yaml", tmp_path / "b.yaml")
+    a.write_text(INVALID)
+    b.write_text(INVALID)
+    for _ in range(2):
+        problems = files([a, b], cache=cache)
+        assert [p.file for p in problems] == [a] * 5 + [b] * 5
+
+
+def test_bundle_collects(tmp_path: Path) -> None:
+    shutil.copytree(WORKSPACE, tmp_path, dirs_exist_ok=True)
+    wifi = tmp_path / "network" / "schemas" / "wifi.openapi.yaml"
+    wifi.write_text(wifi.read_text().replace('"3.1.0"', '"3.0.3"'))
+    auth = tmp_path / "sdk" / "schemas" / "auth.openapi.yaml"
+    auth.write_text(auth.read_text().replace("sdk/auth/v0", "sdk/auth"))
+    modules = sorted(tmp_path.iterdir())
+
+    with pytest.raises(InvalidDocumentError) as e:
+        bundle("forge", modules)
+    assert [(p.file, p.pointer) for p in e.value.problems] == [
+        (wifi, "/openapi"),
+        (auth, "/$id"),
+    ]
+
+    # Only the $id is checked without validation
+    with pytest.raises(InvalidDocumentError) as e:
+        bundle("forge", modules, validate=False)
+    assert e.value.problems == [
+        Problem(auth, "/$id", "'forge://sdk/auth' is not a valid $id")
+    ]
+
+    # Configs are collected too, before any specification is read
+    (tmp_path / "sensors" / ".jsmn-forge.yaml").write_text("resources: 1\n")
+    (tmp_path / "sdk" / ".jsmn-forge.yaml").write_text("{}\n")
+    with pytest.raises(InvalidDocumentError) as e:
+        bundle("forge", modules)
+    problems = e.value.problems
+    assert all(p.file is not None for p in problems)
+    assert [(p.file.parent.name, p.pointer) for p in problems if p.file] == [
+        ("sdk", ""),
+        ("sensors", "/resources"),
+    ]
+
+
+def test_bundle_unreadable(tmp_path: Path) -> None:
+    shutil.copytree(WORKSPACE, tmp_path, dirs_exist_ok=True)
+    schemas = tmp_path / "sdk" / "schemas"
+    (schemas / "auth.openapi.yaml").write_text("a: 1\na: 2\n")
+    (schemas / "common.openapi.yaml").unlink()
+    modules = sorted(tmp_path.iterdir())
+    for cache in (None, Cache(tmp_path / "cache")):
+        with pytest.raises(InvalidDocumentError) as e:
+            bundle("forge", modules, cache=cache)
+        problems = e.value.problems
+        assert [(p.file, p.pointer) for p in problems] == [
+            (schemas / "common.openapi.yaml", ""),
+            (schemas / "auth.openapi.yaml", ""),
+        ]
+        assert problems[0].message.startswith("cannot read")
+        assert problems[1].message.startswith("cannot parse")
+
+
+def test_bundle_cached_identical(tmp_path: Path) -> None:
+    shutil.copytree(WORKSPACE, tmp_path, dirs_exist_ok=True)
+    schemas = tmp_path / "sdk" / "schemas"
+    for name in ("auth", "common"):
+        (schemas / f"{name}.openapi.yaml").write_text(INVALID)
+    modules = sorted(tmp_path.iterdir())
+    cache = Cache(tmp_path / "cache")
+    for _ in range(2):
+        with pytest.raises(InvalidDocumentError) as e:
+            bundle("forge", modules, cache=cache)
+        assert [p.file.name for p in e.value.problems if p.file] == [
+            "common.openapi.yaml"
+        ] * 5 + ["auth.openapi.yaml"] * 5
+
+
+def test_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    modules = sorted(WORKSPACE.iterdir())
+    main(["validate", *map(str, modules)])
+    assert capsys.readouterr().out == "6 documents, 0 problems\n"
+
+    shutil.copytree(WORKSPACE, tmp_path, dirs_exist_ok=True)
+    (tmp_path / "sdk" / "schemas" / "auth.openapi.yaml").write_text(INVALID)
+    with pytest.raises(SystemExit) as e:
+        main(["validate", *map(str, sorted(tmp_path.iterdir()))])
+    assert e.value.code == 1
+    (out, err) = capsys.readouterr()
+    assert out == "6 documents, 5 problems\n"
+    assert len(err.splitlines()) == 5
+
+    # The $id too, like bundle
+    wifi = tmp_path / "network" / "schemas" / "wifi.openapi.yaml"
+    wifi.write_text("$id: forge://wifi\n" + wifi.read_text())
+    with pytest.raises(SystemExit):
+        main(["validate", *map(str, sorted(tmp_path.iterdir()))])
+    (out, err) = capsys.readouterr()
+    assert out == "6 documents, 6 problems\n"
+    assert f"{wifi}#/$id: 'forge://wifi' is not a valid $id" in err
+
+    # An invalid config does not stop the other modules being validated
+    (tmp_path / "sdk" / ".jsmn-forge.yaml").write_text("{}\n")
+    with pytest.raises(SystemExit):
+        main(["validate", *map(str, sorted(tmp_path.iterdir()))])
+    (out, err) = capsys.readouterr()
+    assert out == "4 documents, 2 problems\n"
+    assert "jsmn-forge.yaml#: 'resources' is a required property" in err
@@ -0,0 +1,148 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+from jsmn_forge.spec import diff, merge
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk import Digests, digest, normalize
+from jsmn_forge.walk import merge as merge_tree
+
+WALK = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+ROOT = (obj_root, _NO_BHV)
+
+
+def _doc() -> dict[str, Any]:
+    return {
+        "components": {
+            "schemas": {
+                "a": {"type": "object", "required": ["y", "x"]},
+                "b": {"enum": [3, 1, 2], "x-meta": [{"k": None}]},
+            }
+        }
+    }
+
+
+def test_equal_trees_same_digest() -> None:
+    digests = Digests()
+    (a, b) = (_doc(), _doc())
+    assert digest(a, digests) == digest(b, digests)
+    assert digests.same(a, b)
+    assert digests.same(a["components"], b["components"])
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        {"a": 1},
+        {"a": "1"},
+        {"a": True},
+        {"a": [1]},
+        {"a": {"1": None}},
+        {"b": 1},
+        {"a": 1, "b": 1},
+    ],
+)
+def test_different_trees(other: dict[str, Any]) -> None:
+    digests = Digests()
+    base = {"a": 1.5}
+    assert digest(base, digests) != digest(other, digests)
+    assert not digests.same(base, other)
+
+
+def test_unknown_objects_are_not_same() -> None:
+    digests = Digests()
+    assert not digests.same({}, {})
+    shared: dict[str, Any] = {}
+    assert digests.same(shared, shared)
+
+
+def test_normalize_digests_every_container() -> None:
+    digests = Digests()
+    result = normalize(_doc(), ROOT, digests=digests)
+    # result, components, schemas, a, a.required, b, b.enum, x-meta, item
+    assert len(digests) == 9
+    # Same digests as digesting the finished tree
+    again = Digests()
+    assert digest(result, again) == digests.get(result)
+
+
+def test_merge_skips_identical_subtrees() -> None:
+    digests = Digests()
+    extended = _doc()
+    extended["components"]["schemas"]["c"] = {"type": "string"}
+    a = normalize(_doc(), ROOT, digests=digests)
+    b = normalize(extended, ROOT, digests=digests)
+    (result, conflicts) = merge_tree(a, b, ROOT, digests=digests)
+    assert conflicts == []
+    schemas = result["components"]["schemas"]
+    assert schemas["a"] is a["components"]["schemas"]["a"]
+    assert schemas["b"] is a["components"]["schemas"]["b"]
+    assert result == merge_tree(a, b, ROOT)[0]
+
+
+def test_diff_skips_identical_subtrees() -> None:
+    digests = Digests()
+    a = normalize(_doc(), ROOT, digests=digests)
+    b = normalize(_doc(), ROOT, digests=digests)
+    assert diff(a, b, digests=digests) == {}
+    changed = _doc()
+    changed["components"]["schemas"]["a"] = {"type": "string"}
+    c = normalize(changed, ROOT, digests=digests)
+    assert diff(a, c, digests=digests) == diff(a, c)
+    assert len(diff(a, c)) == 2
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        ("schema_sets_a", "schema_sets_b"),
+        ("merge_conflict_a", "merge_conflict_b", "merge_conflict_a"),
+        ("merge_union_a", "merge_union_b", "merge_union_a", "refs"),
+        ("ordered_a", "ordered_b", "ordered_a"),
+    ],
+)
+def test_merge_with_digests(names: tuple[str, ...]) -> None:
+    files = [WALK / f"{name}.yaml" for name in names]
+    plain = merge(*files)
+    hashed = merge(*files, digests=True)
+    assert hashed.value == plain.value
+    assert hashed.conflicts == plain.conflicts
+
+
+def test_merge_dedups_like_without_digests() -> None:
+    def dup() -> dict[str, Any]:
+        return {
+            "security": [{"k": []}, {"k": []}],
+            "components": {
+                "schemas": {
+                    "a": {"required": ["x", "x"]},
+                    "b": {"enum": [1, 2]},
+                }
+            },
+            "paths": {
+                "/p": {
+                    "parameters": [
+                        {"in": "query", "name": "q", "required": True},
+                        {"in": "query", "name": "q"},
+                    ]
+                }
+            },
+        }
+
+    digests = Digests()
+    a = normalize(dup(), ROOT, digests=digests)
+    b = normalize(dup(), ROOT, digests=digests)
+    hashed = merge_tree(a, b, ROOT, digests=digests)
+    plain = merge_tree(a, b, ROOT)
+    assert hashed.value == plain.value
+    assert hashed.conflicts == plain.conflicts
+    assert hashed.value["components"]["schemas"]["a"]["required"] == ["x"]
+    # Still skipped: nothing below deduplicates
+    schemas = hashed.value["components"]["schemas"]
+    assert schemas["b"] is a["components"]["schemas"]["b"]
+    # Digested after the fact, for the same context
+    again = Digests()
+    digest(a, again, ROOT)
+    digest(b, again, ROOT)
+    assert merge_tree(a, b, ROOT, digests=again) == plain
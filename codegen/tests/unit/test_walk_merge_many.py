@@ -0,0 +1,136 @@
+import random
+from copy import deepcopy
+from operator import itemgetter
+from typing import Any
+
+import pytest
+from jsmn_forge.spec.node import (
+    _NO_BHV,
+    Behavior,
+    ConflictPolicy,
+    ObjectNode,
+    data,
+)
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk import MergeConflict, merge, merge_many, normalize
+
+ROOT = (obj_root, _NO_BHV)
+
+
+def _scalar(rnd: random.Random) -> Any:
+    return rnd.choice(["a", "b", 1, 2, True, None])
+
+
+def _schema(rnd: random.Random, depth: int) -> Any:
+    if rnd.random() < 0.1:
+        # Type mismatch against the other documents
+        return _scalar(rnd)
+    out: dict[str, Any] = {"type": rnd.choice(["string", "object"])}
+    if rnd.random() < 0.5:
+        out["enum"] = [_scalar(rnd) for _ in range(rnd.randint(0, 4))]
+    if rnd.random() < 0.5:
+        out["required"] = rnd.sample(["a", "b", "c", "a"], rnd.randint(0, 3))
+    if rnd.random() < 0.3:
+        out["x-meta"] = [_scalar(rnd) for _ in range(rnd.randint(0, 3))]
+    if depth and rnd.random() < 0.6:
+        out["properties"] = {
+            f"p{i}": _schema(rnd, depth - 1) for i in rnd.sample(range(4), 2)
+        }
+    if depth and rnd.random() < 0.3:
+        out["allOf"] = [_schema(rnd, 0) for _ in range(rnd.randint(1, 3))]
+    return out
+
+
+def _doc(rnd: random.Random) -> dict[str, Any]:
+    names = rnd.sample(["a", "b", "c", "d"], rnd.randint(1, 4))
+    params = [
+        {"in": "query", "name": rnd.choice("xyz"), "required": _scalar(rnd)}
+        for _ in range(rnd.randint(0, 3))
+    ]
+    return {
+        "openapi": rnd.choice(["3.1.0", "3.1.1"]),
+        "servers": [{"url": u} for u in rnd.choices("uv", k=rnd.randint(0, 3))],
+        "paths": {"/items": {"get": {"parameters": params}}},
+        "components": {"schemas": {n: _schema(rnd, 2) for n in names}},
+    }
+
+
+def _fold(
+    docs: list[Any], *, share: bool
+) -> tuple[Any, list[tuple[int, MergeConflict]]]:
+    value = docs[0]
+    conflicts: list[tuple[int, MergeConflict]] = []
+    for i, doc in enumerate(docs[1:], 1):
+        (value, c) = merge(value, doc, ROOT, share=share)
+        conflicts += [(i, x) for x in c]
+    return (value, conflicts)
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("share", [False, True])
+def test_matches_fold(seed: int, share: bool) -> None:
+    rnd = random.Random(seed)
+    docs = [normalize(_doc(rnd), ROOT) for _ in range(rnd.randint(2, 5))]
+    before = deepcopy(docs)
+    (value, conflicts) = merge_many(docs, ROOT, share=share)
+    assert docs == before
+    assert (value, conflicts) == _fold(docs, share=share)
+
+
+def test_replace_policy() -> None:
+    node = ObjectNode("replace")
+    replace = ConflictPolicy.REPLACE
+    node.configure(
+        table={
+            "v": (data, Behavior(sort_key=None, conflict_policy=replace)),
+            "s": (
+                data,
+                Behavior(sort_key=itemgetter("k"), conflict_policy=replace),
+            ),
+            "n": (node, Behavior(sort_key=None, conflict_policy=replace)),
+        }
+    )
+    context = (node, _NO_BHV)
+    rnd = random.Random(0)
+
+    def doc(depth: int) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "v": _scalar(rnd),
+            "s": sorted(
+                ({"k": rnd.choice("ab"), "v": _scalar(rnd)} for _ in range(3)),
+                key=itemgetter("k"),
+            ),
+        }
+        if depth:
+            out["n"] = doc(depth - 1) if rnd.random() < 0.8 else _scalar(rnd)
+        return out
+
+    for _ in range(20):
+        docs = [doc(2) for _ in range(4)]
+        (value, conflicts) = merge_many(docs, context)
+        fold = docs[0]
+        expect: list[tuple[int, MergeConflict]] = []
+        for i, src in enumerate(docs[1:], 1):
+            (fold, c) = merge(fold, src, context)
+            expect += [(i, x) for x in c]
+        assert (value, conflicts) == (fold, expect)
+
+
+def test_aliasing() -> None:
+    first = {"components": {"schemas": {"a": {"type": "string"}}}}
+    second = {"components": {"schemas": {"b": {"type": "string"}}}}
+    (value, _) = merge_many([first, second], ROOT)
+    schemas = value["components"]["schemas"]
+    assert schemas["a"] is first["components"]["schemas"]["a"]
+    assert schemas["b"] is not second["components"]["schemas"]["b"]
+    (value, _) = merge_many([first, second], ROOT, share=True)
+    assert (
+        value["components"]["schemas"]["b"]
+        is second["components"]["schemas"]["b"]
+    )
+
+
+def test_empty_and_single() -> None:
+    assert merge_many([], ROOT) == (None, [])
+    doc = {"openapi": "3.1.0"}
+    assert merge_many([doc], ROOT).value is doc
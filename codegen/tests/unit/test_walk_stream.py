@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+from jsmn_forge.loader import yaml
+from jsmn_forge.spec.node import _NO_BHV
+from jsmn_forge.spec.openapi_3_1 import obj_root
+from jsmn_forge.walk import Digests, digest, normalize, normalize_yaml
+
+FIXTURES = Path(__file__).parent.parent.absolute() / "fixtures"
+
+ROOT = (obj_root, _NO_BHV)
+
+
+@pytest.mark.parametrize(
+    "file",
+    sorted(FIXTURES.rglob("*.yaml")),
+    ids=lambda f: f.name,
+)
+def test_fixtures(file: Path) -> None:
+    expect = normalize(yaml.load(file), ROOT, scheme="test")
+    got = normalize_yaml(file, ROOT, scheme="test")
+    assert got == expect
+    # Same scalar types and key order
+    assert repr(got) == repr(expect)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "42\n",
+        "openapi: 3.1.0\ninfo: {version: 1.0}\n",
+        "a: [on, yes, '1', 1, 0x1f, 1_000, .inf, ~, 2001-01-01]\n",
+        "a: !!str 1\nb: ! 1\n",
+        "%YAML 1.1\n---\na: on\n",
+        "components:\n  schemas:\n    a: {$ref: '#/components/schemas/b'}\n",
+        "$ref: {a: [2, 1]}\n",
+        # Left to the loader
+        "- &a {required: [b, a]}\n- *a\n",
+        "<<: {a: 1}\nb: 2\n",
+        "? [a]\n: 1\n",
+        "x: !!set {a, b}\n",
+    ],
+)
+def test_text(text: str) -> None:
+    expect = normalize(yaml.load(text), ROOT)
+    assert repr(normalize_yaml(text, ROOT)) == repr(expect)
+    assert repr(normalize_yaml(text.encode(), ROOT)) == repr(expect)
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["a: 1\na: 2\n", "--- 1\n--- 2\n", "a: !unknown 1\n", "a: [1\n"],
+)
+def test_loader_errors(text: str) -> None:
+    with pytest.raises(Exception) as expect:
+        yaml.load(text)
+    with pytest.raises(expect.type):
+        normalize_yaml(text, ROOT)
+
+
+def test_digests() -> None:
+    file = FIXTURES / "walk" / "openapi_sets_a.yaml"
+    (streamed, loaded) = (Digests(), Digests())
+    value = normalize_yaml(file, ROOT, digests=streamed)
+    assert len(streamed) > 0
+    assert digest(value, loaded) == streamed.get(value)
+    assert len(loaded) == len(streamed)
@@ -0,0 +1,129 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+from jsmn_forge.cli import main
+from jsmn_forge.spec import merge
+from jsmn_forge.watch import Cycle, IncrementalMerge, buckets, watch
+
+WALK = Path(__file__).parent.parent.absolute() / "fixtures" / "walk"
+
+NAMES = [
+    "merge_conflict_a",
+    "merge_union_a",
+    "merge_conflict_b",
+    "openapi_sets_a",
+    "ordered_b",
+    "merge_union_b",
+    "openapi_sets_b",
+    "merge_conflict_a",
+]
+
+
+@pytest.fixture
+def files(tmp_path: Path) -> list[Path]:
+    for name in set(NAMES):
+        shutil.copy(WALK / f"{name}.yaml", tmp_path / f"{name}.yaml")
+    return [tmp_path / f"{name}.yaml" for name in NAMES]
+
+
+def _write(file: Path, text: str) -> None:
+    # Bump the mtime even on coarse clock filesystems
+    stat = file.stat() if file.exists() else None
+    file.write_text(text)
+    if stat is not None:
+        ns = stat.st_mtime_ns + 1_000_000_000
+        os.utime(file, ns=(ns, ns))
+
+
+def _check(state: IncrementalMerge) -> None:
+    expect = merge(*state.files)
+    assert state.result.value == expect.value
+    assert state.result.conflicts == expect.conflicts
+    assert state.result.errors == expect.errors
+
+
+def test_buckets() -> None:
+    doc = {
+        "openapi": "3.1.0",
+        "paths": {"/a": {"get": {}}, "/b": {}},
+        "components": {"schemas": {"s": {"type": "string"}}, "tags": {}},
+    }
+    assert list(buckets(doc) or {}) == [
+        ("openapi",),
+        ("paths", "/a"),
+        ("paths", "/b"),
+        ("components", "schemas", "s"),
+        ("components", "tags"),
+    ]
+    assert buckets({"paths": []}) is None
+    assert buckets(None) is None
+
+
+def test_initial_matches_merge(files: list[Path]) -> None:
+    _check(IncrementalMerge(files))
+
+
+def test_update_matches_merge(files: list[Path]) -> None:
+    state = IncrementalMerge(files)
+    assert state.poll() == []
+    edits = [
+        (files[0], files[2].read_text()),
+        (files[3], "paths: []\n"),
+        (files[3], files[5].read_text()),
+        (files[4], "components:\n  schemas: {}\n"),
+        (files[1], "openapi: 3.0.0\n"),
+    ]
+    for file, text in edits:
+        _write(file, text)
+        assert file in state.poll()
+        state.update(state.poll())
+        assert state.poll() == []
+        _check(state)
+
+
+def test_update_counts_buckets(files: list[Path]) -> None:
+    state = IncrementalMerge(files)
+    text = files[4].read_text()
+    _write(files[4], text)
+    assert state.update(state.poll()) == 0
+    _write(files[4], "paths: []\n")
+    assert state.update(state.poll()) is None
+    _write(files[4], text)
+    assert state.update(state.poll())
+
+
+def test_missing_file(files: list[Path]) -> None:
+    state = IncrementalMerge(files)
+    text = files[3].read_text()
+    files[3].unlink()
+    state.update(state.poll())
+    assert len(state.result.errors) == 1
+    _check(state)
+    _write(files[3], text)
+    state.update(state.poll())
+    _check(state)
+
+
+def test_watch_reports(files: list[Path]) -> None:
+    cycles: list[Cycle] = []
+    text = files[1].read_text().replace("3.1.0", "3.0.0")
+    timer = threading.Timer(0.05, _write, (files[1], text))
+    timer.start()
+    state = watch(
+        files,
+        interval=0.01,
+        cycles=1,
+        report=lambda cycle, _: cycles.append(cycle),
+    )
+    timer.join()
+    assert [c.changed for c in cycles] == [files, [files[1]]]
+    assert cycles[1].buckets == 1
+    _check(state)
+
+
+def test_cli_help(capsys: pytest.CaptureFixture[str]) -> None:
+    main([])
+    assert "watch" in capsys.readouterr().out